@@ -21,7 +21,7 @@
 {
     "name": "=,"
     "Google Drive, Dropbox, Onedrive, Nextcloud and Amazon S3 Odoo17",
-    "version": "17.0.6.0.1",
+    "version": "17.0.7.0.1",
     "live_test_url": "https://youtu.be/Q2yMZyYjuTI",
     "category": "Extra Tools",
     "author": "Cybrosys Techno Solutions",
@@ -0,0 +1,398 @@
+###############################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions (odoo@cybrosys.com)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+###############################################################################
+import json
+import os
+import queue
+import subprocess
+import tarfile
+import tempfile
+import time
+import zipfile
+from functools import partial
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Tamaño de cada lectura de la salida de pg_dump y de los archivos del
+# filestore: es lo único que se mantiene en memoria por cada paso del flujo.
+PIPE_READ_SIZE = 1024 * 1024
+# Fragmentos en espera por destino cuando un mismo respaldo se reparte entre
+# varios: el destino más lento frena la lectura de pg_dump.
+FAN_OUT_QUEUE_SIZE = 16
+MIB = 1024 * 1024
+ZSTD_AVAILABLE = zstandard is not None
+
+
+def iter_process_output(cmd, env, read_size=PIPE_READ_SIZE):
+    """Run ``cmd`` and yield its standard output in chunks of at most
+    ``read_size`` bytes, as it is produced.
+
+    The process is killed if the consumer stops early, and a
+    :class:`subprocess.CalledProcessError` holding its error output is raised
+    if it fails.
+    """
+    with tempfile.TemporaryFile() as errors:
+        process = subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE, stderr=errors)
+        completed = False
+        try:
+            for chunk in iter(lambda: process.stdout.read(read_size), b""):
+                yield chunk
+            completed = True
+        finally:
+            process.stdout.close()
+            if not completed:
+                process.kill()
+            process.wait()
+        if process.returncode:
+            errors.seek(0)
+            raise subprocess.CalledProcessError(
+                process.returncode,
+                cmd,
+                stderr=errors.read().decode(errors="replace"),
+            )
+
+
+class _ChunkSink:
+    """Write-only, unseekable file object collecting what a
+    :class:`zipfile.ZipFile` writes until it is popped."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def pop(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class CompressionStats:
+    """Bytes in and out of the compression of a backup, and time spent
+    compressing them."""
+
+    def __init__(self):
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self.seconds = 0.0
+
+    @property
+    def ratio(self):
+        """Uncompressed size / compressed size; 0 if nothing was measured."""
+        if not self.compressed_bytes:
+            return 0.0
+        return self.raw_bytes / self.compressed_bytes
+
+    @property
+    def throughput(self):
+        """MiB of uncompressed data compressed per second."""
+        if not self.seconds:
+            return 0.0
+        return self.raw_bytes / MIB / self.seconds
+
+
+def _write_entry(entry, chunk, stats):
+    started = time.perf_counter()
+    entry.write(chunk)
+    if stats:
+        stats.seconds += time.perf_counter() - started
+
+
+def _iter_zip(dump_chunks, filestore, manifest, read_size, level, stats):
+    compress_type = zipfile.ZIP_STORED if level == 0 else zipfile.ZIP_DEFLATED
+    if compress_type == zipfile.ZIP_STORED:
+        stats = None
+    sink = _ChunkSink()
+    with zipfile.ZipFile(
+        sink, "w", compression=compress_type, compresslevel=level, allowZip64=True
+    ) as archive:
+        # El tamaño del dump no se conoce de antemano: siempre en ZIP64
+        with archive.open("dump.sql", "w", force_zip64=True) as entry:
+            for chunk in dump_chunks:
+                _write_entry(entry, chunk, stats)
+                yield sink.pop()
+        if filestore and os.path.isdir(filestore):
+            for name, path in _walk_files(filestore):
+                info = zipfile.ZipInfo.from_file(path, os.path.join("filestore", name))
+                info.compress_type = compress_type
+                # Lo mismo que hace ZipFile.open con un nombre en vez de ZipInfo
+                info._compresslevel = level
+                with open(path, "rb") as source, archive.open(info, "w") as entry:
+                    for chunk in iter(lambda: source.read(read_size), b""):
+                        _write_entry(entry, chunk, stats)
+                        yield sink.pop()
+        archive.writestr("manifest.json", json.dumps(manifest, indent=4))
+    yield sink.pop()
+    if stats:
+        for info in archive.infolist():
+            stats.raw_bytes += info.file_size
+            stats.compressed_bytes += info.compress_size
+
+
+def iter_zip_backup(
+    dump_chunks, filestore, manifest, read_size=PIPE_READ_SIZE, level=None, stats=None
+):
+    """Yield a zip backup in the layout restored by Odoo (``dump.sql``, the
+    ``filestore`` directory and ``manifest.json``) as it is built.
+
+    :param dump_chunks: Iterable of the chunks of the plain SQL dump.
+    :param str filestore: Path of the filestore of the database, or None
+        to leave it out.
+    :param dict manifest: Content of ``manifest.json``.
+    :param int level: Deflate level of the entries, 0 to store them
+        uncompressed; None for the default level.
+    :param CompressionStats stats: Optional, filled with the compression of
+        the entries.
+    """
+    chunks = _iter_zip(dump_chunks, filestore, manifest, read_size, level, stats)
+    return (chunk for chunk in chunks if chunk)
+
+
+def iter_zstd(chunks, level, threads=0, stats=None):
+    """Yield ``chunks`` compressed into a single zstd frame by ``threads``
+    worker threads (0: one per CPU), as they come.
+
+    :param CompressionStats stats: Optional, filled with the compression.
+    """
+    if zstandard is None:
+        raise ImportError("Zstandard compression needs the zstandard package")
+    stats = stats or CompressionStats()
+    compressor = zstandard.ZstdCompressor(
+        level=level, threads=threads or -1
+    ).compressobj()
+    for chunk in chunks:
+        started = time.perf_counter()
+        data = compressor.compress(chunk)
+        stats.seconds += time.perf_counter() - started
+        stats.raw_bytes += len(chunk)
+        if data:
+            stats.compressed_bytes += len(data)
+            yield data
+    started = time.perf_counter()
+    data = compressor.flush()
+    stats.seconds += time.perf_counter() - started
+    stats.compressed_bytes += len(data)
+    yield data
+
+
+def iter_measured(chunks, raw_bytes, stats):
+    """Yield ``chunks``, compressed by their producer, and fill ``stats``
+    with ``raw_bytes`` as the uncompressed size, their total size and the
+    time spent waiting for the producer (not for the consumer)."""
+    chunks = iter(chunks)
+    stats.raw_bytes += raw_bytes
+    while True:
+        started = time.perf_counter()
+        chunk = next(chunks, None)
+        stats.seconds += time.perf_counter() - started
+        if chunk is None:
+            return
+        stats.compressed_bytes += len(chunk)
+        yield chunk
+
+
+def open_zstd_reader(fileobj):
+    """Return a read-only file object decompressing the zstd ``fileobj``."""
+    if zstandard is None:
+        raise ImportError("Zstandard compression needs the zstandard package")
+    return zstandard.ZstdDecompressor().stream_reader(fileobj)
+
+
+def iter_tar_files(files, read_size=PIPE_READ_SIZE):
+    """Yield an uncompressed tar archive of ``files``, an iterable of
+    ``(archive name, path)`` pairs, reading each file in chunks of at most
+    ``read_size`` bytes.
+
+    Headers are written in the PAX format, so files of any size fit.
+    """
+    for name, file_path in files:
+        stat = os.stat(file_path)
+        info = tarfile.TarInfo(name)
+        info.size = stat.st_size
+        info.mtime = stat.st_mtime
+        info.mode = 0o600
+        yield info.tobuf(format=tarfile.PAX_FORMAT)
+        with open(file_path, "rb") as source:
+            for chunk in iter(lambda: source.read(read_size), b""):
+                yield chunk
+        padding = -info.size % tarfile.BLOCKSIZE
+        if padding:
+            yield tarfile.NUL * padding
+    # Fin del archivo: dos bloques vacíos
+    yield tarfile.NUL * (2 * tarfile.BLOCKSIZE)
+
+
+def _walk_files(path):
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            yield os.path.relpath(file_path, path), file_path
+
+
+def iter_tar_directory(path, read_size=PIPE_READ_SIZE):
+    """Yield an uncompressed tar archive of the files under ``path``, with
+    their paths relative to it."""
+    return iter_tar_files(_walk_files(path), read_size)
+
+
+def iter_filestore_objects(filestore):
+    """Yield ``(checksum, path)`` of the files of a filestore.
+
+    Odoo stores every attachment under ``<sha1[:2]>/<sha1>``, so the
+    checksum is read from the path; other files are skipped.
+    """
+    if not os.path.isdir(filestore):
+        return
+    for prefix in sorted(os.listdir(filestore)):
+        directory = os.path.join(filestore, prefix)
+        if len(prefix) != 2 or not os.path.isdir(directory):
+            continue
+        for checksum in sorted(os.listdir(directory)):
+            if len(checksum) == 40 and checksum.startswith(prefix):
+                yield checksum, os.path.join(directory, checksum)
+
+
+class ChunkReader:
+    """Read-only, unseekable file object over an iterable of byte chunks.
+
+    Destinations taking a file object (local file, FTP, SFTP, S3) read the
+    backup through it while it is being produced; closing it stops the
+    producer and calls ``on_close``, even if nothing was read.
+    """
+
+    def __init__(self, chunks, on_close=None):
+        self._chunks = iter(chunks)
+        self._buffer = bytearray()
+        self._on_close = on_close
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            for chunk in self._chunks:
+                self._buffer += chunk
+            size = len(self._buffer)
+        while len(self._buffer) < size:
+            chunk = next(self._chunks, b"")
+            if not chunk:
+                break
+            self._buffer += chunk
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        self.bytes_read += len(data)
+        return data
+
+    def at_end(self):
+        """Return whether everything has been read, fetching at most one
+        more chunk to know it."""
+        if not self._buffer:
+            self._buffer += next(self._chunks, b"")
+        return not self._buffer
+
+    def close(self):
+        close = getattr(self._chunks, "close", None)
+        if close:
+            close()
+        if self._on_close:
+            self._on_close()
+
+
+class ChunkFanOut:
+    """Hand the chunks of one producer to several consumers, each reading
+    them through its own :class:`ChunkReader` (``readers``) in its own
+    thread.
+
+    At most ``max_pending`` chunks wait for each consumer. A consumer that
+    closes its reader is skipped from then on, and the producer is stopped
+    once every consumer is closed.
+    """
+
+    def __init__(self, count, max_pending=FAN_OUT_QUEUE_SIZE):
+        self._queues = [queue.Queue(max_pending) for _index in range(count)]
+        self._closed = [False] * count
+        self.readers = [
+            ChunkReader(self._iter_queue(index), on_close=partial(self._close, index))
+            for index in range(count)
+        ]
+
+    def _iter_queue(self, index):
+        try:
+            while True:
+                item = self._queues[index].get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self._close(index)
+
+    def _close(self, index):
+        """Skip consumer ``index`` from now on and free its pending chunks,
+        so that the producer never waits for it. A consumer failing before
+        its first read only gets here through :meth:`ChunkReader.close`: the
+        ``finally`` of a generator that never started does not run."""
+        self._closed[index] = True
+        while True:
+            try:
+                self._queues[index].get_nowait()
+            except queue.Empty:
+                return
+
+    def _put(self, index, item):
+        while not self._closed[index]:
+            try:
+                self._queues[index].put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def feed(self, chunks):
+        """Pass every chunk of ``chunks`` to the open consumers, then the end
+        of the stream, or the error raised while producing it."""
+        end = None
+        try:
+            for chunk in chunks:
+                for index in range(len(self._queues)):
+                    self._put(index, chunk)
+                if all(self._closed):
+                    break
+        except Exception as error:
+            end = error
+        finally:
+            close = getattr(chunks, "close", None)
+            if close:
+                close()
+        for index in range(len(self._queues)):
+            self._put(index, end)
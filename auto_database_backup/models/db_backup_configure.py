@@ -20,19 +20,24 @@
 ###############################################################################
 import errno
 import ftplib
+import hashlib
 import json
 import logging
 import os
 import shutil
 import subprocess
+import tarfile
 import tempfile
-from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import timedelta, timezone
 
 import boto3
 import dropbox
 import nextcloud_client
 import paramiko
 import requests
+from boto3.s3.transfer import TransferConfig
 from nextcloud import NextCloud
 from requests.auth import HTTPBasicAuth
 from werkzeug import urls
@@ -44,12 +49,64 @@ from odoo.http import request
 from odoo.service import db
 from odoo.tools import exec_pg_environ, find_pg_tool
 
+from .backup_stream import (
+    PIPE_READ_SIZE,
+    ZSTD_AVAILABLE,
+    ChunkFanOut,
+    ChunkReader,
+    CompressionStats,
+    iter_filestore_objects,
+    iter_measured,
+    iter_process_output,
+    iter_tar_directory,
+    iter_tar_files,
+    iter_zip_backup,
+    iter_zstd,
+    open_zstd_reader,
+)
+
 _logger = logging.getLogger(__name__)
 ONEDRIVE_SCOPE = ["offline_access openid Files.ReadWrite.All"]
 MICROSOFT_GRAPH_END_POINT = "https://graph.microsoft.com"
 GOOGLE_AUTH_ENDPOINT = "https://accounts.google.com/o/oauth2/auth"
 GOOGLE_TOKEN_ENDPOINT = "https://accounts.google.com/o/oauth2/token"
 GOOGLE_API_BASE_URL = "https://www.googleapis.com"
+# Límites de los fragmentos de cada API de subida.
+FOUR_MIB = 4 * 1024 * 1024
+DROPBOX_MAX_REQUEST_BYTES = 150 * 1024 * 1024
+GDRIVE_CHUNK_MULTIPLE = 256 * 1024
+ONEDRIVE_CHUNK_MULTIPLE = 320 * 1024
+ONEDRIVE_MAX_REQUEST_BYTES = 60 * 1024 * 1024
+# Partes de S3 subidas a la vez y retenidas en memoria: una subida a S3 usa
+# como máximo S3_MAX_PARTS_IN_MEMORY veces el tamaño de fragmento (200 MB
+# con el fragmento por defecto de 100 MB).
+S3_MAX_CONCURRENCY = 2
+S3_MAX_PARTS_IN_MEMORY = 2
+# Tiempo máximo (s) de la subida de un fragmento.
+UPLOAD_TIMEOUT = 300
+# Procesos de pg_dump / pg_restore en el formato de directorio.
+DEFAULT_DUMP_JOBS = 4
+# Extensión del archivo de respaldo de cada formato, si no es su nombre.
+BACKUP_EXTENSIONS = {"directory": "tar"}
+# Archivos del filestore incremental: los paquetes de objetos forman el
+# almacén compartido por todas las ejecuciones y nunca caducan.
+FILESTORE_PACK_SUFFIX = ".filestore.tar"
+FILESTORE_MANIFEST_SUFFIX = ".filestore.json"
+# Campos que identifican la ubicación de los respaldos de cada destino: lo
+# subido del filestore incremental sólo vale para esa ubicación.
+DESTINATION_FIELDS = {
+    "local": ["backup_path"],
+    "ftp": ["ftp_host", "ftp_port", "ftp_path"],
+    "sftp": ["sftp_host", "sftp_port", "sftp_path"],
+    "google_drive": ["google_drive_folder_key"],
+    "dropbox": ["dropbox_folder"],
+    "onedrive": ["onedrive_folder_key"],
+    "next_cloud": ["domain", "nextcloud_folder_key"],
+    "amazon_s3": ["bucket_file_name", "aws_folder_name"],
+}
+# Niveles (mínimo, máximo, por defecto) de cada compresión.
+COMPRESSION_LEVELS = {"gzip": (1, 9, 6), "zstd": (1, 19, 3)}
+ZSTD_SUFFIX = ".zst"
 
 
 class DbBackupConfigure(models.Model):
@@ -68,10 +125,55 @@ class DbBackupConfigure(models.Model):
         string="Master Password", required=True, help="Master password"
     )
     backup_format = fields.Selection(
-        [("zip", "Zip"), ("dump", "Dump")],
+        [("zip", "Zip"), ("dump", "Dump"), ("directory", "Directory (parallel)")],
         default="zip",
         required=True,
-        help="Format of the backup",
+        help="Format of the backup. Directory dumps the tables in parallel "
+        "and uploads them as a tar archive, without the filestore.",
+    )
+    incremental_filestore = fields.Boolean(
+        help="Leave the filestore out of the zip backup and upload only the "
+        "attachments not sent yet, packed in one archive per run; the "
+        "manifest of each run lists the archives holding its filestore.",
+    )
+    compression = fields.Selection(
+        [("gzip", "Gzip"), ("zstd", "Zstandard (multi-threaded)"), ("none", "None")],
+        default="gzip",
+        required=True,
+        help="Gzip keeps the own compression of the format, so the backup is "
+        "restored as usual. Zstandard compresses the whole backup with "
+        "several threads and adds the .zst extension; decompress it before "
+        "restoring.",
+    )
+    compression_level = fields.Integer(
+        default=6,
+        help="From 1 (fastest) to 9 for Gzip, to 19 for Zstandard.",
+    )
+    compression_threads = fields.Integer(
+        default=0,
+        help="Threads compressing with Zstandard; 0 uses one per CPU.",
+    )
+    compression_ratio = fields.Float(
+        readonly=True,
+        digits=(16, 2),
+        help="Uncompressed size / compressed size of the last backup. For "
+        "the dump and directory formats compressed with gzip by pg_dump, "
+        "size of the database / size of the backup.",
+    )
+    compression_throughput = fields.Float(
+        string="Compression Speed (MiB/s)",
+        readonly=True,
+        digits=(16, 1),
+        help="Uncompressed MiB compressed per second in the last backup. "
+        "For the dump and directory formats compressed with gzip by "
+        "pg_dump, MiB of the database dumped per second.",
+    )
+    dump_jobs = fields.Integer(
+        string="Parallel Jobs",
+        default=DEFAULT_DUMP_JOBS,
+        help="Number of tables dumped at the same time in the directory "
+        "format; take into account the CPUs and connections of the "
+        "database server.",
     )
     backup_destination = fields.Selection(
         [
@@ -599,6 +701,35 @@ class DbBackupConfigure(models.Model):
         outh_result = dbx_auth.finish(auth_code)
         self.dropbox_refresh_token = outh_result.refresh_token
 
+    @api.constrains("backup_format", "dump_jobs")
+    def _check_dump_jobs(self):
+        """Validate the number of parallel jobs of the directory format"""
+        for rec in self:
+            if rec.backup_format == "directory" and rec.dump_jobs < 1:
+                raise ValidationError(_("At least one parallel job is needed!"))
+
+    @api.constrains("compression", "compression_level", "compression_threads")
+    def _check_compression(self):
+        """Validate the level and threads of the compression"""
+        for rec in self:
+            if rec.compression == "none":
+                continue
+            if rec.compression == "zstd" and not ZSTD_AVAILABLE:
+                raise ValidationError(
+                    _("Install the zstandard Python package to use Zstandard.")
+                )
+            minimum, maximum = COMPRESSION_LEVELS[rec.compression][:2]
+            if not minimum <= rec.compression_level <= maximum:
+                raise ValidationError(
+                    _(
+                        "The compression level must be between %s and %s!",
+                        minimum,
+                        maximum,
+                    )
+                )
+            if rec.compression_threads < 0:
+                raise ValidationError(_("The compression threads cannot be negative!"))
+
     @api.constrains("db_name")
     def _check_db_credentials(self):
         """Validate entered database name and master password"""
@@ -659,555 +790,677 @@ class DbBackupConfigure(models.Model):
         if self.backup_destination == "local":
             self.hide_active = True
 
+    @api.onchange("compression")
+    def _onchange_compression(self):
+        """Reset the level to the default one of the new compression."""
+        if self.compression in COMPRESSION_LEVELS:
+            self.compression_level = COMPRESSION_LEVELS[self.compression][2]
+
     def _schedule_auto_backup(self):
         """Function for generating and storing backup.
         Database backup for all the active records in backup configuration
-        model will be created."""
-        records = self.search([])
+        model will be created. The configurations of the same database and
+        format share one dump, streamed from pg_dump to all their
+        destinations at once."""
+        records = self.search([]).filtered("backup_destination")
         mail_template_success = self.env.ref(
             "auto_database_backup.mail_template_data_db_backup_successful"
         )
         mail_template_failed = self.env.ref(
             "auto_database_backup.mail_template_data_db_backup_failed"
         )
+        groups = {}
         for rec in records:
+            key = (
+                rec.db_name,
+                rec.backup_format,
+                rec._is_filestore_incremental(),
+                rec._get_compression(),
+            )
+            groups[key] = groups.get(key, self.browse()) | rec
+        for key, group in groups.items():
+            db_name, backup_format, incremental, compression = key
             backup_time = fields.datetime.utcnow().strftime("%Y-%m-%d_%H-%M-%S")
-            backup_filename = "%s_%s.%s" % (rec.db_name, backup_time, rec.backup_format)
-            rec.backup_filename = backup_filename
-            # Local backup
-            if rec.backup_destination == "local":
-                try:
-                    if not os.path.isdir(rec.backup_path):
-                        os.makedirs(rec.backup_path)
-                    backup_file = os.path.join(rec.backup_path, backup_filename)
-                    f = open(backup_file, "wb")
-                    self.dump_data(rec.db_name, f, rec.backup_format)
-                    f.close()
-                    # Remove older backups
-                    if rec.auto_remove:
-                        for filename in os.listdir(rec.backup_path):
-                            file = os.path.join(rec.backup_path, filename)
-                            create_time = fields.datetime.fromtimestamp(
-                                os.path.getctime(file)
-                            )
-                            backup_duration = fields.datetime.utcnow() - create_time
-                            if backup_duration.days >= rec.days_to_remove:
-                                os.remove(file)
-                    if rec.notify_user:
-                        mail_template_success.send_mail(rec.id, force_send=True)
-                except Exception as e:
-                    rec.generated_exception = e
-                    _logger.info("FTP Exception: %s", e)
-                    if rec.notify_user:
-                        mail_template_failed.send_mail(rec.id, force_send=True)
-            # FTP backup
-            elif rec.backup_destination == "ftp":
-                try:
-                    ftp_server = ftplib.FTP(timeout=20)
-                    ftp_server.connect(rec.ftp_host, int(rec.ftp_port))
-                    ftp_server.login(rec.ftp_user, rec.ftp_password)
-                    ftp_server.encoding = "utf-8"
-                    temp = tempfile.NamedTemporaryFile(suffix=".%s" % rec.backup_format)
+            backup_filename = "%s_%s.%s%s" % (
+                db_name,
+                backup_time,
+                BACKUP_EXTENSIONS.get(backup_format, backup_format),
+                ZSTD_SUFFIX if compression[0] == "zstd" else "",
+            )
+            group.backup_filename = backup_filename
+            errors = {}
+            try:
+                self._check_backup_user()
+            except Exception as error:
+                errors = dict.fromkeys(group.ids, error)
+            else:
+                # Un token que no se renueva sólo cancela su destino
+                for rec in group:
                     try:
-                        ftp_server.cwd(rec.ftp_path)
-                    except ftplib.error_perm:
-                        ftp_server.mkd(rec.ftp_path)
-                        ftp_server.cwd(rec.ftp_path)
-                    with open(temp.name, "wb+") as tmp:
-                        self.dump_data(rec.db_name, tmp, rec.backup_format)
-                    ftp_server.storbinary(
-                        "STOR %s" % backup_filename, open(temp.name, "rb")
+                        with self.env.cr.savepoint():
+                            rec._refresh_backup_token()
+                    except Exception as error:
+                        _logger.exception("Backup token refresh failed")
+                        errors[rec.id] = error
+            pending = group.filtered(lambda r: r.id not in errors)
+            if pending:
+                # Los envíos concurrentes usan sus propios cursores: deben
+                # ver los tokens renovados y no esperar bloqueos de éste
+                self.env.cr.commit()  # pylint: disable=invalid-commit
+                errors.update(
+                    pending._upload_backup(
+                        db_name,
+                        backup_format,
+                        backup_filename,
+                        with_filestore=not incremental,
+                        compression=compression,
                     )
-                    if rec.auto_remove:
-                        files = ftp_server.nlst()
-                        for file in files:
-                            create_time = fields.datetime.strptime(
-                                ftp_server.sendcmd("MDTM " + file)[4:], "%Y%m%d%H%M%S"
-                            )
-                            diff_days = (fields.datetime.now() - create_time).days
-                            if diff_days >= rec.days_to_remove:
-                                ftp_server.delete(file)
-                    ftp_server.quit()
-                    if rec.notify_user:
-                        mail_template_success.send_mail(rec.id, force_send=True)
-                except Exception as e:
-                    rec.generated_exception = e
-                    _logger.info("FTP Exception: %s", e)
-                    if rec.notify_user:
-                        mail_template_failed.send_mail(rec.id, force_send=True)
-            # SFTP backup
-            elif rec.backup_destination == "sftp":
-                client = paramiko.SSHClient()
-                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-                try:
-                    client.connect(
-                        hostname=rec.sftp_host,
-                        username=rec.sftp_user,
-                        password=rec.sftp_password,
-                        port=rec.sftp_port,
+                )
+                if incremental:
+                    for rec in pending.filtered(lambda r: r.id not in errors):
+                        try:
+                            rec._upload_filestore_increment(backup_filename)
+                        except Exception as error:
+                            _logger.exception("Incremental filestore upload failed")
+                            errors[rec.id] = error
+            for rec in group:
+                error = errors.get(rec.id)
+                if error:
+                    rec.generated_exception = error
+                    _logger.error(
+                        "%s backup failed: %s", rec.backup_destination, error
                     )
-                    sftp = client.open_sftp()
-                    temp = tempfile.NamedTemporaryFile(suffix=".%s" % rec.backup_format)
-                    with open(temp.name, "wb+") as tmp:
-                        self.dump_data(rec.db_name, tmp, rec.backup_format)
-                    try:
-                        sftp.chdir(rec.sftp_path)
-                    except IOError as e:
-                        if e.errno == errno.ENOENT:
-                            sftp.mkdir(rec.sftp_path)
-                            sftp.chdir(rec.sftp_path)
-                    sftp.put(temp.name, backup_filename)
-                    if rec.auto_remove:
-                        files = sftp.listdir()
-                        expired = list(
-                            filter(
-                                lambda fl: (
-                                    fields.datetime.now()
-                                    - fields.datetime.fromtimestamp(
-                                        sftp.stat(fl).st_mtime
-                                    )
-                                ).days
-                                >= rec.days_to_remove,
-                                files,
-                            )
-                        )
-                        for file in expired:
-                            sftp.unlink(file)
-                    sftp.close()
-                    if rec.notify_user:
-                        mail_template_success.send_mail(rec.id, force_send=True)
-                except Exception as e:
-                    rec.generated_exception = e
-                    _logger.info("SFTP Exception: %s", e)
                     if rec.notify_user:
                         mail_template_failed.send_mail(rec.id, force_send=True)
-                finally:
-                    client.close()
-            # Google Drive backup
-            elif rec.backup_destination == "google_drive":
-                try:
-                    if rec.gdrive_token_validity <= fields.Datetime.now():
-                        rec.generate_gdrive_refresh_token()
-                    temp = tempfile.NamedTemporaryFile(suffix=".%s" % rec.backup_format)
-                    with open(temp.name, "wb+") as tmp:
-                        self.dump_data(rec.db_name, tmp, rec.backup_format)
-                    try:
-                        headers = {
-                            "Authorization": "Bearer %s" % rec.gdrive_access_token
-                        }
-                        para = {
-                            "name": backup_filename,
-                            "parents": [rec.google_drive_folder_key],
-                        }
-                        files = {
-                            "data": (
-                                "metadata",
-                                json.dumps(para),
-                                "application/json; charset=UTF-8",
-                            ),
-                            "file": open(temp.name, "rb"),
-                        }
-                        requests.post(
-                            "https://www.googleapis.com/upload/drive/v3/files?uploadType=multipart",
-                            headers=headers,
-                            files=files,
-                            timeout=20,
-                        )
-                        if rec.auto_remove:
-                            query = "parents = '%s'" % rec.google_drive_folder_key
-                            files_req = requests.get(
-                                "https://www.googleapis.com/drive/v3/files?q=%s"
-                                % query,
-                                headers=headers,
-                                timeout=20,
-                            )
-                            files = files_req.json()["files"]
-                            for file in files:
-                                file_date_req = requests.get(
-                                    "https://www.googleapis.com/drive/v3/files/%s?fields=createdTime"
-                                    % file["id"],
-                                    headers=headers,
-                                    timeout=20,
-                                )
-                                create_time = file_date_req.json()["createdTime"][
-                                    :19
-                                ].replace("T", " ")
-                                diff_days = (
-                                    fields.datetime.now()
-                                    - fields.datetime.strptime(
-                                        create_time, "%Y-%m-%d %H:%M:%S"
-                                    )
-                                ).days
-                                if diff_days >= rec.days_to_remove:
-                                    requests.delete(
-                                        "https://www.googleapis.com/drive/v3/files/%s"
-                                        % file["id"],
-                                        headers=headers,
-                                        timeout=20,
-                                    )
-                        if rec.notify_user:
-                            mail_template_success.send_mail(rec.id, force_send=True)
-                    except Exception as e:
-
-                        rec.generated_exception = e
-                        _logger.info("Google Drive Exception: %s", e)
-                        if rec.notify_user:
-                            mail_template_failed.send_mail(rec.id, force_send=True)
-                except Exception:
-                    if rec.notify_user:
-                        mail_template_failed.send_mail(rec.id, force_send=True)
-                        raise ValidationError_(
-                            "Please check the credentials before activation"
-                        )
-                    else:
-                        raise ValidationError_("Please check connection")
-            # Dropbox backu
-            elif rec.backup_destination == "dropbox":
-                # 1) Generar el dump UNA sola vez
-                temp = tempfile.NamedTemporaryFile(suffix=".%s" % rec.backup_format)
-                with open(temp.name, "wb+") as tmp:
-                    self.dump_data(rec.db_name, tmp, rec.backup_format)
-
-                try:
-                    # 2) Cliente Dropbox (modo offline con refresh token)
-                    dbx = dropbox.Dropbox(
-                        app_key=rec.dropbox_client_key,
-                        app_secret=rec.dropbox_client_secret,
-                        oauth2_refresh_token=rec.dropbox_refresh_token,
-                    )
+                elif rec.notify_user:
+                    mail_template_success.send_mail(rec.id, force_send=True)
 
-                    # 3) Normalizar carpeta y armar ruta final
-                    folder = (rec.dropbox_folder or "").strip()
-                    if folder and not folder.startswith("/"):
-                        folder = "/" + folder
-                    dropbox_destination = (folder.rstrip("/") + "/" + backup_filename) if folder else ("/" + backup_filename)
+    def _refresh_backup_token(self):
+        """Renew the access token of the destination if it has expired."""
+        if (
+            self.backup_destination == "google_drive"
+            and self.gdrive_token_validity <= fields.Datetime.now()
+        ):
+            self.generate_gdrive_refresh_token()
+        elif (
+            self.backup_destination == "onedrive"
+            and self.onedrive_token_validity <= fields.Datetime.now()
+        ):
+            self.generate_onedrive_refresh_token()
 
-                    # 4) Chunk configurable: mínimo 50 MB; petición efectiva ≤150 MiB (Dropbox), múltiplos de 4 MiB
-                    params = self.env['ir.config_parameter'].sudo()
-                    raw = params.get_param('auto_database_backup.chunk_mb', '50')
-                    try:
-                        user_mb = float(str(raw).strip().lower().replace(',', '.').replace('mb', ''))
-                    except Exception:
-                        user_mb = 50.0
-
-                    user_bytes = int(max(50.0, user_mb) * 1024 * 1024)   # mínimo 50 MB
-                    API_MAX_REQUEST_BYTES = 150 * 1024 * 1024            # tope real por request (Dropbox)
-                    FOUR_MIB = 4 * 1024 * 1024                           # cuantización recomendada
-
-                    effective = min(user_bytes, API_MAX_REQUEST_BYTES)
-                    CHUNK_SIZE = max(FOUR_MIB, (effective // FOUR_MIB) * FOUR_MIB)
-
-                    # 5) Subida: directa (pequeño) o fragmentada (grande) con overwrite
-                    file_size = os.path.getsize(temp.name)
-                    _logger.info(
-                        "Dropbox: subiendo %s (%s bytes) a %s (chunk=%s MB)",
-                        backup_filename, file_size, dropbox_destination, int(CHUNK_SIZE / 1024 / 1024),
-                    )
+    def _upload_backup(
+        self,
+        db_name,
+        backup_format,
+        backup_filename,
+        with_filestore=True,
+        compression=None,
+    ):
+        """
+        Dump database ``db_name`` once and upload it to the destinations of
+        all the configurations of ``self``, concurrently when there are
+        several of them, then record the compression metrics of the dump.
+        The filestore is left out of zip backups unless ``with_filestore``.
 
-                    with open(temp.name, "rb") as f:
-                        if file_size <= CHUNK_SIZE:
-                            # Subida directa
-                            dbx.files_upload(
-                                f.read(),
-                                dropbox_destination,
-                                mode=dropbox.files.WriteMode.overwrite,
-                                mute=True,
-                            )
-                        else:
-                            # Subida por sesión (fragmentada)
-                            start = dbx.files_upload_session_start(f.read(CHUNK_SIZE))
-                            cursor = dropbox.files.UploadSessionCursor(
-                                session_id=start.session_id,
-                                offset=f.tell(),
-                            )
-                            commit = dropbox.files.CommitInfo(
-                                path=dropbox_destination,
-                                mode=dropbox.files.WriteMode.overwrite,
-                                mute=True,
-                            )
-                            while f.tell() < file_size:
-                                remaining = file_size - f.tell()
-                                if remaining <= CHUNK_SIZE:
-                                    dbx.files_upload_session_finish(f.read(CHUNK_SIZE), cursor, commit)
-                                    break
-                                dbx.files_upload_session_append_v2(f.read(CHUNK_SIZE), cursor)
-                                cursor.offset = f.tell()
-
-                    _logger.info("Dropbox: subida completada -> %s", dropbox_destination)
-
-                    # 6) Eliminar archivos viejos (retención) con paginación
-                    if rec.auto_remove:
-                        try:
-                            list_path = folder or ""  # "" = raíz
-                            result = dbx.files_list_folder(list_path)
-                            entries = list(result.entries)
-                            while result.has_more:
-                                result = dbx.files_list_folder_continue(result.cursor)
-                                entries.extend(result.entries)
-
-                            from datetime import timezone
-                            now = fields.datetime.now().replace(tzinfo=timezone.utc)
-
-                            for it in entries:
-                                if isinstance(it, dropbox.files.FileMetadata) and it.client_modified:
-                                    if (now - it.client_modified).days >= rec.days_to_remove:
-                                        try:
-                                            dbx.files_delete_v2(it.path_lower or it.path_display)
-                                            _logger.info(
-                                                "Dropbox: eliminado %s por retención (%s días)",
-                                                it.name, rec.days_to_remove
-                                            )
-                                        except Exception as de:
-                                            _logger.warning("Dropbox: no se pudo borrar %s: %s", it.name, de)
-                        except Exception as le:
-                            _logger.warning("Dropbox: limpieza falló: %s", le)
-
-                    # 7) Notificación de éxito (correo)
-                    if rec.notify_user:
-                        mail_template_success.send_mail(rec.id, force_send=True)
+        :param tuple compression: (engine, level, threads) of the backup, see
+            ``_get_compression``; None for the default compression.
+        :return: Dictionary {configuration id: exception} of the failed
+            uploads.
+        :rtype: dict
+        """
+        stats = CompressionStats()
+        if len(self) == 1:
+            errors = {}
+            stream = self._open_backup_stream(
+                db_name,
+                backup_format,
+                jobs=self.dump_jobs,
+                with_filestore=with_filestore,
+                compression=compression,
+                stats=stats,
+            )
+            try:
+                with closing(stream):
+                    self._upload_backup_to_destination(stream, backup_filename)
+            except Exception as error:
+                _logger.exception("%s backup failed", self.backup_destination)
+                errors[self.id] = error
+        else:
+            errors = self._upload_backup_fan_out(
+                db_name,
+                backup_format,
+                backup_filename,
+                with_filestore=with_filestore,
+                compression=compression,
+                stats=stats,
+            )
+        if len(errors) < len(self):
+            self._record_compression_stats(backup_filename, stats)
+        return errors
 
-                except Exception as error:
-                    rec.generated_exception = error
-                    _logger.exception("Dropbox Exception")
-                    if rec.notify_user:
-                        mail_template_failed.send_mail(rec.id, force_send=True)
-                finally:
-                    # 8) Limpiar temporal
-                    try:
-                        os.unlink(temp.name)
-                    except Exception:
-                        pass
-
-            # Onedrive Backup
-            elif rec.backup_destination == "onedrive":
-                if rec.onedrive_token_validity <= fields.Datetime.now():
-                    rec.generate_onedrive_refresh_token()
-                temp = tempfile.NamedTemporaryFile(suffix=".%s" % rec.backup_format)
-                with open(temp.name, "wb+") as tmp:
-                    self.dump_data(rec.db_name, tmp, rec.backup_format)
-                headers = {
-                    "Authorization": "Bearer %s" % rec.onedrive_access_token,
-                    "Content-Type": "application/json",
-                }
-                upload_session_url = (
-                    MICROSOFT_GRAPH_END_POINT
-                    + "/v1.0/me/drive/items/%s:/%s:/createUploadSession"
-                    % (rec.onedrive_folder_key, backup_filename)
+    def _upload_backup_fan_out(
+        self,
+        db_name,
+        backup_format,
+        backup_filename,
+        with_filestore=True,
+        compression=None,
+        stats=None,
+    ):
+        """Upload one dump to the destinations of several configurations at
+        once, each from a thread of its own."""
+        errors = {}
+        fan_out = ChunkFanOut(len(self))
+        with ThreadPoolExecutor(
+            max_workers=len(self), thread_name_prefix="db_backup"
+        ) as executor:
+            futures = {
+                executor.submit(
+                    rec._upload_backup_in_thread, reader, backup_filename
+                ): rec
+                for rec, reader in zip(self, fan_out.readers)
+            }
+            fan_out.feed(
+                self._iter_dump(
+                    db_name,
+                    backup_format,
+                    jobs=max(self.mapped("dump_jobs")),
+                    with_filestore=with_filestore,
+                    compression=compression,
+                    stats=stats,
+                )
+            )
+            for future, rec in futures.items():
+                error = future.exception()
+                if error:
+                    errors[rec.id] = error
+        return errors
+
+    def _record_compression_stats(self, backup_filename, stats):
+        """Log the compression ratio and speed of a backup and keep them on
+        the configurations."""
+        if not stats.compressed_bytes:
+            return
+        _logger.info(
+            "Backup %s: %s bytes compressed into %s (ratio %.2f) at %.1f MiB/s",
+            backup_filename,
+            stats.raw_bytes,
+            stats.compressed_bytes,
+            stats.ratio,
+            stats.throughput,
+        )
+        self.write(
+            {
+                "compression_ratio": stats.ratio,
+                "compression_throughput": stats.throughput,
+            }
+        )
+
+    def _upload_backup_in_thread(self, stream, backup_filename):
+        """Upload ``stream`` from a worker thread, with a cursor of its
+        own."""
+        with closing(stream), self.pool.cursor() as cr:
+            rec = self.with_env(self.env(cr=cr))
+            try:
+                rec._upload_backup_to_destination(stream, backup_filename)
+            except Exception:
+                _logger.exception("%s backup failed", rec.backup_destination)
+                raise
+
+    def _upload_backup_to_destination(self, stream, backup_filename):
+        """Upload ``stream`` through the method of the destination."""
+        getattr(self, "_upload_backup_%s" % self.backup_destination)(
+            stream, backup_filename
+        )
+        _logger.info(
+            "Backup %s: %s bytes sent to %s",
+            backup_filename,
+            stream.bytes_read,
+            self.backup_destination,
+        )
+
+    def _upload_backup_local(self, stream, backup_filename):
+        """Write the backup into the local backup directory and remove the
+        expired ones."""
+        if not os.path.isdir(self.backup_path):
+            os.makedirs(self.backup_path)
+        backup_file = os.path.join(self.backup_path, backup_filename)
+        try:
+            with open(backup_file, "wb") as f:
+                shutil.copyfileobj(stream, f, PIPE_READ_SIZE)
+        except Exception:
+            # No dejar un respaldo truncado si pg_dump falla a mitad
+            os.remove(backup_file)
+            raise
+        # Remove older backups
+        if self.auto_remove:
+            for filename in os.listdir(self.backup_path):
+                if filename.endswith(FILESTORE_PACK_SUFFIX):
+                    continue
+                file = os.path.join(self.backup_path, filename)
+                create_time = fields.datetime.fromtimestamp(os.path.getctime(file))
+                backup_duration = fields.datetime.utcnow() - create_time
+                if backup_duration.days >= self.days_to_remove:
+                    os.remove(file)
+
+    def _upload_backup_ftp(self, stream, backup_filename):
+        """Upload the backup to the FTP server and remove the expired ones."""
+        ftp_server = ftplib.FTP(timeout=20)
+        ftp_server.connect(self.ftp_host, int(self.ftp_port))
+        ftp_server.login(self.ftp_user, self.ftp_password)
+        ftp_server.encoding = "utf-8"
+        try:
+            ftp_server.cwd(self.ftp_path)
+        except ftplib.error_perm:
+            ftp_server.mkd(self.ftp_path)
+            ftp_server.cwd(self.ftp_path)
+        ftp_server.storbinary(
+            "STOR %s" % backup_filename, stream, blocksize=PIPE_READ_SIZE
+        )
+        if self.auto_remove:
+            files = ftp_server.nlst()
+            for file in files:
+                if file.endswith(FILESTORE_PACK_SUFFIX):
+                    continue
+                create_time = fields.datetime.strptime(
+                    ftp_server.sendcmd("MDTM " + file)[4:], "%Y%m%d%H%M%S"
                 )
-                try:
-                    upload_session = requests.post(
-                        upload_session_url, headers=headers, timeout=20
+                diff_days = (fields.datetime.now() - create_time).days
+                if diff_days >= self.days_to_remove:
+                    ftp_server.delete(file)
+        ftp_server.quit()
+
+    def _upload_backup_sftp(self, stream, backup_filename):
+        """Upload the backup to the SFTP server and remove the expired
+        ones."""
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        try:
+            client.connect(
+                hostname=self.sftp_host,
+                username=self.sftp_user,
+                password=self.sftp_password,
+                port=self.sftp_port,
+            )
+            sftp = client.open_sftp()
+            try:
+                sftp.chdir(self.sftp_path)
+            except IOError as e:
+                if e.errno == errno.ENOENT:
+                    sftp.mkdir(self.sftp_path)
+                    sftp.chdir(self.sftp_path)
+            sftp.putfo(stream, backup_filename)
+            if self.auto_remove:
+                files = [
+                    fl
+                    for fl in sftp.listdir()
+                    if not fl.endswith(FILESTORE_PACK_SUFFIX)
+                ]
+                expired = list(
+                    filter(
+                        lambda fl: (
+                            fields.datetime.now()
+                            - fields.datetime.fromtimestamp(sftp.stat(fl).st_mtime)
+                        ).days
+                        >= self.days_to_remove,
+                        files,
                     )
-                    upload_url = upload_session.json().get("uploadUrl")
-                    requests.put(upload_url, data=temp.read(), timeout=20)
-                    if rec.auto_remove:
-                        list_url = (
-                            MICROSOFT_GRAPH_END_POINT
-                            + "/v1.0/me/drive/items/%s/children"
-                            % rec.onedrive_folder_key
-                        )
-                        response = requests.get(list_url, headers=headers, timeout=20)
-                        files = response.json().get("value")
-                        for file in files:
-                            create_time = file["createdDateTime"][:19].replace("T", " ")
-                            diff_days = (
-                                fields.datetime.now()
-                                - fields.datetime.strptime(
-                                    create_time, "%Y-%m-%d %H:%M:%S"
-                                )
-                            ).days
-                            if diff_days >= rec.days_to_remove:
-                                delete_url = (
-                                    MICROSOFT_GRAPH_END_POINT
-                                    + "/v1.0/me/drive/items/%s" % file["id"]
-                                )
-                                requests.delete(delete_url, headers=headers, timeout=20)
-                    if rec.notify_user:
-                        mail_template_success.send_mail(rec.id, force_send=True)
-                except Exception as error:
-                    rec.generated_exception = error
-                    _logger.info("Onedrive Exception: %s", error)
-                    if rec.notify_user:
-                        mail_template_failed.send_mail(rec.id, force_send=True)
-            # NextCloud Backup
-            elif rec.backup_destination == "next_cloud":
-                try:
+                )
+                for file in expired:
+                    sftp.unlink(file)
+            sftp.close()
+        finally:
+            client.close()
+
+    def _upload_backup_google_drive(self, stream, backup_filename):
+        """Upload the backup to Google Drive through a resumable upload
+        session, one chunk at a time, and remove the expired ones."""
+        headers = {"Authorization": "Bearer %s" % self.gdrive_access_token}
+        para = {
+            "name": backup_filename,
+            "parents": [self.google_drive_folder_key],
+        }
+        session = requests.post(
+            GOOGLE_API_BASE_URL + "/upload/drive/v3/files?uploadType=resumable",
+            headers={**headers, "Content-Type": "application/json; charset=UTF-8"},
+            data=json.dumps(para),
+            timeout=20,
+        )
+        session.raise_for_status()
+        upload_url = session.headers["Location"]
+        # Los fragmentos de Google Drive deben ser múltiplos de 256 KiB
+        chunk_size = max(
+            GDRIVE_CHUNK_MULTIPLE,
+            self._get_chunk_size_bytes()
+            // GDRIVE_CHUNK_MULTIPLE
+            * GDRIVE_CHUNK_MULTIPLE,
+        )
+        offset = 0
+        while True:
+            chunk = stream.read(chunk_size)
+            last = stream.at_end()
+            if chunk:
+                content_range = "bytes %d-%d/%s" % (
+                    offset,
+                    offset + len(chunk) - 1,
+                    offset + len(chunk) if last else "*",
+                )
+            else:
+                content_range = "bytes */%d" % offset
+            response = requests.put(
+                upload_url,
+                data=chunk,
+                headers={"Content-Range": content_range},
+                timeout=UPLOAD_TIMEOUT,
+            )
+            response.raise_for_status()
+            offset += len(chunk)
+            if last:
+                break
+        if self.auto_remove:
+            query = "parents = '%s'" % self.google_drive_folder_key
+            files_req = requests.get(
+                "https://www.googleapis.com/drive/v3/files?q=%s" % query,
+                headers=headers,
+                timeout=20,
+            )
+            files = files_req.json()["files"]
+            for file in files:
+                if file["name"].endswith(FILESTORE_PACK_SUFFIX):
+                    continue
+                file_date_req = requests.get(
+                    "https://www.googleapis.com/drive/v3/files/%s?fields=createdTime"
+                    % file["id"],
+                    headers=headers,
+                    timeout=20,
+                )
+                create_time = file_date_req.json()["createdTime"][:19].replace(
+                    "T", " "
+                )
+                diff_days = (
+                    fields.datetime.now()
+                    - fields.datetime.strptime(create_time, "%Y-%m-%d %H:%M:%S")
+                ).days
+                if diff_days >= self.days_to_remove:
+                    requests.delete(
+                        "https://www.googleapis.com/drive/v3/files/%s" % file["id"],
+                        headers=headers,
+                        timeout=20,
+                    )
+
+    def _upload_backup_dropbox(self, stream, backup_filename):
+        """Upload the backup to Dropbox, in an upload session when it does
+        not fit in one chunk, and remove the expired ones."""
+        # Cliente Dropbox (modo offline con refresh token)
+        dbx = dropbox.Dropbox(
+            app_key=self.dropbox_client_key,
+            app_secret=self.dropbox_client_secret,
+            oauth2_refresh_token=self.dropbox_refresh_token,
+        )
+
+        # Normalizar carpeta y armar ruta final
+        folder = (self.dropbox_folder or "").strip()
+        if folder and not folder.startswith("/"):
+            folder = "/" + folder
+        dropbox_destination = (
+            (folder.rstrip("/") + "/" + backup_filename)
+            if folder
+            else ("/" + backup_filename)
+        )
+
+        # Petición efectiva ≤150 MiB (Dropbox), múltiplos de 4 MiB
+        chunk_size = max(
+            FOUR_MIB,
+            min(self._get_chunk_size_bytes(), DROPBOX_MAX_REQUEST_BYTES)
+            // FOUR_MIB
+            * FOUR_MIB,
+        )
+        _logger.info(
+            "Dropbox: subiendo %s a %s (chunk=%s MB)",
+            backup_filename,
+            dropbox_destination,
+            chunk_size // 1024 // 1024,
+        )
+
+        # Subida: directa (un solo fragmento) o por sesión, con overwrite
+        chunk = stream.read(chunk_size)
+        if stream.at_end():
+            dbx.files_upload(
+                chunk,
+                dropbox_destination,
+                mode=dropbox.files.WriteMode.overwrite,
+                mute=True,
+            )
+        else:
+            start = dbx.files_upload_session_start(chunk)
+            cursor = dropbox.files.UploadSessionCursor(
+                session_id=start.session_id,
+                offset=len(chunk),
+            )
+            commit = dropbox.files.CommitInfo(
+                path=dropbox_destination,
+                mode=dropbox.files.WriteMode.overwrite,
+                mute=True,
+            )
+            while True:
+                chunk = stream.read(chunk_size)
+                if stream.at_end():
+                    dbx.files_upload_session_finish(chunk, cursor, commit)
+                    break
+                dbx.files_upload_session_append_v2(chunk, cursor)
+                cursor.offset += len(chunk)
+
+        _logger.info("Dropbox: subida completada -> %s", dropbox_destination)
+
+        # Eliminar archivos viejos (retención) con paginación
+        if self.auto_remove:
+            try:
+                list_path = folder or ""  # "" = raíz
+                result = dbx.files_list_folder(list_path)
+                entries = list(result.entries)
+                while result.has_more:
+                    result = dbx.files_list_folder_continue(result.cursor)
+                    entries.extend(result.entries)
+
+                now = fields.datetime.now().replace(tzinfo=timezone.utc)
+
+                for it in entries:
                     if (
-                        rec.domain
-                        and rec.next_cloud_password
-                        and rec.next_cloud_user_name
+                        isinstance(it, dropbox.files.FileMetadata)
+                        and it.client_modified
+                        and not it.name.endswith(FILESTORE_PACK_SUFFIX)
                     ):
-                        try:
-                            # Connect to NextCloud using the provided username
-                            # and password
-                            ncx = NextCloud(
-                                rec.domain,
-                                auth=HTTPBasicAuth(
-                                    rec.next_cloud_user_name, rec.next_cloud_password
-                                ),
-                            )
-                            # Connect to NextCloud again to perform additional
-                            # operations
-                            nc = nextcloud_client.Client(rec.domain)
-                            nc.login(rec.next_cloud_user_name, rec.next_cloud_password)
-                            # Get the folder name from the NextCloud folder ID
-                            folder_name = rec.nextcloud_folder_key
-                            # If auto_remove is enabled, remove backup files
-                            # older than specified days
-                            if rec.auto_remove:
-                                folder_path = "/" + folder_name
-                                for item in nc.list(folder_path):
-                                    backup_file_name = item.path.split("/")[-1]
-                                    backup_date_str = backup_file_name.split("_")[1]
-                                    backup_date = fields.datetime.strptime(
-                                        backup_date_str, "%Y-%m-%d"
-                                    ).date()
-                                    if (
-                                        fields.date.today() - backup_date
-                                    ).days >= rec.days_to_remove:
-                                        nc.delete(item.path)
-                            # If notify_user is enabled, send a success email
-                            # notification
-                            if rec.notify_user:
-                                mail_template_success.send_mail(rec.id, force_send=True)
-                        except Exception as error:
-                            rec.generated_exception = error
-                            _logger.info("NextCloud Exception: %s", error)
-                            if rec.notify_user:
-                                # If an exception occurs, send a failed email
-                                # notification
-                                mail_template_failed.send_mail(rec.id, force_send=True)
-                        # Get the list of folders in the root directory of NextCloud
-                        data = ncx.list_folders("/").__dict__
-                        folders = [
-                            [file_name["href"].split("/")[-2], file_name["file_id"]]
-                            for file_name in data["data"]
-                            if file_name["href"].endswith("/")
-                        ]
-                        # If the folder name is not found in the list of folders,
-                        # create the folder
-                        if folder_name not in [file[0] for file in folders]:
-                            nc.mkdir(folder_name)
-                            # Dump the database to a temporary file
-                            temp = tempfile.NamedTemporaryFile(
-                                suffix=".%s" % rec.backup_format
-                            )
-                            with open(temp.name, "wb+") as tmp:
-                                self.dump_data(rec.db_name, tmp, rec.backup_format)
-                            backup_file_path = temp.name
-                            remote_file_path = (
-                                f"/{folder_name}/{rec.db_name}_"
-                                f"{backup_time}.{rec.backup_format}"
-                            )
-                            nc.put_file(remote_file_path, backup_file_path)
-                        else:
-                            # Dump the database to a temporary file
-                            temp = tempfile.NamedTemporaryFile(
-                                suffix=".%s" % rec.backup_format
-                            )
-                            with open(temp.name, "wb+") as tmp:
-                                self.dump_data(rec.db_name, tmp, rec.backup_format)
-                            backup_file_path = temp.name
-                            remote_file_path = (
-                                f"/{folder_name}/{rec.db_name}_"
-                                f"{backup_time}.{rec.backup_format}"
-                            )
-                            nc.put_file(remote_file_path, backup_file_path)
-                except Exception:
-                    raise ValidationError_("Please check connection")
-            # Amazon S3 Backup
-            elif rec.backup_destination == "amazon_s3":
-                if rec.aws_access_key and rec.aws_secret_access_key:
-                    try:
-                        # Create a boto3 client for Amazon S3 with provided
-                        # access key id and secret access key
-                        bo3 = boto3.client(
-                            "s3",
-                            aws_access_key_id=rec.aws_access_key,
-                            aws_secret_access_key=rec.aws_secret_access_key,
-                        )
-                        # If auto_remove is enabled, remove the backups that
-                        # are older than specified days from the S3 bucket
-                        if rec.auto_remove:
-                            folder_path = rec.aws_folder_name
-                            response = bo3.list_objects(
-                                Bucket=rec.bucket_file_name, Prefix=folder_path
-                            )
-                            today = fields.date.today()
-                            for file in response["Contents"]:
-                                file_path = file["Key"]
-                                last_modified = file["LastModified"]
-                                date = last_modified.date()
-                                age_in_days = (today - date).days
-                                if age_in_days >= rec.days_to_remove:
-                                    bo3.delete_object(
-                                        Bucket=rec.bucket_file_name, Key=file_path
-                                    )
-                        # Create a boto3 resource for Amazon S3 with provided
-                        # access key id and secret access key
-                        s3 = boto3.resource(
-                            "s3",
-                            aws_access_key_id=rec.aws_access_key,
-                            aws_secret_access_key=rec.aws_secret_access_key,
-                        )
-                        # Create a folder in the specified bucket, if it
-                        # doesn't already exist
-                        s3.Object(rec.bucket_file_name, rec.aws_folder_name + "/").put()
-                        bucket = s3.Bucket(rec.bucket_file_name)
-                        # Get all the prefixes in the bucket
-                        prefixes = set()
-                        for obj in bucket.objects.all():
-                            key = obj.key
-                            if key.endswith("/"):
-                                prefix = key[:-1]  # Remove the trailing slash
-                                prefixes.add(prefix)
-                        # If the specified folder is present in the bucket,
-                        # take a backup of the database and upload it to the
-                        #   S3 bucket
-                        if rec.aws_folder_name in prefixes:
-                            temp = tempfile.NamedTemporaryFile(
-                                suffix=".%s" % rec.backup_format
-                            )
-                            with open(temp.name, "wb+") as tmp:
-                                self.dump_data(rec.db_name, tmp, rec.backup_format)
-                            backup_file_path = temp.name
-                            remote_file_path = (
-                                f"{rec.aws_folder_name}/{rec.db_name}_"
-                                f"{backup_time}.{rec.backup_format}"
-                            )
-                            s3.Object(
-                                rec.bucket_file_name, remote_file_path
-                            ).upload_file(backup_file_path)
-                            # If notify_user is enabled, send an email to the
-                            # user notifying them about the successful backup
-                            if rec.notify_user:
-                                mail_template_success.send_mail(rec.id, force_send=True)
-                    except Exception as error:
-                        # If any error occurs, set the 'generated_exception'
-                        # field to the error message and log the error
-                        rec.generated_exception = error
-                        _logger.info("Amazon S3 Exception: %s", error)
-                        # If notify_user is enabled, email the user
-                        # notifying them about the failed backup
-                        if rec.notify_user:
-                            mail_template_failed.send_mail(rec.id, force_send=True)
-    #todo esto es para el backup
+                        if (now - it.client_modified).days >= self.days_to_remove:
+                            try:
+                                dbx.files_delete_v2(it.path_lower or it.path_display)
+                                _logger.info(
+                                    "Dropbox: eliminado %s por retención (%s días)",
+                                    it.name,
+                                    self.days_to_remove,
+                                )
+                            except Exception as de:
+                                _logger.warning(
+                                    "Dropbox: no se pudo borrar %s: %s", it.name, de
+                                )
+            except Exception as le:
+                _logger.warning("Dropbox: limpieza falló: %s", le)
+
+    def _upload_backup_onedrive(self, stream, backup_filename):
+        """Upload the backup to Onedrive through an upload session and remove
+        the expired ones.
+
+        Onedrive needs the total size in every fragment, so the stream is
+        spooled to a temporary file first.
+        """
+        headers = {
+            "Authorization": "Bearer %s" % self.onedrive_access_token,
+            "Content-Type": "application/json",
+        }
+        upload_session_url = (
+            MICROSOFT_GRAPH_END_POINT
+            + "/v1.0/me/drive/items/%s:/%s:/createUploadSession"
+            % (self.onedrive_folder_key, backup_filename)
+        )
+        # Fragmentos múltiplos de 320 KiB y de a lo sumo 60 MiB (Onedrive)
+        chunk_size = max(
+            ONEDRIVE_CHUNK_MULTIPLE,
+            min(self._get_chunk_size_bytes(), ONEDRIVE_MAX_REQUEST_BYTES)
+            // ONEDRIVE_CHUNK_MULTIPLE
+            * ONEDRIVE_CHUNK_MULTIPLE,
+        )
+        with tempfile.TemporaryFile() as temp:
+            shutil.copyfileobj(stream, temp, PIPE_READ_SIZE)
+            file_size = temp.tell()
+            temp.seek(0)
+            upload_session = requests.post(
+                upload_session_url, headers=headers, timeout=20
+            )
+            upload_session.raise_for_status()
+            upload_url = upload_session.json().get("uploadUrl")
+            offset = 0
+            while offset < file_size:
+                chunk = temp.read(chunk_size)
+                response = requests.put(
+                    upload_url,
+                    data=chunk,
+                    headers={
+                        "Content-Range": "bytes %d-%d/%d"
+                        % (offset, offset + len(chunk) - 1, file_size)
+                    },
+                    timeout=UPLOAD_TIMEOUT,
+                )
+                response.raise_for_status()
+                offset += len(chunk)
+        if self.auto_remove:
+            list_url = (
+                MICROSOFT_GRAPH_END_POINT
+                + "/v1.0/me/drive/items/%s/children" % self.onedrive_folder_key
+            )
+            response = requests.get(list_url, headers=headers, timeout=20)
+            files = response.json().get("value")
+            for file in files:
+                if file["name"].endswith(FILESTORE_PACK_SUFFIX):
+                    continue
+                create_time = file["createdDateTime"][:19].replace("T", " ")
+                diff_days = (
+                    fields.datetime.now()
+                    - fields.datetime.strptime(create_time, "%Y-%m-%d %H:%M:%S")
+                ).days
+                if diff_days >= self.days_to_remove:
+                    delete_url = (
+                        MICROSOFT_GRAPH_END_POINT
+                        + "/v1.0/me/drive/items/%s" % file["id"]
+                    )
+                    requests.delete(delete_url, headers=headers, timeout=20)
+
+    def _upload_backup_next_cloud(self, stream, backup_filename):
+        """Upload the backup to NextCloud and remove the expired ones.
+
+        The NextCloud client uploads from a path, so the stream is spooled to
+        a temporary file first.
+        """
+        if not (self.domain and self.next_cloud_password and self.next_cloud_user_name):
+            raise UserError(_("Please check connection"))
+        # Connect to NextCloud using the provided username and password
+        ncx = NextCloud(
+            self.domain,
+            auth=HTTPBasicAuth(self.next_cloud_user_name, self.next_cloud_password),
+        )
+        # Connect to NextCloud again to perform additional operations
+        nc = nextcloud_client.Client(self.domain)
+        nc.login(self.next_cloud_user_name, self.next_cloud_password)
+        # Get the folder name from the NextCloud folder ID
+        folder_name = self.nextcloud_folder_key
+        # If auto_remove is enabled, remove backup files older than
+        # specified days
+        if self.auto_remove:
+            folder_path = "/" + folder_name
+            for item in nc.list(folder_path):
+                backup_file_name = item.path.split("/")[-1]
+                if backup_file_name.endswith(FILESTORE_PACK_SUFFIX):
+                    continue
+                backup_date_str = backup_file_name.split("_")[1]
+                backup_date = fields.datetime.strptime(
+                    backup_date_str, "%Y-%m-%d"
+                ).date()
+                if (fields.date.today() - backup_date).days >= self.days_to_remove:
+                    nc.delete(item.path)
+        # Get the list of folders in the root directory of NextCloud
+        data = ncx.list_folders("/").__dict__
+        folders = [
+            [file_name["href"].split("/")[-2], file_name["file_id"]]
+            for file_name in data["data"]
+            if file_name["href"].endswith("/")
+        ]
+        # If the folder name is not found in the list of folders, create the
+        # folder
+        if folder_name not in [file[0] for file in folders]:
+            nc.mkdir(folder_name)
+        with tempfile.NamedTemporaryFile(
+            suffix=os.path.splitext(backup_filename)[1]
+        ) as temp:
+            shutil.copyfileobj(stream, temp, PIPE_READ_SIZE)
+            temp.flush()
+            nc.put_file("/%s/%s" % (folder_name, backup_filename), temp.name)
+
+    def _upload_backup_amazon_s3(self, stream, backup_filename):
+        """Upload the backup to the S3 bucket as a multipart upload fed from
+        the stream, and remove the expired ones."""
+        if not (self.aws_access_key and self.aws_secret_access_key):
+            raise UserError(_("Please check the credentials before activation"))
+        # Create a boto3 client for Amazon S3 with provided access key id and
+        # secret access key
+        bo3 = boto3.client(
+            "s3",
+            aws_access_key_id=self.aws_access_key,
+            aws_secret_access_key=self.aws_secret_access_key,
+        )
+        # If auto_remove is enabled, remove the backups that are older than
+        # specified days from the S3 bucket
+        if self.auto_remove:
+            folder_path = self.aws_folder_name
+            response = bo3.list_objects(Bucket=self.bucket_file_name, Prefix=folder_path)
+            today = fields.date.today()
+            for file in response.get("Contents", []):
+                file_path = file["Key"]
+                if file_path.endswith(FILESTORE_PACK_SUFFIX):
+                    continue
+                last_modified = file["LastModified"]
+                date = last_modified.date()
+                age_in_days = (today - date).days
+                if age_in_days >= self.days_to_remove:
+                    bo3.delete_object(Bucket=self.bucket_file_name, Key=file_path)
+        # Create the folder in the specified bucket, if it doesn't already
+        # exist, and upload the backup into it; each part of the multipart
+        # upload is one fragment of the configured size
+        bo3.put_object(Bucket=self.bucket_file_name, Key=self.aws_folder_name + "/")
+        config = TransferConfig(
+            multipart_chunksize=self._get_chunk_size_bytes(),
+            max_concurrency=S3_MAX_CONCURRENCY,
+            max_io_queue=S3_MAX_PARTS_IN_MEMORY,
+        )
+        # Sin esto s3transfer retiene hasta 10 partes leídas del flujo
+        config.max_in_memory_upload_chunks = S3_MAX_PARTS_IN_MEMORY
+        bo3.upload_fileobj(
+            stream,
+            self.bucket_file_name,
+            "%s/%s" % (self.aws_folder_name, backup_filename),
+            Config=config,
+        )
+
     def _get_chunk_size_bytes(self):
         """Lee el tamaño de fragmento (MB) desde Ajustes (ir.config_parameter) y lo devuelve en bytes."""
         icp = self.env["ir.config_parameter"].sudo()
-        val = icp.get_param("l10n_ec_backup_configuration.chunk_mb")
+        val = icp.get_param("auto_database_backup.chunk_mb")
         try:
             chunk_mb = int(val) if val else 100  # default 100 MB si no está configurado
         except Exception:
             chunk_mb = 100
-        chunk_mb = max(1, chunk_mb)             # mínimo 1 MB por seguridad
+        chunk_mb = max(1, chunk_mb)  # mínimo 1 MB por seguridad
         return chunk_mb * 1024 * 1024
 
-
-    def dump_data(self, db_name, stream, backup_format):
-        """Dump database `db` into file-like object `stream` if stream is None
-        return a file object with the dump."""
-
+    def _check_backup_user(self):
+        """Only the user of the backup cron job may dump the databases."""
         cron_user_id = self.env.ref(
             "auto_database_backup.ir_cron_auto_db_backup"
         ).user_id.id
@@ -1215,55 +1468,311 @@ class DbBackupConfigure(models.Model):
             _logger.error(
                 "Unauthorized database operation. Backups should only be available from the cron job."
             )
-            raise ValidationError_(
-                "Unauthorized database operation. Backups should only be available from the cron job."
+            raise ValidationError(
+                _(
+                    "Unauthorized database operation. Backups should only be available from the cron job."
+                )
             )
 
+    def _iter_dump(
+        self,
+        db_name,
+        backup_format,
+        jobs=DEFAULT_DUMP_JOBS,
+        with_filestore=True,
+        compression=None,
+        stats=None,
+    ):
+        """Yield the backup of database ``db_name`` in chunks, as pg_dump
+        produces it; nothing is kept in memory or on disk.
+
+        The directory format is the exception: ``jobs`` pg_dump processes
+        write the tables into a temporary directory of the data directory,
+        which is then streamed as a tar archive.
+
+        Gzip and no compression are applied by the format itself (deflate
+        entries, pg_dump --compress); Zstandard compresses the uncompressed
+        format as it is streamed.
+
+        :param tuple compression: (engine, level, threads), see
+            ``_get_compression``; None for the default of each format.
+        :param CompressionStats stats: Optional, filled with the
+            compression metrics when they can be measured.
+        """
+        engine, level, threads = compression or ("gzip", None, 0)
+        native_level = level if engine == "gzip" else 0
+        chunks = self._iter_format_dump(
+            db_name, backup_format, jobs, with_filestore, native_level, stats
+        )
+        if engine == "zstd":
+            chunks = iter_zstd(chunks, level, threads, stats)
+        yield from chunks
+
+    def _iter_format_dump(
+        self, db_name, backup_format, jobs, with_filestore, level, stats
+    ):
+        """Yield the backup of database ``db_name`` in ``backup_format``,
+        compressed by the format at ``level`` (0: uncompressed, None: the
+        default level).
+
+        pg_dump compresses the dump and directory formats internally; their
+        metrics compare the size of the database with the size of the
+        backup, and the throughput is the size of the database dumped per
+        second.
+        """
+        if stats is not None and backup_format != "zip" and level != 0:
+            db = odoo.sql_db.db_connect(db_name)
+            with db.cursor() as cr:
+                cr.execute("SELECT pg_database_size(current_database())")
+                database_size = cr.fetchone()[0]
+            yield from iter_measured(
+                self._iter_format_dump(
+                    db_name, backup_format, jobs, with_filestore, level, None
+                ),
+                database_size,
+                stats,
+            )
+            return
         _logger.info("DUMP DB: %s format %s", db_name, backup_format)
         cmd = [find_pg_tool("pg_dump"), "--no-owner", db_name]
         env = exec_pg_environ()
+        if level is not None:
+            compress = ["--compress=%d" % level]
+        else:
+            compress = []
         if backup_format == "zip":
-            with tempfile.TemporaryDirectory() as dump_dir:
-                filestore = odoo.tools.config.filestore(db_name)
-                cmd.insert(-1, "--file=" + os.path.join(dump_dir, "dump.sql"))
-                subprocess.run(
-                    cmd,
-                    env=env,
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.STDOUT,
-                    check=True,
-                )
-                if os.path.exists(filestore):
-                    shutil.copytree(filestore, os.path.join(dump_dir, "filestore"))
-                with open(os.path.join(dump_dir, "manifest.json"), "w") as fh:
-                    db = odoo.sql_db.db_connect(db_name)
-                    with db.cursor() as cr:
-                        json.dump(self._dump_db_manifest(cr), fh, indent=4)
-                if stream:
-                    odoo.tools.osutil.zip_dir(
-                        dump_dir,
-                        stream,
-                        include_dir=False,
-                        fnct_sort=lambda file_name: file_name != "dump.sql",
-                    )
-                else:
-                    t = tempfile.TemporaryFile()
-                    odoo.tools.osutil.zip_dir(
-                        dump_dir,
-                        t,
-                        include_dir=False,
-                        fnct_sort=lambda file_name: file_name != "dump.sql",
-                    )
-                    t.seek(0)
-                    return t
+            db = odoo.sql_db.db_connect(db_name)
+            with db.cursor() as cr:
+                manifest = self._dump_db_manifest(cr)
+            yield from iter_zip_backup(
+                iter_process_output(cmd, env),
+                odoo.tools.config.filestore(db_name) if with_filestore else None,
+                manifest,
+                level=level,
+                stats=stats,
+            )
+        elif backup_format == "directory":
+            with tempfile.TemporaryDirectory(
+                dir=odoo.tools.config["data_dir"]
+            ) as dump_dir:
+                target = os.path.join(dump_dir, "dump")
+                cmd[-1:-1] = [
+                    "--format=d",
+                    "--jobs=%d" % jobs,
+                    "--file=" + target,
+                ] + compress
+                self._run_pg_tool(cmd, env)
+                yield from iter_tar_directory(target)
         else:
-            cmd.insert(-1, "--format=c")
-            process = subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE)
-            stdout, _ = process.communicate()
-            if stream:
-                stream.write(stdout)
-            else:
-                return stdout
+            cmd[-1:-1] = ["--format=c"] + compress
+            yield from iter_process_output(cmd, env)
+
+    def _run_pg_tool(self, cmd, env):
+        """Run a PostgreSQL tool, raising its error output if it fails."""
+        process = subprocess.run(
+            cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+        if process.returncode:
+            raise subprocess.CalledProcessError(
+                process.returncode,
+                cmd,
+                stderr=process.stderr.decode(errors="replace"),
+            )
+
+    def _open_backup_stream(
+        self,
+        db_name,
+        backup_format,
+        jobs=DEFAULT_DUMP_JOBS,
+        with_filestore=True,
+        compression=None,
+        stats=None,
+    ):
+        """Return a read-only file object streaming the backup of database
+        ``db_name``; pg_dump only starts when it is first read."""
+        return ChunkReader(
+            self._iter_dump(
+                db_name,
+                backup_format,
+                jobs=jobs,
+                with_filestore=with_filestore,
+                compression=compression,
+                stats=stats,
+            )
+        )
+
+    def _get_compression(self):
+        """Return (engine, level, threads) of the compression of the
+        backups."""
+        if self.compression == "none":
+            return ("none", 0, 0)
+        if self.compression == "zstd":
+            return ("zstd", self.compression_level, self.compression_threads)
+        return ("gzip", self.compression_level, 0)
+
+    def _is_filestore_incremental(self):
+        """Whether the filestore is uploaded apart, incrementally."""
+        return self.backup_format == "zip" and self.incremental_filestore
+
+    def write(self, vals):
+        """Forget the filestore objects uploaded so far when the database
+        or the location of the backups change: the next run uploads the
+        whole filestore to the new location."""
+        location_fields = {"db_name", "backup_destination"}.union(
+            *DESTINATION_FIELDS.values()
+        )
+        if location_fields.intersection(vals):
+            self._reset_filestore_state()
+        return super().write(vals)
+
+    def unlink(self):
+        """Remove the records of the uploaded filestore objects."""
+        self._reset_filestore_state()
+        return super().unlink()
+
+    def action_reset_filestore_state(self):
+        """Upload the whole filestore again on the next run, e.g. after
+        removing packs from the destination."""
+        self._reset_filestore_state()
+
+    def _get_filestore_state_dir(self):
+        """Directory of the records of the uploaded filestore objects."""
+        return os.path.join(
+            odoo.tools.config["data_dir"], "backup_filestore", self.env.cr.dbname
+        )
+
+    def _get_filestore_state_path(self):
+        """Path of the file listing the filestore objects already uploaded
+        to the destination, one ``checksum pack`` line each. Its name holds
+        the database and the location of the backups, so a record is never
+        trusted for another location."""
+        location = [self.db_name, self.backup_destination] + [
+            self[name] for name in DESTINATION_FIELDS.get(self.backup_destination, [])
+        ]
+        digest = hashlib.sha1(json.dumps(location).encode()).hexdigest()
+        return os.path.join(
+            self._get_filestore_state_dir(), "%s-%s.txt" % (self.id, digest)
+        )
+
+    def _reset_filestore_state(self):
+        """Remove the records of the uploaded filestore objects of ``self``."""
+        state_dir = self._get_filestore_state_dir()
+        if not os.path.isdir(state_dir):
+            return
+        prefixes = tuple("%s-" % rec.id for rec in self)
+        for filename in os.listdir(state_dir):
+            if filename.startswith(prefixes):
+                os.remove(os.path.join(state_dir, filename))
+
+    def _read_filestore_state(self):
+        """Return {checksum: pack} of the objects already uploaded."""
+        path = self._get_filestore_state_path()
+        if not os.path.exists(path):
+            return {}
+        with open(path) as state:
+            return dict(line.split() for line in state if line.strip())
+
+    def _write_filestore_state(self, objects):
+        """Replace the uploaded objects by ``objects`` ({checksum: pack})."""
+        path = self._get_filestore_state_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w") as state:
+            for checksum, pack in sorted(objects.items()):
+                state.write("%s %s\n" % (checksum, pack))
+        os.replace(path + ".tmp", path)
+
+    def _upload_filestore_increment(self, backup_filename):
+        """
+        Upload the filestore objects of the database not sent yet to the
+        destination, as one tar pack (``<backup>.filestore.tar``), then the
+        manifest of the run (``<backup>.filestore.json``) listing the packs
+        holding its whole filestore. Extracting those packs into the
+        filestore directory restores it.
+
+        :param str backup_filename: Name of the database backup of the run.
+        """
+        filestore = odoo.tools.config.filestore(self.db_name)
+        uploaded = self._read_filestore_state()
+        current = dict(iter_filestore_objects(filestore))
+        new = sorted(set(current) - set(uploaded))
+        base_name = os.path.splitext(backup_filename.removesuffix(ZSTD_SUFFIX))[0]
+        if new:
+            pack = base_name + FILESTORE_PACK_SUFFIX
+            files = (
+                (os.path.join("filestore", checksum[:2], checksum), current[checksum])
+                for checksum in new
+            )
+            with closing(ChunkReader(iter_tar_files(files))) as stream:
+                self._upload_backup_to_destination(stream, pack)
+            uploaded.update(dict.fromkeys(new, pack))
+        # Los objetos borrados del filestore dejan de seguirse
+        objects = {checksum: uploaded[checksum] for checksum in current}
+        manifest = {
+            "db_name": self.db_name,
+            "backup": backup_filename,
+            "objects": len(objects),
+            "new_objects": len(new),
+            "packs": sorted(set(objects.values())),
+        }
+        with closing(ChunkReader([json.dumps(manifest, indent=4).encode()])) as stream:
+            self._upload_backup_to_destination(
+                stream, base_name + FILESTORE_MANIFEST_SUFFIX
+            )
+        self._write_filestore_state(objects)
+
+    @api.model
+    def _restore_directory_backup(self, db_name, backup_file, jobs=DEFAULT_DUMP_JOBS):
+        """
+        Restore a backup of the directory format into the new database
+        ``db_name``, with ``jobs`` pg_restore processes. Meant to be run from
+        an Odoo shell; the filestore is not part of these backups.
+
+        :param str db_name: Name of the database to create.
+        :param str backup_file: Path of the tar archive of the backup,
+            optionally compressed with Zstandard (``.tar.zst``).
+        :param int jobs: Number of tables restored at the same time.
+        """
+        if db.exp_db_exist(db_name):
+            raise UserError(_("Database %s already exists.", db_name))
+        with tempfile.TemporaryDirectory(
+            dir=odoo.tools.config["data_dir"]
+        ) as restore_dir:
+            with open(backup_file, "rb") as backup:
+                source = backup
+                if backup_file.endswith(ZSTD_SUFFIX):
+                    source = open_zstd_reader(backup)
+                # Lectura secuencial: el archivo descomprimido no admite seek
+                with tarfile.open(fileobj=source, mode="r|") as archive:
+                    if hasattr(tarfile, "data_filter"):
+                        archive.extractall(restore_dir, filter="data")
+                    else:
+                        archive.extractall(restore_dir)
+            db._create_empty_database(db_name)
+            self._run_pg_tool(
+                [
+                    find_pg_tool("pg_restore"),
+                    "--no-owner",
+                    "--jobs=%d" % jobs,
+                    "--dbname=" + db_name,
+                    restore_dir,
+                ],
+                exec_pg_environ(),
+            )
+        _logger.info("RESTORE DB: %s from %s", db_name, backup_file)
+
+    def dump_data(self, db_name, stream, backup_format):
+        """Dump database `db` into file-like object `stream` if stream is None
+        return a file object with the dump."""
+        self._check_backup_user()
+        if stream:
+            for chunk in self._iter_dump(db_name, backup_format):
+                stream.write(chunk)
+            return
+        t = tempfile.TemporaryFile()
+        for chunk in self._iter_dump(db_name, backup_format):
+            t.write(chunk)
+        t.seek(0)
+        return t
 
     def _dump_db_manifest(self, cr):
         """This function generates a manifest dictionary for database dump."""
@@ -0,0 +1,129 @@
+###############################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions (odoo@cybrosys.com)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+###############################################################################
+import threading
+from contextlib import closing
+
+from odoo.tests import BaseCase
+
+from ..models.backup_stream import (
+    ChunkFanOut,
+    ChunkReader,
+    CompressionStats,
+    iter_measured,
+)
+
+# Tiempo máximo (s) de cada hilo de los tests antes de darlo por colgado.
+JOIN_TIMEOUT = 10
+
+
+class TestChunkFanOut(BaseCase):
+    """Hand one backup to several destinations through ChunkFanOut"""
+
+    def _feed_in_thread(self, fan_out, chunks):
+        thread = threading.Thread(target=fan_out.feed, args=(chunks,), daemon=True)
+        thread.start()
+        return thread
+
+    def test_fan_out_all_chunks(self):
+        chunks = [b"%d" % index * 100 for index in range(50)]
+        fan_out = ChunkFanOut(2, max_pending=2)
+        results = [None, None]
+
+        def consume(index):
+            with closing(fan_out.readers[index]) as reader:
+                results[index] = reader.read()
+
+        consumers = [
+            threading.Thread(target=consume, args=(index,), daemon=True)
+            for index in range(2)
+        ]
+        for consumer in consumers:
+            consumer.start()
+        producer = self._feed_in_thread(fan_out, iter(chunks))
+        for thread in consumers + [producer]:
+            thread.join(JOIN_TIMEOUT)
+            self.assertFalse(thread.is_alive())
+        self.assertEqual(results, [b"".join(chunks)] * 2)
+
+    def test_consumer_closed_before_reading(self):
+        """A destination failing before its first read (connection refused,
+        bad credentials) must not block the other ones nor the producer."""
+        chunks = [b"x" * 1024] * 100
+        fan_out = ChunkFanOut(2, max_pending=2)
+        fan_out.readers[0].close()
+        data = []
+        consumer = threading.Thread(
+            target=lambda: data.append(fan_out.readers[1].read()), daemon=True
+        )
+        consumer.start()
+        producer = self._feed_in_thread(fan_out, iter(chunks))
+        for thread in (consumer, producer):
+            thread.join(JOIN_TIMEOUT)
+            self.assertFalse(thread.is_alive())
+        self.assertEqual(data, [b"".join(chunks)])
+
+    def test_all_consumers_closed_stop_producer(self):
+        produced = []
+
+        def chunks():
+            for index in range(1000):
+                produced.append(index)
+                yield b"x"
+
+        fan_out = ChunkFanOut(2, max_pending=2)
+        for reader in fan_out.readers:
+            reader.close()
+        producer = self._feed_in_thread(fan_out, chunks())
+        producer.join(JOIN_TIMEOUT)
+        self.assertFalse(producer.is_alive())
+        self.assertLess(len(produced), 1000)
+
+
+class TestChunkReader(BaseCase):
+    """Read a backup produced in chunks as a file object"""
+
+    def test_read_sizes(self):
+        reader = ChunkReader([b"abc", b"defg", b"h"])
+        self.assertEqual(reader.read(2), b"ab")
+        self.assertFalse(reader.at_end())
+        self.assertEqual(reader.read(5), b"cdefg")
+        self.assertEqual(reader.read(), b"h")
+        self.assertTrue(reader.at_end())
+        self.assertEqual(reader.bytes_read, 8)
+
+    def test_close_calls_hook(self):
+        closed = []
+        reader = ChunkReader(iter([b"a"]), on_close=lambda: closed.append(True))
+        reader.close()
+        self.assertEqual(closed, [True])
+
+
+class TestIterMeasured(BaseCase):
+    """Measure a backup compressed by pg_dump itself"""
+
+    def test_measures_chunks(self):
+        stats = CompressionStats()
+        chunks = list(iter_measured([b"abc", b"de"], 20, stats))
+        self.assertEqual(chunks, [b"abc", b"de"])
+        self.assertEqual(stats.raw_bytes, 20)
+        self.assertEqual(stats.compressed_bytes, 5)
+        self.assertEqual(stats.ratio, 4.0)
+        self.assertGreater(stats.seconds, 0.0)
@@ -21,3 +21,12 @@
 from . import controllers
 from . import models
 from . import report
+
+
+def post_init_hook(env):
+    """Create the journal item indexes used by the reports, log the report
+    queries that still fall back to sequential scans and build the monthly
+    balance snapshot."""
+    env["account.move.line"]._create_report_indexes()
+    env["account.move.line"]._check_report_indexes()
+    env["account.balance.snapshot"]._rebuild()
@@ -1,6 +1,6 @@
 {
     "name": "Odoo17 Dynamic Accounting Reports",
-    "version": "17.0.1.1.1",
+    "version": "17.0.1.1.3",
     "category": "Accounting",
     "summary": "Odoo 17 Accounting Financial Reports,Dynamic Accounting Reports",
     "author": "Cybrosys Techno Solutions",
@@ -10,6 +10,8 @@
     "depends": ["base_accounting_kit"],
     "data": [
         "security/ir.model.access.csv",
+        "security/dynamic_report_export_security.xml",
+        "data/ir_cron_data.xml",
         "views/accounting_report_views.xml",
         "report/trial_balance.xml",
         "report/general_ledger_templates.xml",
@@ -24,6 +26,7 @@
     ],
     "assets": {
         "web.assets_backend": [
+            "dynamic_accounts_report/static/src/xml/report_perf_templates.xml",
             "dynamic_accounts_report/static/src/xml/general_ledger_view.xml",
             "dynamic_accounts_report/static/src/xml/trial_balance_view.xml",
             "dynamic_accounts_report/static/src/xml/cash_flow_templates.xml",
@@ -35,6 +38,9 @@
             "dynamic_accounts_report/static/src/xml/aged_receivable_report_views.xml",
             "dynamic_accounts_report/static/src/xml/tax_report_views.xml",
             "dynamic_accounts_report/static/src/css/accounts_report.css",
+            "dynamic_accounts_report/static/src/js/report_catalogs.js",
+            "dynamic_accounts_report/static/src/js/report_export.js",
+            "dynamic_accounts_report/static/src/js/report_perf.js",
             "dynamic_accounts_report/static/src/js/general_ledger.js",
             "dynamic_accounts_report/static/src/js/trial_balance.js",
             "dynamic_accounts_report/static/src/js/cash_flow.js",
@@ -51,5 +57,6 @@
     "license": "LGPL-3",
     "installable": True,
     "auto_install": False,
+    "post_init_hook": "post_init_hook",
     "application": False,
 }
@@ -19,20 +19,51 @@
 #
 ################################################################################
 import json
+import tempfile
 
 from odoo import http
 from odoo.http import content_disposition, request
 from odoo.tools import html_escape
 
+# Tamaño de los bloques en que se envía el archivo XLSX al navegador.
+XLSX_CHUNK_SIZE = 64 * 1024
+
+
+class XlsxStreamingOutput:
+    """Stand-in for the HTTP response handed to ``get_xlsx_report`` in
+    streaming mode: the workbook is written into a temporary file, which is
+    then sent to the browser in chunks."""
+
+    xlsx_streaming = True
+
+    def __init__(self):
+        self.stream = tempfile.TemporaryFile()
+
+    def iter_chunks(self):
+        """Yield the written file in chunks, closing it at the end."""
+        try:
+            self.stream.seek(0)
+            while True:
+                chunk = self.stream.read(XLSX_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            self.stream.close()
+
 
 class XLSXReportController(http.Controller):
     @http.route("/xlsx_report", type="http", auth="user", methods=["POST"], csrf=False)
-    def get_report_xlsx(self, model, data, output_format, report_name, report_action):
+    def get_report_xlsx(
+        self, model, output_format, report_name, report_action, data=None, options=None
+    ):
         """Generate an XLSX report based on the provided data and return it as
         a response.
             Args:
                 model (str): The name of the model on which the report is based.
                 data (str): The data required for generating the report.
+                options (str): JSON with the filters of the report, used
+                instead of ``data`` to rebuild the data on the server.
                 output_format (str): The desired output format for the report
                 (e.g., 'xlsx').
                 report_name (str): The name to be given to the generated report
@@ -47,8 +78,20 @@ class XLSXReportController(http.Controller):
         token = "dummy-because-api-expects-one"
         try:
             if output_format == "xlsx":
+                if options:
+                    # El reporte se recalcula (o se lee de la caché) aquí
+                    data = report_obj._get_xlsx_data(json.loads(options))
+                output = XlsxStreamingOutput()
+                try:
+                    report_obj.get_xlsx_report(
+                        data, output, report_name, report_action
+                    )
+                except Exception:
+                    output.stream.close()
+                    raise
+                # Sin Content-Length la respuesta se envía por bloques
                 response = request.make_response(
-                    None,
+                    output.iter_chunks(),
                     headers=[
                         ("Content-Type", "application/vnd.ms-excel"),
                         (
@@ -57,7 +100,7 @@ class XLSXReportController(http.Controller):
                         ),
                     ],
                 )
-                report_obj.get_xlsx_report(data, response, report_name, report_action)
+                response.direct_passthrough = True
             response.set_cookie("fileToken", token)
             return response
         except Exception as e:
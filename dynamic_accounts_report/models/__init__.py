@@ -18,11 +18,24 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 ################################################################################
+from . import account_balance_snapshot
+from . import report_cache
+from . import report_export
+from . import report_domain_mixin
+from . import report_filter_catalog
+from . import report_xlsx_mixin
+from . import account_account
+from . import account_analytic_account
+from . import account_journal
+from . import account_move
+from . import account_move_line
 from . import account_general_ledger
 from . import account_partner_ledger
 from . import account_trial_balance
+from . import aged_report_mixin
 from . import aged_payable_report
 from . import aged_receivable_report
+from . import book_report_mixin
 from . import bank_book_report
 from . import cash_book_report
 from . import dynamic_balance_sheet_report
@@ -0,0 +1,231 @@
+################################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>).
+#    Author: Ammu Raj (odoo@cybrosys.com)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+################################################################################
+from odoo import api, fields, models, tools
+from odoo.tools import date_utils
+
+# Parámetro que indica que la tabla de saldos ya fue construida.
+SNAPSHOT_READY_PARAM = "dynamic_accounts_report.balance_snapshot_ready"
+
+
+class AccountBalanceSnapshot(models.Model):
+    """Monthly debit and credit of the posted journal items.
+
+    One row per company, account, journal, partner and month. Posting,
+    resetting to draft or deleting journal entries only appends their
+    amounts to account.balance.snapshot.delta, and a scheduled action folds
+    the queue into these rows, so concurrent postings never wait for each
+    other on a shared row. Another scheduled action rebuilds the table. The
+    balance before a date is the sum of the months before its month, the
+    deltas not folded yet and the items of its month dated before it.
+    """
+
+    _name = "account.balance.snapshot"
+    _description = "Monthly Account Balance Snapshot"
+    _log_access = False
+
+    company_id = fields.Many2one("res.company", required=True, readonly=True)
+    account_id = fields.Many2one("account.account", required=True, readonly=True)
+    journal_id = fields.Many2one("account.journal", required=True, readonly=True)
+    partner_id = fields.Many2one("res.partner", readonly=True)
+    month = fields.Date(required=True, readonly=True, help="First day of the month.")
+    debit = fields.Float(readonly=True)
+    credit = fields.Float(readonly=True)
+
+    def init(self):
+        tools.create_unique_index(
+            self._cr,
+            "account_balance_snapshot_unique_idx",
+            self._table,
+            [
+                "company_id",
+                "account_id",
+                "journal_id",
+                "COALESCE(partner_id, 0)",
+                "month",
+            ],
+        )
+
+    @api.model
+    def _is_ready(self):
+        """Whether the snapshot table has been built and can be used."""
+        return bool(
+            self.env["ir.config_parameter"].sudo().get_param(SNAPSHOT_READY_PARAM)
+        )
+
+    @api.model
+    def _rebuild(self):
+        """Recompute the whole table from the posted journal items."""
+        self.env["account.move.line"].flush_model()
+        delta_table = self.env["account.balance.snapshot.delta"]._table
+        # Los movimientos pendientes ya están incluidos en las líneas
+        self.env.cr.execute(f"DELETE FROM {delta_table}")
+        self.env.cr.execute(f"DELETE FROM {self._table}")
+        self.env.cr.execute(
+            f"""
+            INSERT INTO {self._table}
+                   (company_id, account_id, journal_id, partner_id, month,
+                    debit, credit)
+            {self._get_lines_query("aml.parent_state = 'posted'")}
+            """,
+            {"sign": 1},
+        )
+        self.invalidate_model()
+        self.env["ir.config_parameter"].sudo().set_param(SNAPSHOT_READY_PARAM, "1")
+
+    @api.model
+    def _apply_moves(self, moves, sign):
+        """
+        Queue the addition (``sign`` 1) or removal (``sign`` -1) of the
+        journal items of posted journal entries, and wake up the scheduled
+        action that folds the queue into the snapshot rows.
+        """
+        if not moves:
+            return
+        self.env["account.move.line"].flush_model()
+        delta = self.env["account.balance.snapshot.delta"]
+        # Solo inserciones: no se bloquea ninguna fila compartida
+        self.env.cr.execute(
+            f"""
+            INSERT INTO {delta._table}
+                   (company_id, account_id, journal_id, partner_id, month,
+                    debit, credit)
+            {self._get_lines_query("aml.move_id = ANY(%(move_ids)s)")}
+            """,
+            {"move_ids": moves.ids, "sign": sign},
+        )
+        delta.invalidate_model()
+        self.env.ref(
+            "dynamic_accounts_report.ir_cron_apply_balance_snapshot_deltas"
+        ).sudo()._trigger()
+
+    @api.model
+    def _get_lines_query(self, condition):
+        """SELECT aggregating the journal items matching ``condition`` per
+        snapshot row, multiplied by the ``sign`` query parameter."""
+        return f"""
+            SELECT aml.company_id, aml.account_id, aml.journal_id,
+                   aml.partner_id, date_trunc('month', aml.date)::date,
+                   %(sign)s * SUM(aml.debit), %(sign)s * SUM(aml.credit)
+              FROM account_move_line aml
+             WHERE {condition}
+          GROUP BY aml.company_id, aml.account_id, aml.journal_id,
+                   aml.partner_id, date_trunc('month', aml.date)
+        """
+
+    @api.model
+    def _apply_deltas(self):
+        """Fold the queued deltas into the snapshot rows, called by the
+        scheduled action. The rows are locked in a fixed order."""
+        delta_table = self.env["account.balance.snapshot.delta"]._table
+        self.env.cr.execute(
+            f"""
+            WITH applied AS (
+                DELETE FROM {delta_table}
+                  RETURNING company_id, account_id, journal_id, partner_id,
+                            month, debit, credit
+            )
+            INSERT INTO {self._table}
+                   (company_id, account_id, journal_id, partner_id, month,
+                    debit, credit)
+            SELECT company_id, account_id, journal_id, partner_id, month,
+                   SUM(debit), SUM(credit)
+              FROM applied
+          GROUP BY company_id, account_id, journal_id, partner_id, month
+          ORDER BY company_id, account_id, journal_id,
+                   COALESCE(partner_id, 0), month
+                ON CONFLICT (company_id, account_id, journal_id,
+                             COALESCE(partner_id, 0), month)
+         DO UPDATE SET debit = {self._table}.debit + EXCLUDED.debit,
+                       credit = {self._table}.credit + EXCLUDED.credit
+            """
+        )
+        self.invalidate_model()
+        self.env["account.balance.snapshot.delta"].invalidate_model()
+
+    @api.model
+    def _get_balances_before(
+        self, date, group_by, account_ids=None, journal_ids=None, partner_ids=None
+    ):
+        """
+        Sum the posted journal items dated before ``date``, per ``group_by``,
+        from the snapshot rows and queued deltas of the previous months plus
+        the items of the month of ``date``.
+
+        :param date date: Items dated before it are summed.
+        :param str group_by: 'account_id' or 'partner_id'.
+        :param list[int] account_ids: Optional accounts to restrict on.
+        :param list[int] journal_ids: Optional journals to restrict on.
+        :param list[int] partner_ids: Optional partners to restrict on.
+        :return: Dictionary {group id: (debit, credit)}, or None when the
+            snapshot table is not built yet.
+        :rtype: dict
+        """
+        if not self._is_ready():
+            return None
+        month_start = date_utils.start_of(fields.Date.to_date(date), "month")
+        domain = [("company_id", "in", self.env.companies.ids)]
+        if account_ids:
+            domain.append(("account_id", "in", account_ids))
+        if journal_ids:
+            domain.append(("journal_id", "in", journal_ids))
+        if partner_ids:
+            domain.append(("partner_id", "in", partner_ids))
+        line_domain = domain + [
+            ("parent_state", "=", "posted"),
+            ("date", ">=", month_start),
+            ("date", "<", date),
+        ]
+        balances = {}
+        month_domain = domain + [("month", "<", month_start)]
+        for model, model_domain in (
+            (self, month_domain),
+            (self.env["account.balance.snapshot.delta"], month_domain),
+            (self.env["account.move.line"], line_domain),
+        ):
+            for group in model.read_group(
+                model_domain, ["debit:sum", "credit:sum"], [group_by]
+            ):
+                if not group[group_by]:
+                    continue
+                debit, credit = balances.get(group[group_by][0], (0.0, 0.0))
+                balances[group[group_by][0]] = (
+                    debit + (group["debit"] or 0.0),
+                    credit + (group["credit"] or 0.0),
+                )
+        return balances
+
+
+class AccountBalanceSnapshotDelta(models.Model):
+    """Signed amounts of the journal entries posted, reset to draft or
+    deleted since the scheduled action last folded them into
+    account.balance.snapshot."""
+
+    _name = "account.balance.snapshot.delta"
+    _description = "Monthly Account Balance Snapshot Pending Change"
+    _log_access = False
+
+    company_id = fields.Many2one("res.company", required=True, readonly=True)
+    account_id = fields.Many2one("account.account", required=True, readonly=True)
+    journal_id = fields.Many2one("account.journal", required=True, readonly=True)
+    partner_id = fields.Many2one("res.partner", readonly=True)
+    month = fields.Date(required=True, readonly=True, help="First day of the month.")
+    debit = fields.Float(readonly=True)
+    credit = fields.Float(readonly=True)
@@ -1,204 +1,279 @@
-import calendar
-import io
-import json
-from datetime import datetime
+from odoo import api, models
+from odoo.exceptions import UserError
 
-import xlsxwriter
-from dateutil.relativedelta import relativedelta
+from .report_perf import report_perf
+
+# Número de líneas por página en el modo diferido del libro mayor.
+LINE_PAGE_SIZE = 80
 
-from odoo import api, fields, models
-from odoo.tools import date_utils
-from odoo.exceptions import UserError
 
 class AccountGeneralLedger(models.TransientModel):
     """For creating General Ledger report"""
 
     _name = "account.general.ledger"
+    _inherit = ["report.domain.mixin", "report.xlsx.mixin"]
     _description = "General Ledger Report"
+    _xlsx_constant_memory = True
 
     @api.model
+    @report_perf
     def view_report(self, journal_id=None, date_range=None, *args, **kwargs):
-        """Retorna catálogos iniciales para el front (sin datos de líneas)."""
-        # 1) Diarios activos de la compañía
-        journal_ids = self.env["account.journal"].search_read(
-            [("company_id", "=", self.env.company.id), ("active", "=", True)],
-            ["name", "code", "type"],
-        )
-
-        # 2) Cuentas analíticas activas de la compañía
-        analytic_ids = self.env["account.analytic.account"].search_read(
-            [("company_id", "=", self.env.company.id), ("active", "=", True)],
-            ["name"],
-        )
-
-        # 3) Cuentas contables no deprecadas (OJO: aquí no existe 'active')
-        account_ids = self.env["account.account"].search_read(
-            [("company_id", "=", self.env.company.id), ("deprecated", "=", False)],
-            ["name", "code"],
-            order="code asc",
-        )
+        """Carga inicial del front: sin datos de líneas. Los catálogos de
+        los filtros se piden una sola vez con ``get_filter_catalogs``."""
+        return {"account_totals": {}}
 
-        return {
-            "journal_ids": journal_ids,
-            "analytic_ids": analytic_ids,
-            "account_ids": account_ids,
-            "account_totals": {},  # vacío inicialmente
-        }
     @api.model
-    def get_filter_values(
+    def _get_domain(
         self, journal_id, date_range, options, analytic, method, account_ids=None
     ):
+        """Construye el dominio de account.move.line común a todas las
+        consultas del libro mayor a partir de los filtros del front."""
         if not date_range:
             raise UserError("Please select a date range")
         elif ('start_date' in date_range) ^ ('end_date' in date_range):
             raise UserError("Debes especificar tanto start_date como end_date.")
 
+        date_from, date_to = self._get_date_bounds(date_range)
+        return self._get_move_line_domain(
+            self._get_move_states(options),
+            date_from=date_from,
+            date_to=date_to,
+            journal_ids=journal_id,
+            account_ids=account_ids,
+            analytic_ids=analytic,
+            cash_basis=bool(method) and "cash" in method,
+        )
+
+    @api.model
+    @report_perf
+    def get_filter_values(
+        self, journal_id, date_range, options, analytic, method, account_ids=None
+    ):
+        domain = self._get_domain(
+            journal_id, date_range, options, analytic, method, account_ids
+        )
+        return self._get_cached_domain_report(
+            domain, "lines", lambda: self._get_account_data(domain)
+        )
+
+    @api.model
+    def _get_account_data(self, domain):
+        """Líneas del dominio agrupadas por nombre de cuenta, más sus totales
+        bajo la clave 'account_totals' (si hay alguna línea)."""
         account_dict = {}
         account_totals = {}
-        today = fields.Date.today()
-        quarter_start, quarter_end = date_utils.get_quarter(today)
-        previous_quarter_start = quarter_start - relativedelta(months=3)
-        previous_quarter_end = quarter_start - relativedelta(days=1)
-        if options == {}:
-            options = None
-        if options is None:
-            option_domain = ["posted"]
-        elif "draft" in options:
-            option_domain = ["posted", "draft"]
-        domain = (
-            [
-                ("journal_id", "in", journal_id),
-                ("parent_state", "in", option_domain),
-            ]
-            if journal_id
-            else [
-                ("parent_state", "in", option_domain),
-            ]
+        # Una sola lectura de todas las líneas; la agrupación por cuenta se
+        # hace en memoria en una pasada.
+        move_lines = self.env["account.move.line"].search_read(
+            domain, self._get_move_line_fields()
+        )
+        analytic_names = self._get_analytic_names(move_lines)
+        currency_id = self.env.company.currency_id.symbol
+        for move_line in move_lines:
+            account_name = move_line["account_id"][1]
+            self._set_analytic_id(move_line, analytic_names)
+            if account_name not in account_totals:
+                account_dict[account_name] = []
+                account_totals[account_name] = {
+                    "total_debit": 0.0,
+                    "total_credit": 0.0,
+                    "currency_id": currency_id,
+                    "account_id": move_line["account_id"][0],
+                }
+            account_dict[account_name].append(move_line)
+            account_totals[account_name]["total_debit"] += move_line["debit"]
+            account_totals[account_name]["total_credit"] += move_line["credit"]
+        for total in account_totals.values():
+            total["total_debit"] = round(total["total_debit"], 2)
+            total["total_credit"] = round(total["total_credit"], 2)
+        if account_totals:
+            account_dict["account_totals"] = account_totals
+        return account_dict
+
+    @api.model
+    @report_perf
+    def get_account_totals(
+        self, journal_id, date_range, options, analytic, method, account_ids=None
+    ):
+        """Primera fase del modo diferido: devuelve sólo los totales por
+        cuenta (débito, crédito y número de líneas) agregados en la base de
+        datos, sin enviar las líneas al front.
+        """
+        domain = self._get_domain(
+            journal_id, date_range, options, analytic, method, account_ids
+        )
+        return {
+            "account_totals": self._get_cached_domain_report(
+                domain, "totals", lambda: self._get_account_totals(domain)
+            )
+        }
+
+    @api.model
+    def _get_account_totals(self, domain):
+        """Totales por nombre de cuenta de las líneas del dominio."""
+        currency_id = self.env.company.currency_id.symbol
+        groups = self.env["account.move.line"].read_group(
+            domain, ["debit:sum", "credit:sum"], ["account_id"]
+        )
+        return {
+            group["account_id"][1]: {
+                "total_debit": round(group["debit"] or 0.0, 2),
+                "total_credit": round(group["credit"] or 0.0, 2),
+                "line_count": group["account_id_count"],
+                "currency_id": currency_id,
+                "account_id": group["account_id"][0],
+            }
+            for group in groups
+        }
+
+    @api.model
+    @report_perf
+    def get_account_lines(
+        self,
+        account_id,
+        journal_id,
+        date_range,
+        options,
+        analytic,
+        method,
+        last_line=None,
+        limit=LINE_PAGE_SIZE,
+    ):
+        """Segunda fase del modo diferido: devuelve una página de líneas de
+        una cuenta, paginando por (date, id) descendente.
+
+        :param int account_id: cuenta desplegada por el usuario.
+        :param dict last_line: ``{"date", "id"}`` de la última línea de la
+            página anterior, o None para la primera página.
+        :param int limit: tamaño de página.
+        :return: ``{"lines": [...], "next": {"date", "id"} | False}``.
+        """
+        domain = self._get_domain(
+            journal_id, date_range, options, analytic, method, [account_id]
         )
-        if account_ids:
-            domain += [("account_id", "in", account_ids)]
-        if method == {}:
-            method = None
-        if method is not None and "cash" in method:
+        if last_line:
             domain += [
-                ("journal_id", "in", self.env.company.tax_cash_basis_journal_id.ids),
+                "|",
+                ("date", "<", last_line["date"]),
+                "&",
+                ("date", "=", last_line["date"]),
+                ("id", "<", last_line["id"]),
             ]
-        if analytic:
-            analytic_line = (
-                self.env["account.analytic.line"]
-                .search([("account_id", "in", analytic)])
-                .mapped("id")
-            )
-            domain += [("analytic_line_ids", "in", analytic_line)]
-        if date_range:
-            if date_range == "month":
-                domain += [("date", ">=", today.replace(day=1)), ("date", "<=", today)]
-            elif date_range == "year":
-                domain += [
-                    ("date", ">=", today.replace(month=1, day=1)),
-                    ("date", "<=", today),
-                ]
-            elif date_range == "quarter":
-                domain += [("date", ">=", quarter_start), ("date", "<=", quarter_end)]
-            elif date_range == "last-month":
-                last_month_start = today.replace(day=1) - relativedelta(months=1)
-                last_month_end = last_month_start + relativedelta(
-                    day=calendar.monthrange(
-                        last_month_start.year, last_month_start.month
-                    )[1]
-                )
-                domain += [
-                    ("date", ">=", last_month_start),
-                    ("date", "<=", last_month_end),
-                ]
-            elif date_range == "last-year":
-                last_year_start = today.replace(month=1, day=1) - relativedelta(years=1)
-                last_year_end = last_year_start.replace(month=12, day=31)
-                domain += [
-                    ("date", ">=", last_year_start),
-                    ("date", "<=", last_year_end),
-                ]
-            elif date_range == "last-quarter":
-                domain += [
-                    ("date", ">=", previous_quarter_start),
-                    ("date", "<=", previous_quarter_end),
-                ]
-            elif "start_date" in date_range and "end_date" in date_range:
-                start_date = datetime.strptime(
-                    date_range["start_date"], "%Y-%m-%d"
-                ).date()
-                end_date = datetime.strptime(date_range["end_date"], "%Y-%m-%d").date()
-                domain += [("date", ">=", start_date), ("date", "<=", end_date)]
-            elif "start_date" in date_range:
-                start_date = datetime.strptime(
-                    date_range["start_date"], "%Y-%m-%d"
-                ).date()
-                domain += [("date", ">=", start_date)]
-            elif "end_date" in date_range:
-                end_date = datetime.strptime(date_range["end_date"], "%Y-%m-%d").date()
-                domain += [("date", "<=", end_date)]
-        move_line_ids = self.env["account.move.line"].search(domain)
-        move_line_ids.mapped("account_id")
-        account_ids = move_line_ids.mapped("account_id")
-        account_dict["journal_ids"] = self.env["account.journal"].search_read(
-             [("company_id", "=", self.env.company.id), ("active", "=", True)],
-             ["name", "code", "type"]
+        move_lines = self.env["account.move.line"].search_read(
+            domain,
+            self._get_move_line_fields(),
+            limit=limit,
+            order="date desc, id desc",
         )
-        account_dict["analytic_ids"] = self.env["account.analytic.account"].search_read(
-            [("company_id", "=", self.env.company.id), ("active", "=", True)],
-            ["name"]
+        analytic_names = self._get_analytic_names(move_lines)
+        for move_line in move_lines:
+            self._set_analytic_id(move_line, analytic_names)
+        next_line = False
+        if len(move_lines) == limit:
+            next_line = {"date": move_lines[-1]["date"], "id": move_lines[-1]["id"]}
+        return {"lines": move_lines, "next": next_line}
+
+    @api.model
+    def _get_move_line_fields(self):
+        """Campos de account.move.line enviados al front por cada línea."""
+        return [
+            "date",
+            "name",
+            "move_name",
+            "debit",
+            "credit",
+            "partner_id",
+            "account_id",
+            "journal_id",
+            "analytic_distribution",
+            "move_id",
+            "analytic_line_ids",
+        ]
+
+    @api.model
+    def _set_analytic_id(self, move_line, analytic_names):
+        """Añade ``analytic_id`` ([id, nombre] o False) a una línea leída."""
+        analytic_account_id = False
+        if move_line["analytic_distribution"]:
+            analytic_account_id = int(next(iter(move_line["analytic_distribution"])))
+        move_line["analytic_id"] = (
+            [analytic_account_id, analytic_names.get(analytic_account_id, "")]
+            if analytic_account_id
+            else False
         )
-        account_dict["account_ids"] = self.env['account.account'].search_read(
-             [("company_id", "=", self.env.company.id), ("deprecated", "=", False)],
-             ["name", "code"],
-             order="code asc"
+
+    @api.model
+    def _get_analytic_names(self, move_lines):
+        """Resuelve en una sola consulta el nombre de la primera cuenta
+        analítica de la distribución de cada línea.
+
+        :param list[dict] move_lines: líneas leídas con analytic_distribution.
+        :return: diccionario {id cuenta analítica: nombre}.
+        """
+        analytic_ids = {
+            int(next(iter(line["analytic_distribution"])))
+            for line in move_lines
+            if line["analytic_distribution"]
+        }
+        if not analytic_ids:
+            return {}
+        analytic_accounts = (
+            self.env["account.analytic.account"].browse(analytic_ids).exists()
         )
-        
-        for account in account_ids:
-            move_line_id = move_line_ids.filtered(lambda x: x.account_id == account)
-            move_line_list = []
-            for move_line in move_line_id:
-                move_line_data = move_line.read(
-                    [
-                        "date",
-                        "name",
-                        "move_name",
-                        "debit",
-                        "credit",
-                        "partner_id",
-                        "account_id",
-                        "journal_id",
-                        "analytic_distribution",
-                        "move_id",
-                        "analytic_line_ids",
-                    ]
+        return {account.id: account.name for account in analytic_accounts}
+
+    def _set_analytic_labels(self, account_data):
+        """Añade ``_analytic_label`` (nombres de las cuentas analíticas de sus
+        apuntes, separados por comas) a cada línea agrupada por cuenta."""
+        line_ids = {
+            line_id
+            for lines in account_data.values()
+            for line in lines
+            for line_id in line["analytic_line_ids"]
+        }
+        analytic_lines = self.env["account.analytic.line"].browse(line_ids).exists()
+        names = {line.id: line.account_id.name or "" for line in analytic_lines}
+        for lines in account_data.values():
+            for line in lines:
+                labels = [names.get(line_id) for line_id in line["analytic_line_ids"]]
+                line["_analytic_label"] = ", ".join(
+                    dict.fromkeys(label for label in labels if label)
                 )
-                analytic_account_id = False
-                analytic_account_name = ""
-                if move_line.analytic_distribution:
-                    analytic_account_id = int(list(move_line.analytic_distribution.keys())[0])
-                    analytic_account = self.env['account.analytic.account'].browse(analytic_account_id)
-                    analytic_account_name = analytic_account.name if analytic_account.exists() else ""
 
-                move_line_data[0]['analytic_id'] = [analytic_account_id, analytic_account_name] if analytic_account_id else False
-                move_line_list.append(move_line_data[0])
-            account_dict[account.display_name] = move_line_list
-            currency_id = self.env.company.currency_id.symbol
-            account_totals[account.display_name] = {
-                "total_debit": round(sum(move_line_id.mapped("debit")), 2),
-                "total_credit": round(sum(move_line_id.mapped("credit")), 2),
-                "currency_id": currency_id,
-                "account_id": account.id,
-            }
-            account_dict["account_totals"] = account_totals
-        return account_dict
+    @api.model
+    def _get_xlsx_data(self, options):
+        """Datos de la exportación XLSX recalculados (o leídos de la caché)
+        con los mismos argumentos que ``get_filter_values``."""
+        account_data = {}
+        if options.get("args"):
+            domain = self._get_domain(*options["args"])
+            account_data = self._get_cached_domain_report(
+                domain, "lines", lambda: self._get_account_data(domain)
+            )
+        totals = account_data.pop("account_totals", {})
+        self._set_analytic_labels(account_data)
+        return {
+            "account": list(totals),
+            "data": account_data,
+            "total": totals,
+            "filters": options.get("filters", {}),
+            "grand_total": {
+                "currency": self.env.company.currency_id.symbol,
+                "total_debit": round(
+                    sum(total["total_debit"] for total in totals.values()), 2
+                ),
+                "total_credit": round(
+                    sum(total["total_credit"] for total in totals.values()), 2
+                ),
+            },
+        }
 
     @api.model
+    @report_perf
     def get_xlsx_report(self, data, response, report_name, report_action):
        
-        data = json.loads(data)
-        output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output, {"in_memory": True})
+        data = self._load_xlsx_data(data)
+        workbook = self._open_xlsx_workbook(response)
         start_date = (
             data["filters"]["start_date"] if data["filters"]["start_date"] else ""
         )
@@ -247,21 +322,22 @@ class AccountGeneralLedger(models.TransientModel):
         sheet.set_column(2, 2, 15)
         sheet.set_column(3, 3, 15)
         col = 0
+        # Las filas se escriben en orden para poder usar constant_memory
         sheet.write("A1:b1", report_name, head)
         sheet.write("B3:b4", "Date Range", filter_head)
-        sheet.write("B4:b4", "Journals", filter_head)
-        sheet.write("B5:b4", "Analytic", filter_head)
-        sheet.write("B6:b4", "Options", filter_head)
         if start_date or end_date:
             sheet.merge_range("C3:G3", f"{start_date} to {end_date}", filter_body)
+        sheet.write("B4:b4", "Journals", filter_head)
         if data["filters"]["journal"]:
             display_names = [journal for journal in data["filters"]["journal"]]
             display_names_str = ", ".join(display_names)
             sheet.merge_range("C4:G4", display_names_str, filter_body)
+        sheet.write("B5:b4", "Analytic", filter_head)
         if data["filters"]["analytic"]:
             display_names = [analytic for analytic in data["filters"]["analytic"]]
             account_keys_str = ", ".join(display_names)
             sheet.merge_range("C5:G5", account_keys_str, filter_body)
+        sheet.write("B6:b4", "Options", filter_head)
         if data["filters"]["options"]:
             option_keys = list(data["filters"]["options"].keys())
             option_keys_str = ", ".join(option_keys)
@@ -298,16 +374,6 @@ class AccountGeneralLedger(models.TransientModel):
                         data["total"][account]["total_debit"] - data["total"][account]["total_credit"],
                         txt_name,
                     )  # Balance
-
-                    sheet.merge_range(
-                        row,
-                        col + 11,
-                        row,
-                        col + 12,
-                        data["total"][account]["total_debit"]
-                        - data["total"][account]["total_credit"],
-                        txt_name,
-                    )
                     for rec in data["data"].get(account, []):
                         row += 1
                         line = rec[0] if isinstance(rec, (list, tuple)) else rec
@@ -333,8 +399,7 @@ class AccountGeneralLedger(models.TransientModel):
                         sheet.merge_range(row, col + 7, row, col + 8, analytic_label, txt_name)
                         sheet.merge_range(row, col + 9, row, col + 10, debit, txt_name)
                         sheet.merge_range(row, col + 11, row, col + 12, credit, txt_name)
-
-                        sheet.merge_range(row, col + 11, row, col + 12, " ", txt_name)
+                        sheet.merge_range(row, col + 13, row, col + 14, " ", txt_name)
                 row += 1
                 sheet.merge_range(row, col, row, col + 8, "Total", filter_head)
                 sheet.merge_range(
@@ -362,7 +427,4 @@ class AccountGeneralLedger(models.TransientModel):
                     - float(data["grand_total"]["total_credit"]),
                     filter_head,
                 )
-        workbook.close()
-        output.seek(0)
-        response.stream.write(output.read())
-        output.close() 
\ No newline at end of file
+        self._close_xlsx_workbook(workbook, response)
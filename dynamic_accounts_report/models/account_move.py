@@ -0,0 +1,48 @@
+################################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>).
+#    Author: Ammu Raj (odoo@cybrosys.com)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+################################################################################
+from odoo import models
+
+
+class AccountMove(models.Model):
+    """Keep the report caches and balance snapshots in sync with postings"""
+
+    _inherit = "account.move"
+
+    def _post(self, soft=True):
+        posted = super()._post(soft=soft)
+        self.env["dynamic.report.cache"]._invalidate(posted)
+        self.env["account.balance.snapshot"].sudo()._apply_moves(posted, 1)
+        return posted
+
+    def button_draft(self):
+        self._remove_posted_from_reports()
+        return super().button_draft()
+
+    def unlink(self):
+        self._remove_posted_from_reports()
+        return super().unlink()
+
+    def _remove_posted_from_reports(self):
+        """Take the posted entries of ``self`` out of the report caches and
+        balance snapshots before they stop being posted."""
+        posted = self.filtered(lambda move: move.state == "posted")
+        self.env["dynamic.report.cache"]._invalidate(posted)
+        self.env["account.balance.snapshot"].sudo()._apply_moves(posted, -1)
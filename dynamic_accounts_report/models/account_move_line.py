@@ -0,0 +1,182 @@
+################################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>).
+#    Author: Ammu Raj (odoo@cybrosys.com)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+################################################################################
+import json
+import logging
+
+from odoo import api, models, tools
+from odoo.tools import SQL
+
+_logger = logging.getLogger(__name__)
+
+# Índices compuestos de account_move_line usados por los reportes:
+# nombre -> (columnas, condición del índice parcial).
+REPORT_INDEXES = {
+    "account_move_line_dynamic_report_company_state_date_idx": (
+        ["company_id", "parent_state", "date"],
+        "",
+    ),
+    "account_move_line_dynamic_report_account_date_idx": (
+        ["account_id", "date"],
+        "parent_state = 'posted'",
+    ),
+    "account_move_line_dynamic_report_partner_type_idx": (
+        ["partner_id", "account_type"],
+        "partner_id IS NOT NULL",
+    ),
+    "account_move_line_dynamic_report_journal_date_idx": (
+        ["journal_id", "date"],
+        "parent_state = 'posted'",
+    ),
+}
+
+# Campos de los apuntes que muestran los reportes; editarlos en un asiento
+# publicado invalida el caché de resultados.
+REPORT_CACHE_FIELDS = {
+    "account_id",
+    "amount_currency",
+    "analytic_distribution",
+    "balance",
+    "credit",
+    "currency_id",
+    "date_maturity",
+    "debit",
+    "journal_id",
+    "name",
+    "partner_id",
+}
+
+
+class AccountMoveLine(models.Model):
+    """Indexes backing the journal item queries of the dynamic reports and
+    invalidation of their cached results on edits of posted items"""
+
+    _inherit = "account.move.line"
+
+    def write(self, vals):
+        """Drop the cached report results covering the posted items whose
+        report fields are edited."""
+        posted = self.browse()
+        if REPORT_CACHE_FIELDS.intersection(vals):
+            posted = self.filtered(lambda line: line.parent_state == "posted")
+        res = super().write(vals)
+        if posted:
+            self.env["dynamic.report.cache"]._invalidate(posted.move_id)
+        return res
+
+    @api.model
+    def _create_report_indexes(self):
+        """Create the missing composite and partial indexes of
+        ``REPORT_INDEXES``; existing ones are left untouched."""
+        for name, (columns, where) in REPORT_INDEXES.items():
+            tools.create_index(self._cr, name, self._table, columns, where=where)
+
+    @api.model
+    def _check_report_indexes(self):
+        """
+        Run ``EXPLAIN`` on the journal item queries of the reports and log the
+        ones the planner still answers with a sequential scan of
+        account_move_line.
+
+        The planner prefers sequential scans on small tables, so the check is
+        only meaningful on a database with production volumes.
+
+        :return: One dictionary per query with its 'name', whether it uses a
+            'seq_scan' and the node types of its 'plan'.
+        :rtype: list[dict]
+        """
+        results = []
+        for name, domain in self._get_report_check_domains():
+            query = self._search(domain)
+            self.env.cr.execute(SQL("EXPLAIN (FORMAT JSON) %s", query.select()))
+            plan = self.env.cr.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            nodes = list(self._iter_plan_nodes(plan[0]["Plan"]))
+            seq_scan = any(
+                node["Node Type"] == "Seq Scan"
+                and node.get("Relation Name") == self._table
+                for node in nodes
+            )
+            if seq_scan:
+                _logger.warning(
+                    "Report query %r still scans %s sequentially", name, self._table
+                )
+            results.append(
+                {
+                    "name": name,
+                    "seq_scan": seq_scan,
+                    "plan": [node["Node Type"] for node in nodes],
+                }
+            )
+        return results
+
+    @api.model
+    def _get_report_check_domains(self):
+        """Return (name, domain) pairs mirroring the filters the report
+        engines apply, for the records found in the current database."""
+        domain_mixin = self.env["report.domain.mixin"]
+        date_from, date_to = domain_mixin._get_date_bounds("year")
+        posted = ["posted"]
+        domains = [
+            (
+                "company_state_date",
+                domain_mixin._get_move_line_domain(posted, date_from, date_to),
+            )
+        ]
+        account = self.env["account.account"].search([], limit=1)
+        if account:
+            domains.append(
+                (
+                    "account_date",
+                    domain_mixin._get_move_line_domain(
+                        posted, date_from, date_to, account_ids=account.ids
+                    ),
+                )
+            )
+        partner = self.search([("partner_id", "!=", False)], limit=1).partner_id
+        if partner:
+            account_types = ["asset_receivable", "liability_payable"]
+            domains.append(
+                (
+                    "partner_account_type",
+                    domain_mixin._get_move_line_domain(posted, partner_ids=partner.ids)
+                    + [("account_type", "in", account_types)],
+                )
+            )
+        journal = self.env["account.journal"].search([], limit=1)
+        if journal:
+            domains.append(
+                (
+                    "journal_date",
+                    domain_mixin._get_move_line_domain(
+                        posted, date_from, date_to, journal_ids=journal.ids
+                    ),
+                )
+            )
+        return domains
+
+    @api.model
+    def _iter_plan_nodes(self, node):
+        """Yield a node of an ``EXPLAIN (FORMAT JSON)`` plan and its
+        descendants."""
+        yield node
+        for child in node.get("Plans", []):
+            yield from self._iter_plan_nodes(child)
@@ -18,17 +18,11 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 ################################################################################
-import io
-import json
-from datetime import datetime
-
-import xlsxwriter
-from dateutil.relativedelta import relativedelta
-
-from odoo import api, fields, models
-from odoo.tools import date_utils
+from odoo import api, models
 import logging
 
+from .report_perf import report_perf
+
 _logger = logging.getLogger(__name__)
 
 
@@ -36,9 +30,11 @@ class AccountPartnerLedger(models.TransientModel):
     """For creating Partner Ledger report"""
 
     _name = "account.partner.ledger"
+    _inherit = ["report.domain.mixin", "report.xlsx.mixin"]
     _description = "Partner Ledger Report"
 
     @api.model
+    @report_perf
     def view_report(self, option, tag):
         """
         Retrieve partner-related data for generating a report.
@@ -52,75 +48,18 @@ class AccountPartnerLedger(models.TransientModel):
         :return: A dictionary containing the partner data for the report.
         :rtype: dict
         """
-        fiscal_year = (
-            self.env["res.company"]
-            .search([])
-            .mapped("account_opening_date")[0]
-            .strftime("%Y-%m-%d")
-        )
-        fiscal_year_start = datetime.strptime(fiscal_year, "%Y-%m-%d").date()
-        partner_dict = {}
-        partner_totals = {}
-        move_line_ids = self.env["account.move.line"].search(
-            [
-                ("account_type", "in", ["liability_payable", "asset_receivable"]),
-                ("parent_state", "=", "posted"),
-            ]
+        account_type_domain = ["liability_payable", "asset_receivable"]
+        option_domain = ["posted"]
+        partner_ids = self._get_ledger_partner_ids(account_type_domain, option_domain)
+        return self._get_ledger_data(
+            partner_ids,
+            account_type_domain,
+            option_domain,
+            opening_date=self._get_opening_date(),
         )
-        partner_ids = move_line_ids.mapped("partner_id")
-        for partner in partner_ids:
-            total_debit_balance = 0
-            total_credit_balance = 0
-            balance = 0
-            move_line_id = move_line_ids.filtered(lambda x: x.partner_id == partner)
-            move_line_list = []
-            for move_line in move_line_id:
-                if move_line.invoice_date:
-                    if move_line.invoice_date < fiscal_year_start:
-                        total_debit_balance += move_line.debit
-                        total_credit_balance += move_line.credit
-                        balance = total_debit_balance - total_credit_balance
-                move_line_data = move_line.read(
-                    [
-                        "date",
-                        "move_name",
-                        "account_type",
-                        "debit",
-                        "credit",
-                        "date_maturity",
-                        "account_id",
-                        "journal_id",
-                        "move_id",
-                        "matching_number",
-                        "amount_currency",
-                    ]
-                )
-                account_code = (
-                    self.env["account.account"].browse(move_line.account_id.id).code
-                )
-                journal_code = (
-                    self.env["account.journal"].browse(move_line.journal_id.id).code
-                )
-                if account_code:
-                    move_line_data[0]["jrnl"] = journal_code
-                    move_line_data[0]["code"] = account_code
-                move_line_list.append(move_line_data)
-            partner_dict[partner.name] = move_line_list
-            currency_id = self.env.company.currency_id.symbol
-            partner_totals[partner.name] = {
-                "total_debit": round(sum(move_line_id.mapped("debit")), 2),
-                "total_credit": round(sum(move_line_id.mapped("credit")), 2),
-                "currency_id": currency_id,
-                "initial_balance": balance,
-                "partner_id": partner.id,
-                "move_name": "Initial Balance",
-                "initial_debit": total_debit_balance,
-                "initial_credit": total_credit_balance,
-            }
-            partner_dict["partner_totals"] = partner_totals
-        return partner_dict
 
     @api.model
+    @report_perf
     def get_filter_values(self, partner_id, data_range, account, options):
         """
         Retrieve filtered partner-related data for generating a report.
@@ -140,15 +79,10 @@ class AccountPartnerLedger(models.TransientModel):
         :return: A dictionary containing the filtered partner data.
         :rtype: dict
         """
-        if options == {}:
-            options = None
         if account == {}:
             account = None
         account_type_domain = []
-        if options is None:
-            option_domain = ["posted"]
-        elif "draft" in options:
-            option_domain = ["posted", "draft"]
+        option_domain = self._get_move_states(options)
         if account is None or ("Receivable" in account and "Payable" in account):
             account_type_domain.append("liability_payable")
             account_type_domain.append("asset_receivable")
@@ -156,23 +90,9 @@ class AccountPartnerLedger(models.TransientModel):
             account_type_domain.append("asset_receivable")
         elif "Payable" in account:
             account_type_domain.append("liability_payable")
-        partner_dict = {}
-        partner_totals = {}
-        today = fields.Date.today()
-        quarter_start, quarter_end = date_utils.get_quarter(today)
-        previous_quarter_start = quarter_start - relativedelta(months=3)
-        previous_quarter_end = quarter_start - relativedelta(days=1)
         if not partner_id:
-            partner_id = (
-                self.env["account.move.line"]
-                .search(
-                    [
-                        ("account_type", "in", account_type_domain),
-                        ("parent_state", "in", option_domain),
-                    ]
-                )
-                .mapped("partner_id")
-                .ids
+            partner_id = self._get_ledger_partner_ids(
+                account_type_domain, option_domain
             )
         if isinstance(partner_id, str):
             partner_ids = (
@@ -183,297 +103,247 @@ class AccountPartnerLedger(models.TransientModel):
         elif isinstance(partner_id, int):
             partner_id = [partner_id]
 
-        for partners in partner_id:
-            partner = self.env["res.partner"].browse(partners).name
-            balance_move_line_ids = self.env["account.move.line"].browse([])
-            if data_range:
-                if data_range == "month":
-                    move_line_ids = (
-                        self.env["account.move.line"]
-                        .search(
-                            [
-                                ("partner_id", "=", partners),
-                                ("account_type", "in", account_type_domain),
-                                ("parent_state", "in", option_domain),
-                            ]
-                        )
-                        .filtered(lambda x: x.date.month == fields.Date.today().month)
-                    )
-                    date_start = fields.Date.today().replace(day=1)
-                    balance_move_line_ids = self.env["account.move.line"].search(
-                        [
-                            ("partner_id", "=", partners),
-                            ("account_type", "in", account_type_domain),
-                            ("parent_state", "in", option_domain),
-                            ("invoice_date", "<", date_start),
-                        ]
-                    )
-                elif data_range == "year":
-                    move_line_ids = (
-                        self.env["account.move.line"]
-                        .search(
-                            [
-                                ("partner_id", "=", partners),
-                                ("account_type", "in", account_type_domain),
-                                ("parent_state", "in", option_domain),
-                            ]
-                        )
-                        .filtered(lambda x: x.date.year == fields.Date.today().year)
-                    )
-                    date_start = fields.Date.today().replace(month=1, day=1)
-                    balance_move_line_ids = self.env["account.move.line"].search(
-                        [
-                            ("partner_id", "=", partners),
-                            ("account_type", "in", account_type_domain),
-                            ("parent_state", "in", option_domain),
-                            ("invoice_date", "<", date_start),
-                        ]
-                    )
-                elif data_range == "quarter":
-                    move_line_ids = self.env["account.move.line"].search(
-                        [
-                            ("partner_id", "=", partners),
-                            ("account_type", "in", account_type_domain),
-                            ("date", ">=", quarter_start),
-                            ("date", "<=", quarter_end),
-                            ("parent_state", "in", option_domain),
-                        ]
-                    )
-                    date_start = quarter_start
-                    balance_move_line_ids = self.env["account.move.line"].search(
-                        [
-                            ("partner_id", "=", partners),
-                            ("account_type", "in", account_type_domain),
-                            ("parent_state", "in", option_domain),
-                            ("invoice_date", "<", date_start),
-                        ]
-                    )
-                elif data_range == "last-month":
-                    move_line_ids = (
-                        self.env["account.move.line"]
-                        .search(
-                            [
-                                ("partner_id", "=", partners),
-                                ("account_type", "in", account_type_domain),
-                                ("parent_state", "in", option_domain),
-                            ]
-                        )
-                        .filtered(
-                            lambda x: x.date.month == fields.Date.today().month - 1
-                        )
-                    )
-                    date_start = fields.Date.today().replace(
-                        day=1, month=fields.Date.today().month - 1
-                    )
-                    balance_move_line_ids = self.env["account.move.line"].search(
-                        [
-                            ("partner_id", "=", partners),
-                            ("account_type", "in", account_type_domain),
-                            ("parent_state", "in", option_domain),
-                            ("invoice_date", "<", date_start),
-                        ]
-                    )
-                elif data_range == "last-year":
-                    move_line_ids = (
-                        self.env["account.move.line"]
-                        .search(
-                            [
-                                ("partner_id", "=", partners),
-                                ("account_type", "in", account_type_domain),
-                                ("parent_state", "in", option_domain),
-                            ]
-                        )
-                        .filtered(lambda x: x.date.year == fields.Date.today().year - 1)
-                    )
-                    date_start = fields.Date.today().replace(
-                        day=1,
-                        month=1,
-                    )
-                    balance_move_line_ids = self.env["account.move.line"].search(
-                        [
-                            ("partner_id", "=", partners),
-                            ("account_type", "in", account_type_domain),
-                            ("parent_state", "in", option_domain),
-                            ("invoice_date", "<", date_start),
-                        ]
-                    )
-                elif data_range == "last-quarter":
-                    move_line_ids = self.env["account.move.line"].search(
-                        [
-                            ("partner_id", "=", partners),
-                            ("account_type", "in", account_type_domain),
-                            ("date", ">=", previous_quarter_start),
-                            ("date", "<=", previous_quarter_end),
-                            ("parent_state", "in", option_domain),
-                        ]
-                    )
-                    date_start = previous_quarter_start
-                    balance_move_line_ids = self.env["account.move.line"].search(
-                        [
-                            ("partner_id", "=", partners),
-                            ("account_type", "in", account_type_domain),
-                            ("parent_state", "in", option_domain),
-                            ("invoice_date", "<", date_start),
-                        ]
-                    )
-                elif "start_date" in data_range and "end_date" in data_range:
-                    start_date = datetime.strptime(
-                        data_range["start_date"], "%Y-%m-%d"
-                    ).date()
-                    end_date = datetime.strptime(
-                        data_range["end_date"], "%Y-%m-%d"
-                    ).date()
-                    move_line_ids = self.env["account.move.line"].search(
-                        [
-                            ("partner_id", "=", partners),
-                            ("account_type", "in", account_type_domain),
-                            ("date", ">=", start_date),
-                            ("date", "<=", end_date),
-                            ("parent_state", "in", option_domain),
-                        ]
-                    )
-                    date_start = start_date
-                    balance_move_line_ids = self.env["account.move.line"].search(
-                        [
-                            ("partner_id", "=", partners),
-                            ("account_type", "in", account_type_domain),
-                            ("parent_state", "in", option_domain),
-                            ("invoice_date", "<", date_start),
-                        ]
-                    )
-                elif "start_date" in data_range:
-                    start_date = datetime.strptime(
-                        data_range["start_date"], "%Y-%m-%d"
-                    ).date()
-                    move_line_ids = self.env["account.move.line"].search(
-                        [
-                            ("partner_id", "=", partners),
-                            ("account_type", "in", account_type_domain),
-                            ("date", ">=", start_date),
-                            ("parent_state", "in", option_domain),
-                        ]
-                    )
-                    date_start = start_date
-                    balance_move_line_ids = self.env["account.move.line"].search(
-                        [
-                            ("partner_id", "=", partners),
-                            ("account_type", "in", account_type_domain),
-                            ("parent_state", "in", option_domain),
-                            ("invoice_date", "<", date_start),
-                        ]
-                    )
-                elif "end_date" in data_range:
-                    end_date = datetime.strptime(
-                        data_range["end_date"], "%Y-%m-%d"
-                    ).date()
-                    move_line_ids = self.env["account.move.line"].search(
-                        [
-                            ("partner_id", "=", partners),
-                            ("account_type", "in", account_type_domain),
-                            ("date", "<=", end_date),
-                            ("parent_state", "in", option_domain),
-                        ]
-                    )
-                    fiscal_year = (
-                        self.env["res.company"]
-                        .search([])
-                        .mapped("account_opening_date")[0]
-                        .strftime("%Y-%m-%d")
-                    )
-                    date_start = datetime.strptime(fiscal_year, "%Y-%m-%d").date()
-                    balance_move_line_ids = self.env["account.move.line"].search(
-                        [
-                            ("partner_id", "=", partners),
-                            ("account_type", "in", account_type_domain),
-                            ("parent_state", "in", option_domain),
-                            ("invoice_date", "<", date_start),
-                        ]
+        date_from, date_to, opening_date = self._get_ledger_date_bounds(
+            data_range
+        )
+        return self._get_ledger_data(
+            partner_id,
+            account_type_domain,
+            option_domain,
+            date_from=date_from,
+            date_to=date_to,
+            opening_date=opening_date,
+        )
+
+    @api.model
+    def _get_opening_date(self):
+        """Return the accounting opening date of the first company."""
+        return self.env["res.company"].search([]).mapped("account_opening_date")[0]
+
+    @api.model
+    def _get_ledger_date_bounds(self, data_range):
+        """
+        Translate the date range option of the client into the period bounds
+        and the opening date of the ledger.
+
+        :param data_range: Preset name ('month', 'quarter', ...) or a dict with
+            'start_date' and/or 'end_date'.
+        :return: Tuple (date_from, date_to, opening_date); the items dated
+            before ``opening_date`` make up the initial balance. Any of them
+            can be None.
+        :rtype: tuple
+        """
+        if not data_range:
+            return None, None, None
+        date_from, date_to = self._get_date_bounds(data_range)
+        if not date_from:
+            return date_from, date_to, self._get_opening_date()
+        return date_from, date_to, date_from
+
+    @api.model
+    def _get_ledger_partner_ids(self, account_type_domain, option_domain):
+        """Return the partners having payable/receivable journal items."""
+        groups = self.env["account.move.line"].read_group(
+            self._get_move_line_domain(option_domain)
+            + [
+                ("account_type", "in", account_type_domain),
+                ("partner_id", "!=", False),
+            ],
+            ["partner_id"],
+            ["partner_id"],
+        )
+        return [group["partner_id"][0] for group in groups]
+
+    @api.model
+    def _get_initial_balances(
+        self, partner_ids, account_type_domain, option_domain, opening_date
+    ):
+        """
+        Sum the items of each partner dated before the opening date, from the
+        monthly balance snapshot when only posted items are reported.
+
+        :return: Dictionary {partner_id: {'debit': ..., 'credit': ...}}.
+        :rtype: dict
+        """
+        balances = None
+        if option_domain == ["posted"]:
+            accounts = self.env["account.account"].search(
+                [("account_type", "in", account_type_domain)]
+            )
+            if not accounts:
+                return {}
+            balances = self.env["account.balance.snapshot"]._get_balances_before(
+                opening_date,
+                "partner_id",
+                account_ids=accounts.ids,
+                partner_ids=partner_ids,
+            )
+        if balances is None:
+            balances = {
+                group["partner_id"][0]: (group["debit"], group["credit"])
+                for group in self.env["account.move.line"].read_group(
+                    self._get_move_line_domain(
+                        option_domain, partner_ids=partner_ids
                     )
-            else:
-                move_line_ids = self.env["account.move.line"].search(
-                    [
-                        ("partner_id", "=", partners),
+                    + [
                         ("account_type", "in", account_type_domain),
-                        ("parent_state", "in", option_domain),
-                    ]
-                )
-            total_debit_balance = 0
-            total_credit_balance = 0
-            balance = 0
-            move_line_list = []
-
-            # Procesa directamente los movimientos encontrados
-            for move_line in move_line_ids:
-                move_line_data = move_line.read(
-                    [
-                        "date",
-                        "move_name",
-                        "account_type",
-                        "debit",
-                        "credit",
-                        "date_maturity",
-                        "account_id",
-                        "journal_id",
-                        "move_id",
-                        "matching_number",
-                        "amount_currency",
-                    ]
+                        ("date", "<", opening_date),
+                    ],
+                    ["debit:sum", "credit:sum"],
+                    ["partner_id"],
                 )
+            }
+        return {
+            partner_id: {"debit": debit, "credit": credit}
+            for partner_id, (debit, credit) in balances.items()
+        }
 
-                # Obteniendo códigos de cuenta y diario sin necesidad de condiciones extras
-                account_code = (
-                    self.env["account.account"].browse(move_line.account_id.id).code
-                )
-                journal_code = (
-                    self.env["account.journal"].browse(move_line.journal_id.id).code
-                )
+    @api.model
+    def _get_ledger_data(
+        self,
+        partner_ids,
+        account_type_domain,
+        option_domain,
+        date_from=None,
+        date_to=None,
+        opening_date=None,
+    ):
+        """
+        Build the partner ledger: one aggregate for the initial balance of
+        every partner, then one ordered read of the period lines, grouped by
+        partner with a running balance computed on the fly.
+
+        :param list[int] partner_ids: Partners to report on.
+        :param list[str] account_type_domain: Account types to include.
+        :param list[str] option_domain: Accepted parent move states.
+        :param date date_from: Start of the period, or None; the period
+            never starts before ``opening_date``.
+        :param date date_to: End of the period, or None.
+        :param date opening_date: Items dated before this date make up the
+            initial balance; None means no initial balance.
+        :return: A dictionary containing the partner data.
+        :rtype: dict
+        """
+        if not partner_ids:
+            return {"partner_totals": {}}
+        move_line_obj = self.env["account.move.line"]
+        initial_balances = {}
+        if opening_date:
+            initial_balances = self._get_initial_balances(
+                partner_ids, account_type_domain, option_domain, opening_date
+            )
+        # Lo anterior a la apertura ya está en el saldo inicial
+        period_domain = self._get_move_line_domain(
+            option_domain,
+            date_from=date_from or opening_date,
+            date_to=date_to,
+            partner_ids=partner_ids,
+        ) + [("account_type", "in", account_type_domain)]
+        move_lines = move_line_obj.search_read(
+            period_domain,
+            [
+                "date",
+                "move_name",
+                "account_type",
+                "debit",
+                "credit",
+                "date_maturity",
+                "account_id",
+                "journal_id",
+                "move_id",
+                "matching_number",
+                "amount_currency",
+                "partner_id",
+            ],
+            order="partner_id, date, id",
+        )
+        account_codes = {
+            account.id: account.code
+            for account in self.env["account.account"].browse(
+                {line["account_id"][0] for line in move_lines}
+            )
+        }
+        journal_codes = {
+            journal.id: journal.code
+            for journal in self.env["account.journal"].browse(
+                {line["journal_id"][0] for line in move_lines}
+            )
+        }
+        lines_by_partner = {}
+        for move_line in move_lines:
+            lines_by_partner.setdefault(move_line.pop("partner_id")[0], []).append(
+                move_line
+            )
 
-                # Agregar códigos al diccionario
-                if account_code:
-                    move_line_data[0]["code"] = account_code
-                if journal_code:
-                    move_line_data[0]["jrnl"] = journal_code
-
-                # Agregar los datos de cada línea de movimiento
-                move_line_list.append(move_line_data)
-
-            # Calcular el balance de los movimientos previos (si es necesario)
-            for remaining_move in balance_move_line_ids:
-                if (
-                    remaining_move.invoice_date
-                    and remaining_move.invoice_date < date_start
-                ):
-                    total_debit_balance += remaining_move.debit
-                    total_credit_balance += remaining_move.credit
-                    balance = total_debit_balance - total_credit_balance
-
-            # Guardar los resultados en el diccionario del partner
-            _logger.info("move_line_list: %s", move_line_list)
-            partner_dict[partner] = move_line_list
-            _logger.info("partner_dict: %s", partner_dict)
-
-            # Obtener símbolo de la moneda
-            currency_id = self.env.company.currency_id.symbol
-
-            # Calcular totales de débito y crédito
-            partner_totals[partner] = {
-                "total_debit": round(sum(move_line_ids.mapped("debit")), 2),
-                "total_credit": round(sum(move_line_ids.mapped("credit")), 2),
+        partner_dict = {}
+        partner_totals = {}
+        currency_id = self.env.company.currency_id.symbol
+        for partner in self.env["res.partner"].browse(partner_ids):
+            initial = initial_balances.get(partner.id, {})
+            total_debit_balance = initial.get("debit") or 0
+            total_credit_balance = initial.get("credit") or 0
+            balance = total_debit_balance - total_credit_balance
+            running_balance = balance
+            total_debit = 0.0
+            total_credit = 0.0
+            move_line_list = []
+            for move_line in lines_by_partner.get(partner.id, []):
+                if account_codes.get(move_line["account_id"][0]):
+                    move_line["code"] = account_codes[move_line["account_id"][0]]
+                if journal_codes.get(move_line["journal_id"][0]):
+                    move_line["jrnl"] = journal_codes[move_line["journal_id"][0]]
+                running_balance += move_line["debit"] - move_line["credit"]
+                move_line["running_balance"] = round(running_balance, 2)
+                total_debit += move_line["debit"]
+                total_credit += move_line["credit"]
+                move_line_list.append([move_line])
+            partner_dict[partner.name] = move_line_list
+            partner_totals[partner.name] = {
+                "total_debit": round(total_debit, 2),
+                "total_credit": round(total_credit, 2),
                 "currency_id": currency_id,
-                "partner_id": partners,
+                "partner_id": partner.id,
                 "initial_balance": balance,
                 "move_name": "Initial Balance",
                 "initial_debit": total_debit_balance,
                 "initial_credit": total_credit_balance,
             }
-
-            # Agregar los totales al diccionario de partners
         partner_dict["partner_totals"] = partner_totals
-
-            # Devolver el diccionario de partners con los movimientos y totales
         return partner_dict
 
     @api.model
+    def _get_xlsx_data(self, options):
+        """
+        Rebuild the data of the XLSX export from the filters of the client.
+
+        :param dict options: ``args`` of the last ``get_filter_values`` call
+            (None before any filter) and ``filters`` for the header.
+        :return: The data expected by ``get_xlsx_report``.
+        :rtype: dict
+        """
+        args = options.get("args")
+        data = self.get_filter_values(*args) if args else self.view_report(None, None)
+        totals = data.pop("partner_totals", {})
+        if args:
+            # Igual que en pantalla, el saldo inicial se suma al débito
+            for total in totals.values():
+                total["total_debit"] += total.get("initial_balance", 0.0)
+        return {
+            "partners": list(data),
+            "data": data,
+            "total": totals,
+            "filters": options.get("filters", {}),
+            "grand_total": {
+                "currency": self.env.company.currency_id.symbol,
+                "total_debit": sum(total["total_debit"] for total in totals.values()),
+                "total_credit": sum(
+                    total["total_credit"] for total in totals.values()
+                ),
+            },
+        }
+
+    @api.model
+    @report_perf
     def get_xlsx_report(self, data, response, report_name, report_action):
         """
         Generate an Excel report based on the provided data.
@@ -489,9 +359,8 @@ class AccountPartnerLedger(models.TransientModel):
 
         :return: None
         """
-        data = json.loads(data)
-        output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output, {"in_memory": True})
+        data = self._load_xlsx_data(data)
+        workbook = self._open_xlsx_workbook(response)
         start_date = (
             data["filters"]["start_date"] if data["filters"]["start_date"] else ""
         )
@@ -672,7 +541,14 @@ class AccountPartnerLedger(models.TransientModel):
                         sheet.merge_range(
                             row, col + 9, row, col + 10, rec[0]["credit"], txt_name
                         )
-                        sheet.merge_range(row, col + 11, row, col + 12, " ", txt_name)
+                        sheet.merge_range(
+                            row,
+                            col + 11,
+                            row,
+                            col + 12,
+                            rec[0]["running_balance"],
+                            txt_name,
+                        )
                 row += 1
                 sheet.merge_range(row, col, row, col + 6, "Total", filter_head)
                 sheet.merge_range(
@@ -700,7 +576,4 @@ class AccountPartnerLedger(models.TransientModel):
                     - data["grand_total"]["total_credit"],
                     filter_head,
                 )
-        workbook.close()
-        output.seek(0)
-        response.stream.write(output.read())
-        output.close()
+        self._close_xlsx_workbook(workbook, response)
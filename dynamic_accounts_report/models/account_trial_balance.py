@@ -20,28 +20,22 @@
 ################################################################################
 import ast
 import calendar
-import io
-import json
-from datetime import datetime
-
-import xlsxwriter
 
 from odoo import api, fields, models
-from odoo.tools.date_utils import (
-    get_fiscal_year,
-    get_month,
-    get_quarter_number,
-    subtract,
-)
+from odoo.tools.date_utils import get_month
+
+from .report_perf import report_perf
 
 
 class AccountTrialBalance(models.TransientModel):
     """For creating Trial Balance report"""
 
     _name = "account.trial.balance"
+    _inherit = ["report.domain.mixin", "report.xlsx.mixin"]
     _description = "Trial Balance Report"
 
     @api.model
+    @report_perf
     def view_report(self):
         """
         Generates a trial balance report for multiple accounts.
@@ -52,53 +46,15 @@ class AccountTrialBalance(models.TransientModel):
         :return: List of dictionaries representing the trial balance report.
         :rtype: list
         """
-        account_ids = self.env["account.move.line"].search([]).mapped("account_id")
         today = fields.Date.today()
-        move_line_list = []
-        for account_id in account_ids:
-            initial_move_line_ids = self.env["account.move.line"].search(
-                [
-                    ("date", "<", get_month(today)[0]),
-                    ("account_id", "=", account_id.id),
-                    ("parent_state", "=", "posted"),
-                ]
-            )
-            initial_total_debit = round(sum(initial_move_line_ids.mapped("debit")), 2)
-            initial_total_credit = round(sum(initial_move_line_ids.mapped("credit")), 2)
-            move_line_ids = self.env["account.move.line"].search(
-                [
-                    ("date", ">=", get_month(today)[0]),
-                    ("account_id", "=", account_id.id),
-                    ("date", "<=", get_month(today)[1]),
-                    ("parent_state", "=", "posted"),
-                ]
-            )
-            total_debit = round(sum(move_line_ids.mapped("debit")), 2)
-            total_credit = round(sum(move_line_ids.mapped("credit")), 2)
-            sum_debit = initial_total_debit + total_debit
-            sum_credit = initial_total_credit + total_credit
-            diff_credit_debit = sum_debit - sum_credit
-            if diff_credit_debit > 0:
-                end_total_debit = diff_credit_debit
-                end_total_credit = 0.0
-            else:
-                end_total_debit = 0.0
-                end_total_credit = abs(diff_credit_debit)
-            data = {
-                "account": account_id.display_name,
-                "account_id": account_id.id,
-                "journal_ids": self.env["account.journal"].search_read([], ["name"]),
-                "initial_total_debit": initial_total_debit,
-                "initial_total_credit": initial_total_credit,
-                "total_debit": total_debit,
-                "total_credit": total_credit,
-                "end_total_debit": end_total_debit,
-                "end_total_credit": end_total_credit,
-            }
-            move_line_list.append(data)
-        return move_line_list
+        month_start, month_end = get_month(today)
+        balances = self._get_account_balances(
+            month_start, month_end, month_start, [], ["posted"]
+        )
+        return self._prepare_trial_balance_lines(balances, 0)
 
     @api.model
+    @report_perf
     def get_filter_values(
         self,
         start_date,
@@ -129,200 +85,218 @@ class AccountTrialBalance(models.TransientModel):
         :return: List of dictionaries representing the financial report.
         :rtype: list
         """
-        if options == {}:
-            options = None
-        if options is None:
-            option_domain = ["posted"]
-        elif "draft" in options:
-            option_domain = ["posted", "draft"]
-        if method == {}:
-            method = None
-        dynamic_total_debit = {}
+        option_domain = self._get_move_states(options)
+        start_date, end_date = self._get_report_period(
+            start_date, end_date, comparison_type
+        )
+        comparison_count = (
+            ast.literal_eval(comparison_number) if comparison_number else 0
+        )
+        periods = self._get_comparison_periods(
+            start_date, end_date, comparison_count, comparison_type
+        )
         dynamic_date_num = {}
-        dynamic_total_credit = {}
-        account_ids = self.env["account.move.line"].search([]).mapped("account_id")
-        move_line_list = []
-        start_date_first = (
-            get_fiscal_year(datetime.strptime(start_date, "%Y-%m-%d").date())[0]
-            if comparison_type == "year"
-            else datetime.strptime(start_date, "%Y-%m-%d").date()
+        if periods:
+            dynamic_date_num = self._get_period_labels(
+                start_date, periods, comparison_type
+            )
+        # El saldo inicial es todo lo anterior al periodo comparado más antiguo
+        initial_start_date = periods[-1][0] if periods else start_date
+        balances = self._get_account_balances(
+            start_date,
+            end_date,
+            initial_start_date,
+            periods,
+            option_domain,
+            journal_list=journal_list,
+            analytic=analytic,
+            cash_basis=bool(method) and "cash" in method,
         )
-        end_date_first = (
-            get_fiscal_year(datetime.strptime(end_date, "%Y-%m-%d").date())[1]
-            if comparison_type == "year"
-            else datetime.strptime(end_date, "%Y-%m-%d").date()
+        return self._prepare_trial_balance_lines(
+            balances, comparison_count, dynamic_date_num
         )
-        for account_id in account_ids:
-            start_date = start_date_first
-            end_date = end_date_first
-            if comparison_number:
-                if comparison_type == "month":
-                    initial_start_date = subtract(
-                        start_date, months=ast.literal_eval(comparison_number)
-                    )
-                elif comparison_type == "year":
-                    initial_start_date = subtract(
-                        start_date, years=ast.literal_eval(comparison_number)
-                    )
-                else:
-                    initial_start_date = subtract(
-                        start_date, months=ast.literal_eval(comparison_number) * 3
-                    )
-            else:
-                initial_start_date = start_date
-            domain = [
-                ("date", "<", initial_start_date),
-                ("account_id", "=", account_id.id),
-                ("parent_state", "in", option_domain),
-            ]
-            if journal_list:
-                domain.append(
-                    ("journal_id", "in", journal_list),
-                )
-            if analytic:
-                domain.append(("analytic_line_ids", "in", analytic))
-            if method is not None and "cash" in method:
-                domain.append(
-                    ("journal_id", "in", self.env.company.tax_cash_basis_journal_id.ids)
-                )
-            initial_move_line_ids = self.env["account.move.line"].search(domain)
-            initial_total_debit = round(sum(initial_move_line_ids.mapped("debit")), 2)
-            initial_total_credit = round(sum(initial_move_line_ids.mapped("credit")), 2)
-            if comparison_number:
-                if comparison_type == "year":
-                    for i in range(1, ast.literal_eval(comparison_number) + 1):
-                        com_start_date = subtract(start_date, years=i)
-                        com_end_date = subtract(end_date, years=i)
-                        domain = [
-                            ("date", ">=", com_start_date),
-                            ("account_id", "=", account_id.id),
-                            ("date", "<=", com_end_date),
-                            ("parent_state", "in", option_domain),
-                        ]
-                        if journal_list:
-                            domain.append(
-                                ("journal_id", "in", journal_list),
-                            )
-                        if analytic:
-                            domain.append(("analytic_line_ids", "in", analytic))
-                        if method is not None and "cash" in method:
-                            domain.append(
-                                (
-                                    "journal_id",
-                                    "in",
-                                    self.env.company.tax_cash_basis_journal_id.ids,
-                                )
-                            )
-                        move_lines = self.env["account.move.line"].search(domain)
-                        dynamic_total_debit[f"dynamic_total_debit_{i}"] = round(
-                            sum(move_lines.mapped("debit")), 2
-                        )
-                        dynamic_total_credit[f"dynamic_total_credit_{i}"] = round(
-                            sum(move_lines.mapped("credit")), 2
-                        )
-                if comparison_type == "month":
-                    dynamic_date_num[f"dynamic_date_num{0}"] = (
-                        self.get_month_name(start_date) + " " + str(start_date.year)
-                    )
-                    for i in range(1, ast.literal_eval(comparison_number) + 1):
-                        com_start_date = subtract(start_date, months=i)
-                        com_end_date = subtract(end_date, months=i)
-                        domain = [
-                            ("date", ">=", com_start_date),
-                            ("account_id", "=", account_id.id),
-                            ("date", "<=", com_end_date),
-                            ("parent_state", "in", option_domain),
-                        ]
-                        if journal_list:
-                            domain.append(
-                                ("journal_id", "in", journal_list),
-                            )
-                        if analytic:
-                            domain.append(("analytic_line_ids", "in", analytic))
-                        if method is not None and "cash" in method:
-                            domain.append(
-                                (
-                                    "journal_id",
-                                    "in",
-                                    self.env.company.tax_cash_basis_journal_id.ids,
-                                ),
-                            )
-                        move_lines = self.env["account.move.line"].search(domain)
-                        dynamic_date_num[f"dynamic_date_num{i}"] = (
-                            self.get_month_name(com_start_date)
-                            + " "
-                            + str(com_start_date.year)
-                        )
-                        dynamic_total_debit[f"dynamic_total_debit_{i}"] = round(
-                            sum(move_lines.mapped("debit")), 2
-                        )
-                        dynamic_total_credit[f"dynamic_total_credit_{i}"] = round(
-                            sum(move_lines.mapped("credit")), 2
-                        )
-                if comparison_type == "quarter":
-                    dynamic_date_num[f"dynamic_date_num{0}"] = (
-                        "Q"
-                        + " "
-                        + str(get_quarter_number(start_date))
-                        + " "
-                        + str(start_date.year)
-                    )
-                    for i in range(1, ast.literal_eval(comparison_number) + 1):
-                        com_start_date = subtract(start_date, months=i * 3)
-                        com_end_date = subtract(end_date, months=i * 3)
-                        domain = [
-                            ("date", ">=", com_start_date),
-                            ("account_id", "=", account_id.id),
-                            ("date", "<=", com_end_date),
-                            ("parent_state", "in", option_domain),
-                        ]
-                        if journal_list:
-                            domain.append(
-                                ("journal_id", "in", journal_list),
-                            )
-                        if analytic:
-                            domain.append(("analytic_line_ids", "in", analytic))
-                        if method is not None and "cash" in method:
-                            domain.append(
-                                (
-                                    "journal_id",
-                                    "in",
-                                    self.env.company.tax_cash_basis_journal_id.ids,
-                                )
-                            )
-                        move_lines = self.env["account.move.line"].search(domain)
-                        dynamic_date_num[f"dynamic_date_num{i}"] = (
-                            "Q"
-                            + " "
-                            + str(get_quarter_number(com_start_date))
-                            + " "
-                            + str(com_start_date.year)
-                        )
-                        dynamic_total_debit[f"dynamic_total_debit_{i}"] = round(
-                            sum(move_lines.mapped("debit")), 2
-                        )
-                        dynamic_total_credit[f"dynamic_total_credit_{i}"] = round(
-                            sum(move_lines.mapped("credit")), 2
-                        )
-            domain = [
-                ("date", ">=", start_date),
-                ("account_id", "=", account_id.id),
-                ("date", "<=", end_date),
-                ("parent_state", "in", option_domain),
-            ]
-            if journal_list:
-                domain.append(
-                    ("journal_id", "in", journal_list),
+
+    @api.model
+    def _get_account_balances(
+        self,
+        start_date,
+        end_date,
+        initial_start_date,
+        periods,
+        option_domain,
+        journal_list=None,
+        analytic=None,
+        cash_basis=False,
+    ):
+        """
+        Return the balances computed by :meth:`_query_account_balances`,
+        served from the result cache when the same filters were already
+        computed. The initial balance depends on all the history, so the
+        cached result covers every date up to ``end_date``.
+        """
+        args = (
+            start_date,
+            end_date,
+            initial_start_date,
+            periods,
+            option_domain,
+            sorted(journal_list or []),
+            sorted(analytic or []),
+            bool(cash_basis),
+        )
+        return self._get_cached_report(
+            ["account_balances", *args],
+            lambda: self._query_account_balances(*args),
+            option_domain,
+            date_to=end_date,
+        )
+
+    @api.model
+    def _query_account_balances(
+        self,
+        start_date,
+        end_date,
+        initial_start_date,
+        periods,
+        option_domain,
+        journal_list=None,
+        analytic=None,
+        cash_basis=False,
+    ):
+        """
+        Compute the initial balance, every comparison period and the current
+        period of all accounts with a single conditional-aggregation query.
+        When the monthly balance snapshot can answer for the filters, the
+        initial balance comes from it and the query skips the older items.
+
+        Every account that has at least one journal item is returned, even if
+        none of its items match the filters, so the report keeps listing it
+        with zero amounts.
+
+        :param date start_date: Start date of the current period.
+        :param date end_date: End date of the current period.
+        :param date initial_start_date: Items before this date make up the
+            initial balance.
+        :param list periods: ``(start, end)`` date pairs of the comparison
+            periods, most recent first.
+        :param list[str] option_domain: Accepted parent move states.
+        :param list[int] journal_list: Journal IDs to restrict on.
+        :param list[int] analytic: Analytic line IDs to restrict on.
+        :param bool cash_basis: Restrict on the cash basis journal.
+        :return: List of dictionaries with the raw sums per account, ordered
+            by account code.
+        :rtype: list
+        """
+        initial_balances = None
+        if not analytic and not cash_basis and list(option_domain) == ["posted"]:
+            # Saldo inicial desde la tabla de saldos mensuales
+            initial_balances = self.env[
+                "account.balance.snapshot"
+            ]._get_balances_before(
+                initial_start_date, "account_id", journal_ids=journal_list
+            )
+        self.env["account.move.line"].flush_model()
+        params = {
+            "company_ids": self.env.companies.ids,
+            "states": list(option_domain),
+            "initial_start_date": initial_start_date,
+            "start_date": start_date,
+            "end_date": end_date,
+        }
+        columns = [
+            "SUM(aml.debit) FILTER (WHERE aml.date < %(initial_start_date)s)"
+            " AS initial_debit",
+            "SUM(aml.credit) FILTER (WHERE aml.date < %(initial_start_date)s)"
+            " AS initial_credit",
+            "SUM(aml.debit) FILTER (WHERE aml.date >= %(start_date)s)"
+            " AS debit",
+            "SUM(aml.credit) FILTER (WHERE aml.date >= %(start_date)s)"
+            " AS credit",
+        ]
+        for index, (period_start, period_end) in enumerate(periods, 1):
+            params[f"period_start_{index}"] = period_start
+            params[f"period_end_{index}"] = period_end
+            for column in ("debit", "credit"):
+                columns.append(
+                    f"SUM(aml.{column}) FILTER (WHERE aml.date"
+                    f" BETWEEN %(period_start_{index})s AND %(period_end_{index})s)"
+                    f" AS period_{column}_{index}"
                 )
-            if analytic:
-                domain.append(("analytic_line_ids", "in", analytic))
-            if method is not None and "cash" in method:
-                domain.append(
-                    ("journal_id", "in", self.env.company.tax_cash_basis_journal_id.ids)
+        conditions = [
+            "aml.account_id = account.id",
+            "aml.parent_state = ANY(%(states)s)",
+            "aml.date <= %(end_date)s",
+        ]
+        if initial_balances is not None:
+            conditions.append("aml.date >= %(initial_start_date)s")
+        if journal_list:
+            conditions.append("aml.journal_id = ANY(%(journal_ids)s)")
+            params["journal_ids"] = list(journal_list)
+        if analytic:
+            conditions.append(
+                "aml.id IN (SELECT move_line_id FROM account_analytic_line"
+                " WHERE id = ANY(%(analytic_line_ids)s))"
+            )
+            params["analytic_line_ids"] = list(analytic)
+        if cash_basis:
+            conditions.append("aml.journal_id = ANY(%(cash_basis_journal_ids)s)")
+            params[
+                "cash_basis_journal_ids"
+            ] = self.env.company.tax_cash_basis_journal_id.ids
+        query = f"""
+            SELECT account.id AS account_id, {", ".join(columns)}
+              FROM account_account account
+         LEFT JOIN account_move_line aml ON {" AND ".join(conditions)}
+             WHERE account.company_id = ANY(%(company_ids)s)
+               AND EXISTS (
+                       SELECT 1 FROM account_move_line used
+                        WHERE used.account_id = account.id
+                   )
+          GROUP BY account.id, account.code
+          ORDER BY account.code
+        """
+        self.env.cr.execute(query, params)
+        balances = self.env.cr.dictfetchall()
+        if initial_balances is not None:
+            for balance in balances:
+                (
+                    balance["initial_debit"],
+                    balance["initial_credit"],
+                ) = initial_balances.get(balance["account_id"], (0.0, 0.0))
+        return balances
+
+    @api.model
+    def _prepare_trial_balance_lines(
+        self, balances, comparison_count, dynamic_date_num=None
+    ):
+        """
+        Build the report lines sent to the client from the sums returned by
+        :meth:`_get_account_balances`.
+
+        :param list balances: Raw sums per account.
+        :param int comparison_count: Number of comparison periods.
+        :param dict dynamic_date_num: Labels of the comparison periods.
+        :return: List of dictionaries representing the trial balance report.
+        :rtype: list
+        """
+        accounts = self.env["account.account"].browse(
+            [balance["account_id"] for balance in balances]
+        )
+        move_line_list = []
+        for account_id, balance in zip(accounts, balances):
+            initial_total_debit = round(balance["initial_debit"] or 0.0, 2)
+            initial_total_credit = round(balance["initial_credit"] or 0.0, 2)
+            total_debit = round(balance["debit"] or 0.0, 2)
+            total_credit = round(balance["credit"] or 0.0, 2)
+            dynamic_total_debit = {}
+            dynamic_total_credit = {}
+            for i in range(1, comparison_count + 1):
+                if f"period_debit_{i}" not in balance:
+                    continue
+                dynamic_total_debit[i] = round(balance[f"period_debit_{i}"] or 0.0, 2)
+                dynamic_total_credit[i] = round(
+                    balance[f"period_credit_{i}"] or 0.0, 2
                 )
-            move_line_ids = self.env["account.move.line"].search(domain)
-            total_debit = round(sum(move_line_ids.mapped("debit")), 2)
-            total_credit = round(sum(move_line_ids.mapped("credit")), 2)
             sum_debit = (
                 initial_total_debit + sum(dynamic_total_debit.values()) + total_debit
             )
@@ -339,7 +313,6 @@ class AccountTrialBalance(models.TransientModel):
             data = {
                 "account": account_id.display_name,
                 "account_id": account_id.id,
-                "journal_ids": self.env["account.journal"].search_read([], ["name"]),
                 "initial_total_debit": initial_total_debit,
                 "initial_total_credit": initial_total_credit,
                 "total_debit": total_debit,
@@ -347,21 +320,36 @@ class AccountTrialBalance(models.TransientModel):
                 "end_total_debit": end_total_debit,
                 "end_total_credit": end_total_credit,
             }
-            if comparison_number:
+            if comparison_count:
                 if dynamic_date_num:
                     data["dynamic_date_num"] = dynamic_date_num
-                for i in range(1, ast.literal_eval(comparison_number) + 1):
+                # The client expects the oldest comparison period first.
+                for i in range(1, comparison_count + 1):
                     data[f"dynamic_total_debit_{i}"] = dynamic_total_debit.get(
-                        f"dynamic_total_debit_{ast.literal_eval(comparison_number) + 1 - i}",
-                        0.0,
+                        comparison_count + 1 - i, 0.0
                     )
                     data[f"dynamic_total_credit_{i}"] = dynamic_total_credit.get(
-                        f"dynamic_total_credit_{ast.literal_eval(comparison_number) + 1 - i}",
-                        0.0,
+                        comparison_count + 1 - i, 0.0
                     )
             move_line_list.append(data)
         return move_line_list
 
+    @api.model
+    def _get_xlsx_data(self, options):
+        """Datos de la exportación XLSX recalculados con los mismos argumentos
+        que ``get_filter_values`` (el mes actual si aún no hay filtros)."""
+        args = options.get("args")
+        lines = self.get_filter_values(*args) if args else self.view_report()
+        comparison_count = int(args[2] or 0) if args else 0
+        period_labels = lines[0].get("dynamic_date_num", {}) if lines else {}
+        return {
+            "data": lines,
+            "date_viewed": self._get_xlsx_period_headers(period_labels, options),
+            "apply_comparison": bool(comparison_count),
+            "comparison_number_range": list(range(1, comparison_count + 1)),
+            "filters": options.get("filters", {}),
+        }
+
     @api.model
     def get_month_name(self, date):
         """
@@ -375,6 +363,7 @@ class AccountTrialBalance(models.TransientModel):
         return month_names[date.month]
 
     @api.model
+    @report_perf
     def get_xlsx_report(self, data, response, report_name, report_action):
         """
         Generate an XLSX report based on provided data and response stream.
@@ -385,9 +374,8 @@ class AccountTrialBalance(models.TransientModel):
         :param response: Response object to stream the generated report.
         :param str report_name: Name of the financial report.
         """
-        data = json.loads(data)
-        output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output, {"in_memory": True})
+        data = self._load_xlsx_data(data)
+        workbook = self._open_xlsx_workbook(response)
         start_date = (
             data["filters"]["start_date"] if data["filters"]["start_date"] else ""
         )
@@ -518,7 +506,4 @@ class AccountTrialBalance(models.TransientModel):
                         row, col + j + 3, move_line["end_total_credit"], txt_name
                     )
                     row += 1
-        workbook.close()
-        output.seek(0)
-        response.stream.write(output.read())
-        output.close()
+        self._close_xlsx_workbook(workbook, response)
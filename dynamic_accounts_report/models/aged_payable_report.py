@@ -1,96 +1,39 @@
-import io
-import json
-
-import xlsxwriter
-
 from odoo import api, fields, models
 
+from .report_perf import report_perf
+
 
 class AgePayableReport(models.TransientModel):
     """For creating Age Payable report"""
 
     _name = "age.payable.report"
+    _inherit = ["aged.report.mixin", "report.xlsx.mixin"]
     _description = "Aged Payable Report"
+    _xlsx_partner_total = "amount_residual_sum"
+    _xlsx_grand_total = "total_credit"
 
     @api.model
-    def view_report(self, partner_id=None):
+    @report_perf
+    def view_report(self, partner_id=None, report_date=None):
         """
         Generate a report with move line data categorized by partner and residual
-        amount difference.
+        amount difference, as of the report date (today by default).
         """
-        partner_total = {}
-        move_line_list = {}
-        domain = [
-            ("parent_state", "=", "posted"),
-            ("account_type", "=", "liability_payable"),
-            ("reconciled", "=", False),
-        ]
-
-        # Si se proporciona un partner_id, añádelo al dominio
-        if partner_id:
-            domain.append(("partner_id", "=", partner_id))
-
-        # Busca las líneas de movimiento que cumplen con el dominio
-        paid = self.env["account.move.line"].search(domain)
-        currency_id = self.env.company.currency_id.symbol
-
-        # Obtener los partners únicos de las líneas filtradas
-        partner_ids = paid.mapped("partner_id")
-
-        today = fields.Date.today()
-
-        for partner in partner_ids:
-            # Filtrar las líneas para el partner actual
-            move_line_ids = paid.filtered(lambda rec: rec.partner_id == partner)
-            move_line_data = []
-
-            for line in move_line_ids:
-                diffrence = (
-                    (today - line.date_maturity).days if line.date_maturity else 0
-                )
-                line_data = {
-                    "name": line.name,
-                    "move_name": line.move_name,
-                    "date": line.date,
-                    "amount_currency": line.amount_currency,
-                    "account_id": (line.account_id.id, line.account_id.name),  # ← Tupla
-                    "date_maturity": line.date_maturity,
-                    "currency_id": (line.currency_id.id, line.currency_id.name),  # ← Tupla
-                    "amount_residual": -(line.amount_residual),
-                    "move_id": (line.move_id.id, line.move_id.name),  # ← Cambiar a tupla
-                    "diff0": line.amount_residual if diffrence <= 0 else 0.0,
-                    "diff1": line.amount_residual if 0 < diffrence <= 30 else 0.0,
-                    "diff2": line.amount_residual if 30 < diffrence <= 60 else 0.0,
-                    "diff3": line.amount_residual if 60 < diffrence <= 90 else 0.0,
-                    "diff4": line.amount_residual if 90 < diffrence <= 120 else 0.0,
-                    "diff5": line.amount_residual if diffrence > 120 else 0.0,
-                }
-                move_line_data.append(line_data)
-
-            move_line_list[partner.name] = move_line_data
-            partner_total[partner.name] = {
-                "amount_residual_sum": round(
-                    sum(val["amount_residual"] for val in move_line_data), 2
-                ),
-                "diff0_sum": round(sum(val["diff0"] for val in move_line_data), 2),
-                "diff1_sum": round(sum(val["diff1"] for val in move_line_data), 2),
-                "diff2_sum": round(sum(val["diff2"] for val in move_line_data), 2),
-                "diff3_sum": round(sum(val["diff3"] for val in move_line_data), 2),
-                "diff4_sum": round(sum(val["diff4"] for val in move_line_data), 2),
-                "diff5_sum": round(sum(val["diff5"] for val in move_line_data), 2),
-                "currency_id": currency_id,
-                "partner_id": partner.id,
-            }
-
-        move_line_list["partner_totals"] = partner_total
-        return move_line_list
+        report_date = (
+            fields.Date.to_date(report_date) if report_date else fields.Date.today()
+        )
+        return self._get_report_data(
+            report_date, [partner_id] if partner_id else None
+        )
 
     @api.model
+    @report_perf
     def get_filter_values(self, date, partner):
         """
         Retrieve filtered move line data based on date and partner(s).
         Parameters:
-            date (str): Date for filtering move lines (format: 'YYYY-MM-DD').
+            date (str): Report date (format: 'YYYY-MM-DD'); residuals and aging
+                are computed as of this date.
             partner (list): List of partner IDs to filter move lines for.
         Returns:
             dict: Dictionary with filtered move line data organized by partner
@@ -98,82 +41,86 @@ class AgePayableReport(models.TransientModel):
                 difference. Contains partner-wise summary under
                 'partner_totals' key.
         """
-        partner_total = {}
-        move_line_list = {}
-        domain = [
-            ("parent_state", "=", "posted"),
-            ("account_type", "=", "liability_payable"),
-            ("reconciled", "=", False),
-        ]
-        # Añadir filtro de fecha si está presente
-        if date:
-            domain.append(("date", "<=", date))
-
+        report_date = fields.Date.to_date(date) if date else fields.Date.today()
         # Extraer ID del partner correctamente
         partner_ids = []
         if isinstance(partner, list):
             partner_ids = [
                 p["id"] for p in partner if isinstance(p, dict) and "id" in p
             ]
+        return self._get_report_data(report_date, partner_ids)
 
-        # Añadir filtro de partner si está presente
-        if partner_ids:
-            domain.append(("partner_id", "in", partner_ids))
-
-        # Buscar las líneas de movimiento que cumplen con el dominio
-        paid = self.env["account.move.line"].search(domain)
-
+    @api.model
+    def _get_report_data(self, report_date, partner_ids=None):
+        """
+        Build the aged payable data of the open payable lines as of the report
+        date, grouped by partner.
+        :param date report_date: The as-of date of the report.
+        :param list[int] partner_ids: Optional partners to restrict on.
+        :return: Dictionary of the lines per partner name, plus the totals
+            under the 'partner_totals' key.
+        """
+        partner_total = {}
+        move_line_list = {}
         currency_id = self.env.company.currency_id.symbol
-
-        partner_ids = paid.mapped("partner_id")
-        today = fields.Date.today()
-
-        for partner_id in partner_ids:
-            move_line_ids = paid.filtered(lambda rec: rec.partner_id in partner_id)
-            move_line_data = []
-
-            for line in move_line_ids:
-                diffrence = (
-                    (today - line.date_maturity).days if line.date_maturity else 0
-                )
-                line_data = {
-                    "name": line.name,
-                    "move_name": line.move_name,
-                    "date": line.date,
-                    "amount_currency": line.amount_currency,
-                    "account_id": line.account_id.name,  # ← CAMBIO: usar .name en vez de .display_name
-                    "date_maturity": line.date_maturity,
-                    "currency_id": line.currency_id.name,
-                    "amount_residual": -(line.amount_residual),
-                    "move_id": (line.move_id.id, line.move_id.name),
-                    "diff0": line.amount_residual if diffrence <= 0 else 0.0,
-                    "diff1": line.amount_residual if 0 < diffrence <= 30 else 0.0,
-                    "diff2": line.amount_residual if 30 < diffrence <= 60 else 0.0,
-                    "diff3": line.amount_residual if 60 < diffrence <= 90 else 0.0,
-                    "diff4": line.amount_residual if 90 < diffrence <= 120 else 0.0,
-                    "diff5": line.amount_residual if diffrence > 120 else 0.0,
-                }
-                move_line_data.append(line_data)
-
-            move_line_list[partner_id.name] = move_line_data
-            partner_total[partner_id.name] = {
-                "amount_residual_sum": round(
-                    sum(val["amount_residual"] for val in move_line_data), 2
+        payable_lines = self._get_open_lines(
+            "liability_payable", report_date, partner_ids=partner_ids
+        )
+        account_names, currency_names, partner_names = self._get_line_names(
+            payable_lines
+        )
+        for line in payable_lines:
+            # Residual a la fecha del informe (negativo para proveedores)
+            amount_residual = (
+                line["balance"] - line["paid_debit"] + line["paid_credit"]
+            )
+            if not amount_residual:
+                continue
+            line_data = {
+                "name": line["name"],
+                "move_name": line["move_name"],
+                "date": line["date"],
+                "amount_currency": line["amount_currency"],
+                "account_id": (line["account_id"], account_names[line["account_id"]]),
+                "date_maturity": line["date_maturity"],
+                "currency_id": (
+                    line["currency_id"],
+                    currency_names.get(line["currency_id"], False),
                 ),
-                "diff0_sum": round(sum(val["diff0"] for val in move_line_data), 2),
-                "diff1_sum": round(sum(val["diff1"] for val in move_line_data), 2),
-                "diff2_sum": round(sum(val["diff2"] for val in move_line_data), 2),
-                "diff3_sum": round(sum(val["diff3"] for val in move_line_data), 2),
-                "diff4_sum": round(sum(val["diff4"] for val in move_line_data), 2),
-                "diff5_sum": round(sum(val["diff5"] for val in move_line_data), 2),
-                "currency_id": currency_id,
-                "partner_id": partner_id.id,
+                "amount_residual": -amount_residual,
+                "move_id": (line["move_id"], line["move_display_name"]),
             }
+            buckets = self._get_aging_buckets(
+                amount_residual, line["date_maturity"], report_date
+            )
+            line_data.update(buckets)
+
+            partner_name = partner_names[line["partner_id"]]
+            if partner_name not in partner_total:
+                move_line_list[partner_name] = []
+                partner_total[partner_name] = dict.fromkeys(
+                    ["amount_residual_sum"] + [f"{bucket}_sum" for bucket in buckets],
+                    0.0,
+                )
+                partner_total[partner_name].update(
+                    {"currency_id": currency_id, "partner_id": line["partner_id"]}
+                )
+            move_line_list[partner_name].append(line_data)
+            totals = partner_total[partner_name]
+            totals["amount_residual_sum"] += line_data["amount_residual"]
+            for bucket in buckets:
+                totals[f"{bucket}_sum"] += line_data[bucket]
 
+        for totals in partner_total.values():
+            for key in ["amount_residual_sum"] + [
+                f"diff{index}_sum" for index in range(6)
+            ]:
+                totals[key] = round(totals[key], 2)
         move_line_list["partner_totals"] = partner_total
         return move_line_list
 
     @api.model
+    @report_perf
     def get_xlsx_report(self, data, response, report_name, report_action):
         """
         Generate an Excel report based on the provided data.
@@ -185,9 +132,8 @@ class AgePayableReport(models.TransientModel):
         :type report_name: str
         :return: None
         """
-        data = json.loads(data)
-        output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output, {"in_memory": True})
+        data = self._load_xlsx_data(data)
+        workbook = self._open_xlsx_workbook(response)
         end_date = data["filters"]["end_date"] if data["filters"]["end_date"] else ""
         sheet = workbook.add_worksheet()
         head = workbook.add_format(
@@ -334,7 +280,4 @@ class AgePayableReport(models.TransientModel):
                 sheet.write(
                     row + 1, col + 14, data["grand_total"]["total_credit"], filter_head
                 )
-        workbook.close()
-        output.seek(0)
-        response.stream.write(output.read())
-        output.close()
+        self._close_xlsx_workbook(workbook, response)
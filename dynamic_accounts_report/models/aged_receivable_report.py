@@ -1,37 +1,25 @@
-import io
-import json
-
-import xlsxwriter
-
 from odoo import api, fields, models
 
+from .report_perf import report_perf
+
 
 class AgeReceivableReport(models.TransientModel):
     """For creating Age Receivable report"""
 
     _name = "age.receivable.report"
+    _inherit = ["aged.report.mixin", "report.xlsx.mixin"]
     _description = "Aged Receivable Report"
+    _xlsx_partner_total = "debit_sum"
+    _xlsx_grand_total = "total_debit"
 
     @api.model
+    @report_perf
     def view_report(self, partner_id=None, report_date=None):
         """
         Generate aged receivable report considering payments up to the report date.
         """
         partner_total = {}
         move_line_list = {}
-
-        # Base domain for receivable account lines
-        domain = [
-            ("parent_state", "=", "posted"),
-            ("account_type", "=", "asset_receivable"),
-            ("move_id.move_type", "in", ["out_invoice"]),
-        ]
-
-        if partner_id:
-            domain.append(("partner_id", "=", partner_id))
-
-        # Get all receivable lines (including reconciled ones)
-        receivable_lines = self.env["account.move.line"].search(domain)
         currency_id = self.env.company.currency_id.symbol
 
         # Convert report_date to date object if provided
@@ -39,107 +27,69 @@ class AgeReceivableReport(models.TransientModel):
             fields.Date.to_date(report_date) if report_date else fields.Date.today()
         )
 
-        for partner in receivable_lines.mapped("partner_id"):
-            partner_lines = receivable_lines.filtered(lambda r: r.partner_id == partner)
-            move_line_data = []
-
-            for line in partner_lines:
-                # Calculate residual amount up to report date
-                residual = self._get_residual_amount_up_to_date(line, report_date)
-
-                if residual != 0:
-                    line_data = {
-                        "name": line.name,
-                        "move_name": line.move_name,
-                        "date": line.date,
-                        "amount_currency": line.amount_currency,
-                        "account_id": [line.account_id.id, line.account_id.name],
-                        "date_maturity": line.date_maturity,
-                        "currency_id": [line.currency_id.id, line.currency_id.name],
-                        "debit": residual if residual > 0 else 0,
-                        "credit": -residual if residual < 0 else 0,
-                        "move_id": line.move_id.id,
-                        "move_type": line.move_id.move_type,
-                    }
-
-                    # Calculate aging based on maturity date or invoice date
-                    maturity_date = line.date_maturity or line.date
-                    diffrence = (
-                        (report_date - maturity_date).days if maturity_date else 0
-                    )
-
-                    line_data.update(
-                        {
-                            "diff0": round(
-                                line_data["debit"] if diffrence <= 0 else 0.0, 2
-                            ),
-                            "diff1": round(
-                                line_data["debit"] if 0 < diffrence <= 30 else 0.0, 2
-                            ),
-                            "diff2": round(
-                                line_data["debit"] if 30 < diffrence <= 60 else 0.0, 2
-                            ),
-                            "diff3": round(
-                                line_data["debit"] if 60 < diffrence <= 90 else 0.0, 2
-                            ),
-                            "diff4": round(
-                                line_data["debit"] if 90 < diffrence <= 120 else 0.0, 2
-                            ),
-                            "diff5": round(
-                                line_data["debit"] if diffrence > 120 else 0.0, 2
-                            ),
-                        }
-                    )
-
-                    move_line_data.append(line_data)
+        receivable_lines = self._get_open_lines(
+            "asset_receivable",
+            report_date,
+            partner_ids=[partner_id] if partner_id else None,
+            move_types=["out_invoice"],
+        )
+        account_names, currency_names, partner_names = self._get_line_names(
+            receivable_lines
+        )
 
-            if move_line_data:  # Only add if there are lines
-                move_line_list[partner.name] = move_line_data
-                partner_total[partner.name] = {
-                    "debit_sum": round(sum(val["debit"] for val in move_line_data), 2),
-                    "diff0_sum": round(sum(val["diff0"] for val in move_line_data), 2),
-                    "diff1_sum": round(sum(val["diff1"] for val in move_line_data), 2),
-                    "diff2_sum": round(sum(val["diff2"] for val in move_line_data), 2),
-                    "diff3_sum": round(sum(val["diff3"] for val in move_line_data), 2),
-                    "diff4_sum": round(sum(val["diff4"] for val in move_line_data), 2),
-                    "diff5_sum": round(sum(val["diff5"] for val in move_line_data), 2),
-                    "currency_id": currency_id,
-                    "partner_id": partner.id,
-                }
+        for line in receivable_lines:
+            # Residual en moneda de la compañía, como los pagos parciales
+            residual = line["balance"] - line["paid_debit"] + line["paid_credit"]
+            if not residual:
+                continue
+            debit = residual if residual > 0 else 0
+            line_data = {
+                "name": line["name"],
+                "move_name": line["move_name"],
+                "date": line["date"],
+                "amount_currency": line["amount_currency"],
+                "account_id": [line["account_id"], account_names[line["account_id"]]],
+                "date_maturity": line["date_maturity"],
+                "currency_id": [
+                    line["currency_id"],
+                    currency_names.get(line["currency_id"], False),
+                ],
+                "debit": debit,
+                "credit": -residual if residual < 0 else 0,
+                "move_id": line["move_id"],
+                "move_type": line["move_type"],
+            }
+            # Calculate aging based on maturity date or invoice date
+            buckets = self._get_aging_buckets(
+                debit, line["date_maturity"] or line["date"], report_date
+            )
+            line_data.update(
+                {bucket: round(amount, 2) for bucket, amount in buckets.items()}
+            )
 
+            partner_name = partner_names[line["partner_id"]]
+            if partner_name not in partner_total:
+                move_line_list[partner_name] = []
+                partner_total[partner_name] = dict.fromkeys(
+                    ["debit_sum"] + [f"{bucket}_sum" for bucket in buckets], 0.0
+                )
+                partner_total[partner_name].update(
+                    {"currency_id": currency_id, "partner_id": line["partner_id"]}
+                )
+            move_line_list[partner_name].append(line_data)
+            totals = partner_total[partner_name]
+            totals["debit_sum"] += line_data["debit"]
+            for bucket in buckets:
+                totals[f"{bucket}_sum"] += line_data[bucket]
+
+        for totals in partner_total.values():
+            for key in ["debit_sum"] + [f"diff{index}_sum" for index in range(6)]:
+                totals[key] = round(totals[key], 2)
         move_line_list["partner_totals"] = partner_total
         return move_line_list
 
-    def _get_residual_amount_up_to_date(self, move_line, report_date):
-        """
-        Calculate the residual amount of a move line up to a specific date,
-        considering only payments made on or before that date.
-        """
-        # If the invoice date is after report date, return 0 (not yet due)
-        if move_line.date > report_date:
-            return 0.0
-
-        # Get all partial reconciliations for this line
-        partial_recs = move_line.matched_debit_ids | move_line.matched_credit_ids
-
-        total_paid = 0.0
-        original_amount = move_line.amount_currency or move_line.balance
-
-        for partial in partial_recs:
-            payment_line = (
-                partial.debit_move_id
-                if partial.debit_move_id != move_line
-                else partial.credit_move_id
-            )
-
-            # Only consider payments made on or before report date
-            if payment_line.date <= report_date:
-                total_paid += partial.amount
-
-        residual = original_amount - total_paid
-        return residual
-
     @api.model
+    @report_perf
     def get_filter_values(self, date, partner):
         """
         Wrapper for view_report that maintains compatibility with existing calls
@@ -156,6 +106,7 @@ class AgeReceivableReport(models.TransientModel):
         return self.view_report(partner_id=partner_id, report_date=date)
 
     @api.model
+    @report_perf
     def get_xlsx_report(self, data, response, report_name, report_action):
         """
         Generate an Excel report based on the provided data.
@@ -171,9 +122,8 @@ class AgeReceivableReport(models.TransientModel):
 
         :return: None
         """
-        data = json.loads(data)
-        output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output, {"in_memory": True})
+        data = self._load_xlsx_data(data)
+        workbook = self._open_xlsx_workbook(response)
         end_date = data["filters"]["end_date"] if data["filters"]["end_date"] else ""
         sheet = workbook.add_worksheet()
         head = workbook.add_format(
@@ -321,7 +271,4 @@ class AgeReceivableReport(models.TransientModel):
                     row + 1, col + 14, data["grand_total"]["total_debit"], filter_head
                 )
 
-        workbook.close()
-        output.seek(0)
-        response.stream.write(output.read())
-        output.close()
+        self._close_xlsx_workbook(workbook, response)
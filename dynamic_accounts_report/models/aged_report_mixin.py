@@ -0,0 +1,214 @@
+################################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>).
+#    Author: Ammu Raj (odoo@cybrosys.com)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+################################################################################
+from odoo import api, models
+
+
+class AgedReportMixin(models.AbstractModel):
+    """Aging engine shared by the aged receivable and aged payable reports"""
+
+    _name = "aged.report.mixin"
+    _description = "Aged Report Engine"
+
+    # Total de cada partner (en ``partner_totals``) sumado en el total
+    # general de la exportación XLSX, y su clave en ese total
+    _xlsx_partner_total = None
+    _xlsx_grand_total = None
+
+    @api.model
+    def _get_open_lines(
+        self, account_type, report_date, partner_ids=None, move_types=None
+    ):
+        """
+        Fetch the journal items of the given account type dated on or before
+        the report date, together with the partial reconciliations paid on
+        or before that date, in one query.
+
+        Items already fully reconciled whose counterparts are all dated on
+        or before the report date are left out, since they are settled at
+        that date.
+
+        :param str account_type: 'asset_receivable' or 'liability_payable'.
+        :param date report_date: The as-of date of the report.
+        :param list[int] partner_ids: Optional partners to restrict on.
+        :param list[str] move_types: Optional move types to restrict on.
+        :return: List of dictionaries, one per item, with ``paid_debit`` (sum
+            of the partials where the item is the debit side) and
+            ``paid_credit`` (where it is the credit side).
+        :rtype: list
+        """
+        self.env["account.move.line"].flush_model()
+        self.env["account.move"].flush_model(["move_type"])
+        self.env["account.partial.reconcile"].flush_model()
+        params = {
+            "company_ids": self.env.companies.ids,
+            "account_type": account_type,
+            "report_date": report_date,
+        }
+        conditions = ""
+        if partner_ids:
+            conditions += " AND aml.partner_id = ANY(%(partner_ids)s)"
+            params["partner_ids"] = list(partner_ids)
+        if move_types:
+            conditions += " AND move.move_type = ANY(%(move_types)s)"
+            params["move_types"] = list(move_types)
+        self.env.cr.execute(
+            f"""
+            WITH lines AS (
+                SELECT aml.id, aml.partner_id, aml.name, aml.move_name, aml.date,
+                       aml.date_maturity, aml.amount_currency, aml.balance,
+                       aml.account_id, aml.currency_id, aml.move_id,
+                       move.name AS move_display_name, move.move_type
+                  FROM account_move_line aml
+                  JOIN account_move move ON move.id = aml.move_id
+                 WHERE aml.parent_state = 'posted'
+                   AND aml.account_type = %(account_type)s
+                   AND aml.partner_id IS NOT NULL
+                   AND aml.company_id = ANY(%(company_ids)s)
+                   AND aml.date <= %(report_date)s
+                   AND (
+                       NOT aml.reconciled
+                       OR EXISTS (
+                           SELECT 1
+                             FROM account_partial_reconcile part
+                             JOIN account_move_line counterpart
+                               ON counterpart.id = part.credit_move_id
+                            WHERE part.debit_move_id = aml.id
+                              AND counterpart.date > %(report_date)s
+                       )
+                       OR EXISTS (
+                           SELECT 1
+                             FROM account_partial_reconcile part
+                             JOIN account_move_line counterpart
+                               ON counterpart.id = part.debit_move_id
+                            WHERE part.credit_move_id = aml.id
+                              AND counterpart.date > %(report_date)s
+                       )
+                   )
+                   {conditions}
+            ),
+            paid AS (
+                SELECT part.debit_move_id AS line_id,
+                       part.amount AS paid_debit,
+                       0.0 AS paid_credit
+                  FROM account_partial_reconcile part
+                  JOIN account_move_line counterpart
+                    ON counterpart.id = part.credit_move_id
+                 WHERE part.debit_move_id IN (SELECT id FROM lines)
+                   AND counterpart.date <= %(report_date)s
+             UNION ALL
+                SELECT part.credit_move_id AS line_id,
+                       0.0 AS paid_debit,
+                       part.amount AS paid_credit
+                  FROM account_partial_reconcile part
+                  JOIN account_move_line counterpart
+                    ON counterpart.id = part.debit_move_id
+                 WHERE part.credit_move_id IN (SELECT id FROM lines)
+                   AND counterpart.date <= %(report_date)s
+            )
+            SELECT lines.*,
+                   COALESCE(paid_sum.paid_debit, 0) AS paid_debit,
+                   COALESCE(paid_sum.paid_credit, 0) AS paid_credit
+              FROM lines
+         LEFT JOIN (
+                       SELECT line_id,
+                              SUM(paid_debit) AS paid_debit,
+                              SUM(paid_credit) AS paid_credit
+                         FROM paid
+                     GROUP BY line_id
+                   ) paid_sum ON paid_sum.line_id = lines.id
+          ORDER BY lines.date DESC, lines.move_name DESC, lines.id
+            """,
+            params,
+        )
+        return self.env.cr.dictfetchall()
+
+    @api.model
+    def _get_line_names(self, lines):
+        """
+        Read in batch the names of the accounts, currencies and partners
+        referenced by the given lines.
+
+        :param list lines: Lines returned by :meth:`_get_open_lines`.
+        :return: Tuple of three dictionaries {id: name} for the accounts, the
+            currencies and the partners.
+        :rtype: tuple
+        """
+        names = []
+        for model, field in (
+            ("account.account", "account_id"),
+            ("res.currency", "currency_id"),
+            ("res.partner", "partner_id"),
+        ):
+            records = self.env[model].browse({line[field] for line in lines})
+            names.append({record.id: record.name for record in records})
+        return tuple(names)
+
+    @api.model
+    def _get_aging_buckets(self, amount, maturity_date, report_date):
+        """
+        Spread an amount over the 0/30/60/90/120/older aging buckets.
+
+        :param float amount: The amount to place in its bucket.
+        :param date maturity_date: The date the aging is computed from.
+        :param date report_date: The as-of date of the report.
+        :return: Dictionary ``{"diff0": ..., ..., "diff5": ...}``.
+        :rtype: dict
+        """
+        diffrence = (report_date - maturity_date).days if maturity_date else 0
+        if diffrence <= 0:
+            index = 0
+        elif diffrence > 120:
+            index = 5
+        else:
+            index = (diffrence - 1) // 30 + 1
+        return {
+            f"diff{bucket}": amount if bucket == index else 0.0 for bucket in range(6)
+        }
+
+    @api.model
+    def _get_xlsx_data(self, options):
+        """
+        Rebuild the data of the XLSX export from the filters of the client.
+
+        :param dict options: ``args`` of the last ``get_filter_values`` call
+            (None before any filter) and ``filters`` for the header.
+        :return: The data expected by ``get_xlsx_report``.
+        :rtype: dict
+        """
+        args = options.get("args")
+        data = self.get_filter_values(*args) if args else self.view_report()
+        totals = data.pop("partner_totals", {})
+        grand_total = {
+            f"diff{index}_sum": round(
+                sum(total[f"diff{index}_sum"] for total in totals.values()), 2
+            )
+            for index in range(6)
+        }
+        grand_total[self._xlsx_grand_total] = round(
+            sum(total[self._xlsx_partner_total] for total in totals.values()), 2
+        )
+        return {
+            "move_lines": list(data),
+            "data": data,
+            "total": totals,
+            "filters": options.get("filters", {}),
+            "grand_total": grand_total,
+        }
@@ -18,24 +18,21 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 ################################################################################
-import io
-import json
-from datetime import datetime
+from odoo import api, models
 
-import xlsxwriter
-from dateutil.relativedelta import relativedelta
-
-from odoo import api, fields, models
-from odoo.tools import date_utils
+from .report_perf import report_perf
 
 
 class BankBookReport(models.TransientModel):
     """For creating Bank Book report"""
 
     _name = "bank.book.report"
+    _inherit = ["book.report.mixin", "report.xlsx.mixin"]
     _description = "Account Bank Book Report"
+    _journal_type = "bank"
 
     @api.model
+    @report_perf
     def view_report(self):
         """
         This method retrieves and returns the necessary data for the partner
@@ -44,44 +41,10 @@ class BankBookReport(models.TransientModel):
         move lines for each account and the total debit and credit amounts for
         each account.
         """
-        data = {}
-        move_lines_total = {}
-        journals = self.env["account.journal"].search([("type", "=", "bank")])
-        account_move_lines = self.env["account.move.line"].search(
-            [("parent_state", "=", "posted"), ("journal_id", "in", journals.ids)]
-        )
-        accounts = account_move_lines.mapped("account_id").read(
-            ["display_name", "name"]
-        )
-        for account in accounts:
-            move_lines = account_move_lines.filtered(
-                lambda x: x.account_id.id == account["id"]
-            )
-            move_line_data = move_lines.read(
-                [
-                    "date",
-                    "journal_id",
-                    "partner_id",
-                    "move_name",
-                    "debit",
-                    "move_id",
-                    "credit",
-                    "name",
-                    "ref",
-                ]
-            )
-            data[move_lines.mapped("account_id").display_name] = move_line_data
-            currency_id = self.env.company.currency_id.symbol
-            move_lines_total[move_lines.mapped("account_id").display_name] = {
-                "total_debit": round(sum(move_lines.mapped("debit")), 2),
-                "total_credit": round(sum(move_lines.mapped("credit")), 2),
-                "currency_id": currency_id,
-            }
-        data["move_lines_total"] = move_lines_total
-        data["accounts"] = accounts
-        return data
+        return self._get_book_data(["posted"])
 
     @api.model
+    @report_perf
     def get_filter_values(self, partner_id, data_range, account_list, options):
         """
         Retrieve filtered data for the partner ledger report.
@@ -104,116 +67,19 @@ class BankBookReport(models.TransientModel):
             dict: Filtered data for the partner ledger report, grouped by
                   accounts and summary of total debit and credit amounts.
         """
-        data = {}
-        move_lines_total = {}
-        today = fields.Date.today()
-        quarter_start, quarter_end = date_utils.get_quarter(today)
-        previous_quarter_start = quarter_start - relativedelta(months=3)
-        previous_quarter_end = quarter_start - relativedelta(days=1)
-        journals = self.env["account.journal"].search([("type", "=", "bank")])
-        option_domain = ["posted"]
-        if options is not None:
-            if "draft" in options:
-                option_domain = ["posted", "draft"]
-        if partner_id:
-            domain = [
-                ("parent_state", "in", option_domain),
-                ("journal_id", "in", journals.ids),
-                ("partner_id", "in", partner_id),
-            ]
-        else:
-            domain = [
-                ("parent_state", "in", option_domain),
-                ("journal_id", "in", journals.ids),
-            ]
-        if account_list:
-            domain += (("account_id", "in", account_list),)
-        if data_range:
-            if data_range == "month":
-                account_move_lines = (
-                    self.env["account.move.line"]
-                    .search(domain)
-                    .filtered(lambda x: x.date.month == fields.Date.today().month)
-                )
-            elif data_range == "year":
-                account_move_lines = (
-                    self.env["account.move.line"]
-                    .search(domain)
-                    .filtered(lambda x: x.date.year == fields.Date.today().year)
-                )
-            elif data_range == "quarter":
-                domain += ("date", ">=", quarter_start), ("date", "<=", quarter_end)
-                account_move_lines = self.env["account.move.line"].search(domain)
-            elif data_range == "last-month":
-                account_move_lines = (
-                    self.env["account.move.line"]
-                    .search(domain)
-                    .filtered(lambda x: x.date.month == fields.Date.today().month - 1)
-                )
-            elif data_range == "last-year":
-                account_move_lines = (
-                    self.env["account.move.line"]
-                    .search(domain)
-                    .filtered(lambda x: x.date.year == fields.Date.today().year - 1)
-                )
-            elif data_range == "last-quarter":
-                domain += ("date", ">=", previous_quarter_start), (
-                    "date",
-                    "<=",
-                    previous_quarter_end,
-                )
-                account_move_lines = self.env["account.move.line"].search(domain)
-            elif "start_date" in data_range and "end_date" in data_range:
-                start_date = datetime.strptime(
-                    data_range["start_date"], "%Y-%m-%d"
-                ).date()
-                end_date = datetime.strptime(data_range["end_date"], "%Y-%m-%d").date()
-                domain += (
-                    ("date", ">=", start_date),
-                    ("date", "<=", end_date),
-                )
-                account_move_lines = self.env["account.move.line"].search(domain)
-            elif "start_date" in data_range:
-                start_date = datetime.strptime(
-                    data_range["start_date"], "%Y-%m-%d"
-                ).date()
-                domain.append(("date", ">=", start_date))
-                account_move_lines = self.env["account.move.line"].search(domain)
-            elif "end_date" in data_range:
-                end_date = datetime.strptime(data_range["end_date"], "%Y-%m-%d").date()
-                domain.append(("date", "<=", end_date))
-                account_move_lines = self.env["account.move.line"].search(domain)
-        else:
-            account_move_lines = self.env["account.move.line"].search(domain)
-        accounts = account_move_lines.mapped("account_id").read(["display_name"])
-        for account in accounts:
-            move_lines = account_move_lines.filtered(
-                lambda x: x.account_id.id == account["id"]
-            )
-            move_line_data = move_lines.read(
-                [
-                    "date",
-                    "journal_id",
-                    "partner_id",
-                    "move_name",
-                    "debit",
-                    "move_id",
-                    "credit",
-                    "name",
-                    "ref",
-                ]
-            )
-            data[move_lines.mapped("account_id").display_name] = move_line_data
-            currency_id = self.env.company.currency_id.symbol
-            move_lines_total[move_lines.mapped("account_id").display_name] = {
-                "total_debit": round(sum(move_lines.mapped("debit")), 2),
-                "total_credit": round(sum(move_lines.mapped("credit")), 2),
-                "currency_id": currency_id,
-            }
-        data["move_lines_total"] = move_lines_total
+        date_from, date_to = self._get_date_bounds(data_range)
+        data = self._get_book_data(
+            self._get_move_states(options),
+            partner_ids=partner_id,
+            account_ids=account_list,
+            date_from=date_from,
+            date_to=date_to,
+        )
+        data.pop("accounts")
         return data
 
     @api.model
+    @report_perf
     def get_xlsx_report(self, data, response, report_name, report_action):
         """
         Generate an Excel report based on the provided data.
@@ -225,9 +91,8 @@ class BankBookReport(models.TransientModel):
         :type report_name: str
         :return: None
         """
-        data = json.loads(data)
-        output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output, {"in_memory": True})
+        data = self._load_xlsx_data(data)
+        workbook = self._open_xlsx_workbook(response)
         start_date = (
             data["filters"]["start_date"] if data["filters"]["start_date"] else ""
         )
@@ -338,7 +203,8 @@ class BankBookReport(models.TransientModel):
                         col + 15,
                         row,
                         col + 16,
-                        data["total"][move_line]["total_debit"]
+                        data["total"][move_line].get("initial_balance", 0.0)
+                        + data["total"][move_line]["total_debit"]
                         - data["total"][move_line]["total_credit"],
                         txt_name,
                     )
@@ -395,7 +261,4 @@ class BankBookReport(models.TransientModel):
                     - float(data["grand_total"]["total_credit"]),
                     filter_head,
                 )
-        workbook.close()
-        output.seek(0)
-        response.stream.write(output.read())
-        output.close()
+        self._close_xlsx_workbook(workbook, response)
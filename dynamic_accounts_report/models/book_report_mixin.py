@@ -0,0 +1,175 @@
+################################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>).
+#    Author: Ammu Raj (odoo@cybrosys.com)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+################################################################################
+from odoo import api, models
+
+MOVE_LINE_FIELDS = [
+    "date",
+    "journal_id",
+    "partner_id",
+    "move_name",
+    "debit",
+    "move_id",
+    "credit",
+    "name",
+    "ref",
+]
+
+
+class BookReportMixin(models.AbstractModel):
+    """Data engine shared by the bank book and cash book reports"""
+
+    _name = "book.report.mixin"
+    _inherit = "report.domain.mixin"
+    _description = "Book Report Engine"
+
+    # Tipo de diario ('bank' o 'cash') definido por cada reporte
+    _journal_type = None
+
+    @api.model
+    def _get_book_data(
+        self, states, partner_ids=None, account_ids=None, date_from=None, date_to=None
+    ):
+        """
+        Build the book of the journals of type ``_journal_type``.
+
+        The items of the period are read in one query ordered by account and
+        split per account in a single pass; the opening balance of each
+        account (everything dated before ``date_from``) comes from the
+        monthly balance snapshot, or from one grouped aggregate when it
+        cannot be used.
+
+        :param list[str] states: Move states to include.
+        :param list[int] partner_ids: Optional partners to restrict on.
+        :param list[int] account_ids: Optional accounts to restrict on.
+        :param date date_from: Optional start of the period.
+        :param date date_to: Optional end of the period.
+        :return: Dictionary keyed by account display name with the items of
+            each account, plus 'move_lines_total' with the totals and the
+            opening balance of each account, and 'accounts'.
+        :rtype: dict
+        """
+        move_line = self.env["account.move.line"]
+        journals = self.env["account.journal"].search(
+            [("type", "=", self._journal_type)]
+        )
+        if not journals:
+            return {"move_lines_total": {}, "accounts": []}
+        domain = self._get_move_line_domain(
+            states,
+            journal_ids=journals.ids,
+            account_ids=account_ids,
+            partner_ids=partner_ids,
+        )
+        period_domain = self._get_move_line_domain(
+            states,
+            date_from=date_from,
+            date_to=date_to,
+            journal_ids=journals.ids,
+            account_ids=account_ids,
+            partner_ids=partner_ids,
+        )
+        move_lines = move_line.search_read(
+            period_domain,
+            MOVE_LINE_FIELDS + ["account_id"],
+            order="account_id, date, id",
+        )
+        initial_balances = None
+        if date_from and states == ["posted"]:
+            initial_balances = self.env[
+                "account.balance.snapshot"
+            ]._get_balances_before(
+                date_from,
+                "account_id",
+                account_ids=account_ids,
+                journal_ids=journals.ids,
+                partner_ids=partner_ids,
+            )
+        if date_from and initial_balances is None:
+            initial_balances = {}
+            for group in move_line.read_group(
+                domain + [("date", "<", date_from)],
+                ["debit:sum", "credit:sum"],
+                ["account_id"],
+            ):
+                initial_balances[group["account_id"][0]] = (
+                    group["debit"] or 0.0,
+                    group["credit"] or 0.0,
+                )
+        initial_balances = initial_balances or {}
+        lines_by_account = {}
+        for line in move_lines:
+            lines_by_account.setdefault(line.pop("account_id")[0], []).append(line)
+        accounts = (
+            self.env["account.account"]
+            .browse(set(lines_by_account) | set(initial_balances))
+            .sorted("code")
+            .read(["display_name", "name"])
+        )
+        currency_id = self.env.company.currency_id.symbol
+        data = {}
+        move_lines_total = {}
+        for account in accounts:
+            lines = lines_by_account.get(account["id"], [])
+            initial_debit, initial_credit = initial_balances.get(
+                account["id"], (0.0, 0.0)
+            )
+            data[account["display_name"]] = lines
+            move_lines_total[account["display_name"]] = {
+                "total_debit": round(sum(line["debit"] for line in lines), 2),
+                "total_credit": round(sum(line["credit"] for line in lines), 2),
+                "initial_debit": round(initial_debit, 2),
+                "initial_credit": round(initial_credit, 2),
+                "initial_balance": round(initial_debit - initial_credit, 2),
+                "currency_id": currency_id,
+            }
+        data["move_lines_total"] = move_lines_total
+        data["accounts"] = accounts
+        return data
+
+    @api.model
+    def _get_xlsx_data(self, options):
+        """
+        Rebuild the data of the XLSX export from the filters of the client.
+
+        :param dict options: ``args`` of the last ``get_filter_values`` call
+            (None before any filter) and ``filters`` for the header.
+        :return: The data expected by ``get_xlsx_report``.
+        :rtype: dict
+        """
+        args = options.get("args")
+        data = self.get_filter_values(*args) if args else self.view_report()
+        data.pop("accounts", None)
+        totals = data.pop("move_lines_total", {})
+        return {
+            "move_lines": list(data),
+            "data": data,
+            "total": totals,
+            "filters": options.get("filters", {}),
+            "grand_total": {
+                "currency": self.env.company.currency_id.symbol,
+                "total_debit": round(
+                    sum(total["total_debit"] for total in totals.values()), 2
+                ),
+                "total_credit": round(
+                    sum(total["total_credit"] for total in totals.values()), 2
+                ),
+            },
+        }
@@ -20,11 +20,7 @@
 ################################################################################
 # pylint: skip-file
 import ast
-import datetime
-import io
-import json
 
-import xlsxwriter
 import logging
 _logger = logging.getLogger(__name__)
 
@@ -32,11 +28,33 @@ from odoo import _, api, fields, models
 from odoo.exceptions import ValidationError
 from odoo.tools.date_utils import get_fiscal_year, get_month, get_quarter, subtract
 
+from .report_perf import report_perf
+
+ACCOUNT_TYPES = (
+    "income",
+    "income_other",
+    "expense",
+    "expense_depreciation",
+    "expense_direct_cost",
+    "asset_receivable",
+    "asset_cash",
+    "asset_current",
+    "asset_non_current",
+    "asset_prepayments",
+    "asset_fixed",
+    "liability_payable",
+    "liability_credit_card",
+    "liability_current",
+    "liability_non_current",
+    "equity",
+    "equity_unaffected",
+)
 
 class ProfitLossReport(models.TransientModel):
     """For creating Profit and Loss and Balance sheet report."""
 
     _name = "dynamic.balance.sheet.report"
+    _inherit = ["report.domain.mixin", "report.xlsx.mixin"]
     _description = "Profit Loss Report"
 
     company_id = fields.Many2one(
@@ -66,6 +84,10 @@ class ProfitLossReport(models.TransientModel):
     )
     date_from = fields.Date(string="Start date", help="Specify the start date.")
     date_to = fields.Date(string="End date", help="Specify the end date.")
+    consolidate = fields.Boolean(
+        help="Merge the accounts of the active companies by code, converted "
+        "to the currency of the current company.",
+    )
 
     @api.model_create_multi
     def create(self, vals):
@@ -75,363 +97,358 @@ class ProfitLossReport(models.TransientModel):
         return super(ProfitLossReport, self).create({})
 
     @api.model
+    @report_perf
     def view_report(self, option, comparison, comparison_type, filters= None):
-        filters = filters or {}
-        target_move = filters.get('target_move', 'posted')
-        date_from = filters.get('date_from')
-        date_to = filters.get('date_to')
-        journal_ids = filters.get('journal_ids', [])
-        account_ids = filters.get('account_ids', [])
-        analytic_ids = filters.get('analytic_ids', [])
-        company_id = filters.get('company_id')
-        
-        # Define account types at the beginning
-        account_types = {
-            "income": "income",
-            "income_other": "income_other",
-            "expense": "expense",
-            "expense_depreciation": "expense_depreciation",
-            "expense_direct_cost": "expense_direct_cost",
-            "asset_receivable": "asset_receivable",
-            "asset_cash": "asset_cash",
-            "asset_current": "asset_current",
-            "asset_non_current": "asset_non_current",
-            "asset_prepayments": "asset_prepayments",
-            "asset_fixed": "asset_fixed",
-            "liability_payable": "liability_payable",
-            "liability_credit_card": "liability_credit_card",
-            "liability_current": "liability_current",
-            "liability_non_current": "liability_non_current",
-            "equity": "equity",
-            "equity_unaffected": "equity_unaffected",
+        """
+        Compute the Profit and Loss / Balance Sheet figures of the current
+        period, or of every comparison period, with a single aggregation
+        query over all account types and active companies; in consolidation
+        mode the accounts of those companies are merged afterwards by code.
+        :param option: ID of the report wizard holding the filters.
+        :param comparison: Number of comparison periods, if any.
+        :param comparison_type: Comparison type ('month' or 'year').
+        :param filters: Unused, kept for backward compatibility.
+        :return: Tuple of the last period data, the filters and the list of
+            the data of every period.
+        """
+        financial_report_id = self.browse(option)
+        target_move = self._get_move_states(financial_report_id.target_move)
+        periods = self._get_balance_sheet_periods(comparison, comparison_type)
+
+        # Una sola consulta para todos los tipos de cuenta y todos los periodos
+        account_sums = self._get_cached_period_account_sums(
+            financial_report_id, target_move, periods
+        )
+        accounts_by_type = {
+            account_type: self.env["account.account"] for account_type in ACCOUNT_TYPES
         }
-        
-        # Set target move states
-        target_move_states = ['posted'] if target_move == 'posted' else ['posted', 'draft']
-        
-        # Prepare domain for account move lines
-        domain = [
-            ('parent_state', 'in', target_move_states),
-        ]
-        
-        # Add date filters if provided
-        if date_from:
-            domain.append(('date', '>=', date_from))
-        if date_to:
-            domain.append(('date', '<=', date_to))
-        if journal_ids:
-            domain.append(('journal_id', 'in', journal_ids))
-        if account_ids:
-            domain.append(('account_id', 'in', account_ids))
-        
-        # Build the complete domain - don't search yet to avoid loading all records
-        search_domain = domain.copy()
-        
-        # Apply analytic filters if any
-        if analytic_ids:
-            # For analytic filtering, we need to add a domain condition
-            # This will be handled in _get_entries with read_group
-            pass
-        
-        account_entries = {}
-        for account_type in account_types.values():
-            account_entries[account_type] = self._get_entries(
-                search_domain,
-                self.env["account.account"].search([("account_type", "=", account_type)]),
-                account_type,
-                analytic_ids
+        for account in self.env["account.account"].search(
+            [("account_type", "in", ACCOUNT_TYPES)]
+        ):
+            accounts_by_type[account.account_type] |= account
+        if financial_report_id.consolidate and len(self.env.companies) > 1:
+            account_sums, accounts_by_type = self._consolidate_account_sums(
+                account_sums, accounts_by_type, periods
             )
+
         datas = []
-        financial_report_id = self.browse(option)
-        current_year = fields.Date.today().year
-        current_date = fields.Date.today()
-        if financial_report_id.target_move == "draft":
-            target_move = ["posted", "draft"]
-        else:
-            target_move = ["posted"]
-        if comparison:
-            for count in range(0, int(comparison) + 1):
-                # Build domain for comparison period - don't search yet
-                comparison_domain = [("parent_state", "in", target_move)]
-                
-                if comparison_type == "month":
-                    month_start = (current_date - datetime.timedelta(days=30 * count)).strftime("%Y-%m-01")
-                    month_end = (current_date - datetime.timedelta(days=30 * count)).strftime("%Y-%m-12")
-                    comparison_domain.extend([
-                        ("date", ">=", month_start),
-                        ("date", "<=", month_end),
-                    ])
-                elif comparison_type == "year":
-                    comparison_domain.extend([
-                        ("date", ">=", f"{current_year - count}-01-01"),
-                        ("date", "<=", f"{current_year - count}-12-31"),
-                    ])
-                
-                # Add filters from financial_report_id
-                if financial_report_id.journal_ids:
-                    comparison_domain.append(("journal_id", "in", financial_report_id.journal_ids.ids))
-                if financial_report_id.account_ids:
-                    comparison_domain.append(("account_id", "in", financial_report_id.account_ids.ids))
-                if financial_report_id.date_from:
-                    comparison_domain.append(("date", ">=", financial_report_id.date_from))
-                if financial_report_id.date_to:
-                    comparison_domain.append(("date", "<=", financial_report_id.date_to))
-                
-                account_entries = {}
-                for account_type in account_types.values():
-                    account_entries[account_type] = self._get_entries(
-                        comparison_domain,
-                        self.env["account.account"].search(
-                            [("account_type", "=", account_type)]
-                        ),
-                        account_type,
-                        financial_report_id.analytic_ids.ids if financial_report_id.analytic_ids else []
-                    )
-                total_income = sum(
-                    float(entry["amount"].replace(",", ""))
-                    for account_type in ["income", "income_other"]
-                    for entry in account_entries[account_type][0]
-                ) - sum(
-                    float(entry["amount"].replace(",", ""))
-                    for entry in account_entries["expense_direct_cost"][0]
-                )
-                total_expense = sum(
-                    float(entry["amount"].replace(",", ""))
-                    for account_type in ["expense", "expense_depreciation"]
-                    for entry in account_entries[account_type][0]
-                )
-                total_current_asset = sum(
-                    float(entry["amount"].replace(",", ""))
-                    for account_type in [
-                        "asset_receivable",
-                        "asset_current",
-                        "asset_cash",
-                        "asset_prepayments",
-                    ]
-                    for entry in account_entries[account_type][0]
-                )
-                total_assets = total_current_asset + sum(
-                    float(entry["amount"].replace(",", ""))
-                    for account_type in ["asset_fixed", "asset_non_current"]
-                    for entry in account_entries[account_type][0]
-                )
-                total_current_liability = sum(
-                    float(entry["amount"].replace(",", ""))
-                    for account_type in ["liability_current", "liability_payable"]
-                    for entry in account_entries[account_type][0]
-                )
-                total_liability = total_current_liability + sum(
-                    float(entry["amount"].replace(",", ""))
-                    for account_type in ["liability_non_current"]
-                    for entry in account_entries[account_type][0]
-                )
-                total_unallocated_earning = (total_income - total_expense) + sum(
-                    float(entry["amount"].replace(",", ""))
-                    for account_type in ["equity_unaffected"]
-                    for entry in account_entries[account_type][0]
-                )
-                total_equity = total_unallocated_earning + sum(
-                    float(entry["amount"].replace(",", ""))
-                    for account_type in ["equity"]
-                    for entry in account_entries[account_type][0]
-                )
-                total = total_liability + total_equity
-                data = {
-                    "total": total_income - total_expense,
-                    "total_expense": "{:,.2f}".format(total_expense),
-                    "total_income": "{:,.2f}".format(total_income),
-                    "total_current_asset": "{:,.2f}".format(total_current_asset),
-                    "total_assets": "{:,.2f}".format(total_assets),
-                    "total_current_liability": "{:,.2f}".format(
-                        total_current_liability
-                    ),
-                    "total_liability": "{:,.2f}".format(total_liability),
-                    "total_earnings": "{:,.2f}".format(total_income - total_expense),
-                    "total_unallocated_earning": "{:,.2f}".format(
-                        total_unallocated_earning
-                    ),
-                    "total_equity": "{:,.2f}".format(total_equity),
-                    "total_balance": "{:,.2f}".format(total),
-                    **account_entries,
-                }
-                datas.append(data)
-        else:
-            # Build domain for current year - don't search yet
-            no_comparison_domain = [
-                ("parent_state", "in", target_move),
-                ("date", ">=", f"{current_year}-01-01"),
-                ("date", "<=", f"{current_year}-12-31"),
-            ]
-            
-            # Add filters from financial_report_id
-            if financial_report_id.journal_ids:
-                no_comparison_domain.append(("journal_id", "in", financial_report_id.journal_ids.ids))
-            if financial_report_id.account_ids:
-                no_comparison_domain.append(("account_id", "in", financial_report_id.account_ids.ids))
-            if financial_report_id.date_from:
-                no_comparison_domain.append(("date", ">=", financial_report_id.date_from))
-            if financial_report_id.date_to:
-                no_comparison_domain.append(("date", "<=", financial_report_id.date_to))
-            
+        for index in range(len(periods)):
             account_entries = {}
-            for account_type in account_types.values():
+            for account_type in ACCOUNT_TYPES:
                 account_entries[account_type] = self._get_entries(
-                    no_comparison_domain,
-                    self.env["account.account"].search(
-                        [("account_type", "=", account_type)]
-                    ),
+                    accounts_by_type[account_type],
                     account_type,
-                    financial_report_id.analytic_ids.ids if financial_report_id.analytic_ids else []
+                    {
+                        account_id: sums[index]
+                        for account_id, sums in account_sums.items()
+                    },
                 )
-            total_income = sum(
-                float(entry["amount"].replace(",", ""))
-                for account_type in ["income", "income_other"]
-                for entry in account_entries[account_type][0]
-            ) - sum(
-                float(entry["amount"].replace(",", ""))
-                for entry in account_entries["expense_direct_cost"][0]
-            )
-            total_expense = sum(
-                float(entry["amount"].replace(",", ""))
-                for account_type in ["expense", "expense_depreciation"]
-                for entry in account_entries[account_type][0]
-            )
-            total_current_asset = sum(
-                float(entry["amount"].replace(",", ""))
-                for account_type in [
-                    "asset_receivable",
-                    "asset_current",
-                    "asset_cash",
-                    "asset_prepayments",
-                ]
-                for entry in account_entries[account_type][0]
-            )
-            total_assets = total_current_asset + sum(
-                float(entry["amount"].replace(",", ""))
-                for account_type in ["asset_fixed", "asset_non_current"]
-                for entry in account_entries[account_type][0]
-            )
-            total_current_liability = sum(
-                float(entry["amount"].replace(",", ""))
-                for account_type in ["liability_current", "liability_payable"]
-                for entry in account_entries[account_type][0]
-            )
-            total_liability = total_current_liability + sum(
-                float(entry["amount"].replace(",", ""))
-                for account_type in ["liability_non_current"]
-                for entry in account_entries[account_type][0]
-            )
-            total_unallocated_earning = (total_income - total_expense) + sum(
-                float(entry["amount"].replace(",", ""))
-                for account_type in ["equity_unaffected"]
-                for entry in account_entries[account_type][0]
-            )
-            total_equity = total_unallocated_earning + sum(
-                float(entry["amount"].replace(",", ""))
-                for account_type in ["equity"]
-                for entry in account_entries[account_type][0]
-            )
-            total = total_liability + total_equity
-            data = {
-                "total": total_income - total_expense,
-                "total_expense": "{:,.2f}".format(total_expense),
-                "total_income": "{:,.2f}".format(total_income),
-                "total_current_asset": "{:,.2f}".format(total_current_asset),
-                "total_assets": "{:,.2f}".format(total_assets),
-                "total_current_liability": "{:,.2f}".format(total_current_liability),
-                "total_liability": "{:,.2f}".format(total_liability),
-                "total_earnings": "{:,.2f}".format(total_income - total_expense),
-                "total_unallocated_earning": "{:,.2f}".format(
-                    total_unallocated_earning
-                ),
-                "total_equity": "{:,.2f}".format(total_equity),
-                "total_balance": "{:,.2f}".format(total),
-                **account_entries,
-            }
+            data = self._get_period_totals(account_entries)
             datas.append(data)
         filters = []
         return data, filters, datas
-   
+
+    def _get_balance_sheet_periods(self, comparison, comparison_type):
+        """
+        Build the periods of the report: the current fiscal year, or the
+        current month/fiscal year followed by ``comparison`` previous ones.
+        :param comparison: Number of comparison periods, if any.
+        :param comparison_type: Comparison type ('month' or 'year').
+        :return: List of (date_from, date_to) pairs, most recent first;
+            (None, None) means no date restriction.
+        """
+        today = fields.Date.today()
+        if not comparison:
+            return [self._get_fiscal_year(today)]
+        if comparison_type == "month":
+            current = get_month(today)
+        elif comparison_type == "year":
+            current = self._get_fiscal_year(today)
+        else:
+            return [(None, None)] * (int(comparison) + 1)
+        return [current] + self._get_comparison_periods(
+            current[0], current[1], comparison, comparison_type
+        )
+
+    def _get_cached_period_account_sums(
+        self, financial_report_id, target_move, periods
+    ):
+        """
+        Return the sums of :meth:`_get_period_account_sums`, served from the
+        result cache when the same filters and periods were already computed.
+        :return: Dictionary {account_id: [(debit, credit), ...]}.
+        """
+        date_from = financial_report_id.date_from
+        date_to = financial_report_id.date_to
+        if all(period[0] for period in periods):
+            period_from = min(period[0] for period in periods)
+            period_to = max(period[1] for period in periods)
+            date_from = max(filter(None, [date_from, period_from]))
+            date_to = min(filter(None, [date_to, period_to]))
+        filters = [
+            "period_account_sums",
+            sorted(financial_report_id.journal_ids.ids),
+            sorted(financial_report_id.account_ids.ids),
+            financial_report_id.date_from,
+            financial_report_id.date_to,
+            target_move,
+            periods,
+        ]
+        account_sums = self._get_cached_report(
+            filters,
+            lambda: self._get_period_account_sums(
+                financial_report_id, target_move, periods
+            ),
+            target_move,
+            date_from=date_from,
+            date_to=date_to,
+        )
+        # JSON convierte las claves en texto
+        return {int(account_id): sums for account_id, sums in account_sums.items()}
+
+    def _get_period_account_sums(self, financial_report_id, target_move, periods):
+        """
+        Sum debit and credit per account for every period at once, using one
+        conditional aggregation (``FILTER``) column pair per period.
+        :param financial_report_id: Report wizard holding the journal, account
+            and date filters.
+        :param target_move: Accepted parent move states.
+        :param periods: List of (date_from, date_to) pairs; (None, None)
+            means no date restriction.
+        :return: Dictionary {account_id: [(debit, credit), ...]} with one
+            tuple per period, in the same order as ``periods``.
+        """
+        self.env["account.move.line"].flush_model()
+        params = {
+            "company_ids": self.env.companies.ids,
+            "states": target_move,
+        }
+        conditions = [
+            "aml.company_id = ANY(%(company_ids)s)",
+            "aml.parent_state = ANY(%(states)s)",
+        ]
+        if financial_report_id.journal_ids:
+            conditions.append("aml.journal_id = ANY(%(journal_ids)s)")
+            params["journal_ids"] = financial_report_id.journal_ids.ids
+        if financial_report_id.account_ids:
+            conditions.append("aml.account_id = ANY(%(account_ids)s)")
+            params["account_ids"] = financial_report_id.account_ids.ids
+        if financial_report_id.date_from:
+            conditions.append("aml.date >= %(date_from)s")
+            params["date_from"] = financial_report_id.date_from
+        if financial_report_id.date_to:
+            conditions.append("aml.date <= %(date_to)s")
+            params["date_to"] = financial_report_id.date_to
+        columns = []
+        for index, (period_from, period_to) in enumerate(periods):
+            period_filter = "TRUE"
+            if period_from:
+                params[f"period_from_{index}"] = period_from
+                params[f"period_to_{index}"] = period_to
+                period_filter = (
+                    f"aml.date >= %(period_from_{index})s"
+                    f" AND aml.date <= %(period_to_{index})s"
+                )
+            columns.append(f"SUM(aml.debit) FILTER (WHERE {period_filter})")
+            columns.append(f"SUM(aml.credit) FILTER (WHERE {period_filter})")
+        query = f"""
+            SELECT aml.account_id, {", ".join(columns)}
+              FROM account_move_line aml
+              JOIN account_account account ON account.id = aml.account_id
+             WHERE {" AND ".join(conditions)}
+               AND account.account_type = ANY(%(account_types)s)
+          GROUP BY aml.account_id
+        """
+        params["account_types"] = list(ACCOUNT_TYPES)
+        self.env.cr.execute(query, params)
+        return {
+            row[0]: [
+                (row[index] or 0, row[index + 1] or 0)
+                for index in range(1, len(row), 2)
+            ]
+            for row in self.env.cr.fetchall()
+        }
+
+    def _get_consolidation_rates(self, periods):
+        """
+        Rates converting the currency of every active company into the
+        currency of the current one, at the end of each period; the rates of
+        all the currencies of a period are read at once.
+        :param periods: List of (date_from, date_to) pairs; (None, None)
+            means no date restriction and takes today's rates.
+        :return: Dictionary {company_id: [rate, ...]} with one rate per
+            period, in the same order as ``periods``.
+        """
+        company = self.env.company
+        currencies = self.env.companies.currency_id | company.currency_id
+        today = fields.Date.today()
+        period_rates = [
+            currencies._get_rates(company, period_to or today)
+            for _period_from, period_to in periods
+        ]
+        return {
+            other.id: [
+                rates[company.currency_id.id] / rates[other.currency_id.id]
+                for rates in period_rates
+            ]
+            for other in self.env.companies
+        }
+
+    def _consolidate_account_sums(self, account_sums, accounts_by_type, periods):
+        """
+        Merge the accounts of the active companies by code, converting the
+        sums of each company to the currency of the current company.
+        The merged account is the one of the current company when it has
+        one with that code, else the first one found.
+        :param account_sums: Dictionary {account_id: [(debit, credit), ...]}.
+        :param accounts_by_type: Dictionary {account_type: accounts}.
+        :param periods: Periods of the sums.
+        :return: Tuple of the merged sums and accounts, in the same shapes.
+        """
+        rates = self._get_consolidation_rates(periods)
+        consolidated_sums = {}
+        consolidated_accounts = {}
+        for account_type, accounts in accounts_by_type.items():
+            accounts_by_code = {}
+            sums_by_code = {}
+            for account in accounts:
+                if (
+                    account.code not in accounts_by_code
+                    or account.company_id == self.env.company
+                ):
+                    accounts_by_code[account.code] = account
+                if account.id not in account_sums:
+                    continue
+                merged = sums_by_code.get(account.code, [(0, 0)] * len(periods))
+                sums_by_code[account.code] = [
+                    (debit + period_debit * rate, credit + period_credit * rate)
+                    for (debit, credit), (period_debit, period_credit), rate in zip(
+                        merged, account_sums[account.id], rates[account.company_id.id]
+                    )
+                ]
+            consolidated_accounts[account_type] = self.env["account.account"].concat(
+                *accounts_by_code.values()
+            )
+            for code, sums in sums_by_code.items():
+                consolidated_sums[accounts_by_code[code].id] = sums
+        return consolidated_sums, consolidated_accounts
+
+    def _get_period_totals(self, account_entries):
+        """
+        Compute the section totals of one period from its account entries.
+        :param account_entries: Dictionary {account_type: (entries, total)}.
+        :return: The period data sent to the client.
+        """
+        total_income = sum(
+            float(entry["amount"].replace(",", ""))
+            for account_type in ["income", "income_other"]
+            for entry in account_entries[account_type][0]
+        ) - sum(
+            float(entry["amount"].replace(",", ""))
+            for entry in account_entries["expense_direct_cost"][0]
+        )
+        total_expense = sum(
+            float(entry["amount"].replace(",", ""))
+            for account_type in ["expense", "expense_depreciation"]
+            for entry in account_entries[account_type][0]
+        )
+        total_current_asset = sum(
+            float(entry["amount"].replace(",", ""))
+            for account_type in [
+                "asset_receivable",
+                "asset_current",
+                "asset_cash",
+                "asset_prepayments",
+            ]
+            for entry in account_entries[account_type][0]
+        )
+        total_assets = total_current_asset + sum(
+            float(entry["amount"].replace(",", ""))
+            for account_type in ["asset_fixed", "asset_non_current"]
+            for entry in account_entries[account_type][0]
+        )
+        total_current_liability = sum(
+            float(entry["amount"].replace(",", ""))
+            for account_type in ["liability_current", "liability_payable"]
+            for entry in account_entries[account_type][0]
+        )
+        total_liability = total_current_liability + sum(
+            float(entry["amount"].replace(",", ""))
+            for account_type in ["liability_non_current"]
+            for entry in account_entries[account_type][0]
+        )
+        total_unallocated_earning = (total_income - total_expense) + sum(
+            float(entry["amount"].replace(",", ""))
+            for account_type in ["equity_unaffected"]
+            for entry in account_entries[account_type][0]
+        )
+        total_equity = total_unallocated_earning + sum(
+            float(entry["amount"].replace(",", ""))
+            for account_type in ["equity"]
+            for entry in account_entries[account_type][0]
+        )
+        total = total_liability + total_equity
+        return {
+            "total": total_income - total_expense,
+            "total_expense": "{:,.2f}".format(total_expense),
+            "total_income": "{:,.2f}".format(total_income),
+            "total_current_asset": "{:,.2f}".format(total_current_asset),
+            "total_assets": "{:,.2f}".format(total_assets),
+            "total_current_liability": "{:,.2f}".format(total_current_liability),
+            "total_liability": "{:,.2f}".format(total_liability),
+            "total_earnings": "{:,.2f}".format(total_income - total_expense),
+            "total_unallocated_earning": "{:,.2f}".format(
+                total_unallocated_earning
+            ),
+            "total_equity": "{:,.2f}".format(total_equity),
+            "total_balance": "{:,.2f}".format(total),
+            **account_entries,
+        }
+
+    @report_perf
     def get_filter(self):
         return self._get_filter_data()
 
-    def _get_entries(self, search_domain, account_ids, account_type, analytic_ids=None):
+    def _get_entries(self, account_ids, account_type, account_sums):
         """
         Get the entries for the specified account type.
-        Uses database aggregation to avoid loading data into memory.
-        :param search_domain: The domain for filtering account move lines.
-        :param account_ids: The account IDs to filter.
+        The sums are computed beforehand by :meth:`_get_period_account_sums`.
+        :param account_ids: The accounts of the type, in display order.
         :param account_type: The account type.
-        :param analytic_ids: Optional analytic account IDs for filtering.
+        :param account_sums: Dictionary {account_id: (debit, credit)}.
         :return: A tuple containing the entries and the total amount.
         """
         entries = []
         total = 0
-        analytic_ids = analytic_ids or []
-        
-        # Process accounts in batches to avoid memory issues
-        batch_size = 100
-        account_list = list(account_ids)
-        
-        for batch_start in range(0, len(account_list), batch_size):
-            batch_end = min(batch_start + batch_size, len(account_list))
-            batch_accounts = account_list[batch_start:batch_end]
-            batch_account_ids = [acc.id for acc in batch_accounts]
-            
-            # Build complete domain with account filter
-            query_domain = search_domain + [('account_id', 'in', batch_account_ids)]
-            
-            # Use read_group for efficient aggregation at database level
-            try:
-                result = self.env['account.move.line'].read_group(
-                    query_domain,
-                    ['account_id', 'debit:sum', 'credit:sum'],
-                    ['account_id']
-                )
-            except Exception as e:
-                _logger.warning(f"Error in read_group: {e}")
-                result = []
-            
-            # Create a map of account_id to sums
-            account_sums = {}
-            for r in result:
-                account_id = r['account_id'][0] if isinstance(r['account_id'], tuple) else r['account_id']
-                account_sums[account_id] = r
-            
-            # Process each account in the batch
-            for account in batch_accounts:
-                if account.id in account_sums:
-                    debit_sum = account_sums[account.id].get('debit', 0) or 0
-                    credit_sum = account_sums[account.id].get('credit', 0) or 0
-                    
-                    if account_type in [
-                        "income",
-                        "income_other",
-                        "liability_payable",
-                        "liability_current",
-                        "liability_non_current",
-                        "equity",
-                        "equity_unaffected",
-                    ]:
-                        amount = -(debit_sum - credit_sum)
-                    else:
-                        amount = debit_sum - credit_sum
-                        
-                    entries.append(
-                        {
-                            "name": "{} - {}".format(account.code, account.name),
-                            "amount": "{:,.2f}".format(amount),
-                        }
-                    )
-                    total += amount
+        for account in account_ids:
+            if account.id in account_sums:
+                debit_sum, credit_sum = account_sums[account.id]
+                if account_type in [
+                    "income",
+                    "income_other",
+                    "liability_payable",
+                    "liability_current",
+                    "liability_non_current",
+                    "equity",
+                    "equity_unaffected",
+                ]:
+                    amount = -(debit_sum - credit_sum)
                 else:
-                    entries.append(
-                        {
-                            "name": "{} - {}".format(account.code, account.name),
-                            "amount": "{:,.2f}".format(0),
-                        }
-                    )
-        
+                    amount = debit_sum - credit_sum
+                entries.append(
+                    {
+                        "name": "{} - {}".format(account.code, account.name),
+                        "amount": "{:,.2f}".format(amount),
+                    }
+                )
+                total += amount
+            else:
+                entries.append(
+                    {
+                        "name": "{} - {}".format(account.code, account.name),
+                        "amount": "{:,.2f}".format(0),
+                    }
+                )
         return entries, "{:,.2f}".format(total)
 
     def filter(self, vals):
@@ -500,28 +517,28 @@ class ProfitLossReport(models.TransientModel):
         if "target" in vals:
             self.write({"target_move": vals["target"]})
             filter.append({"target_move": self.target_move})
+        if "consolidate" in vals:
+            self.write({"consolidate": bool(vals["consolidate"])})
+            filter.append({"consolidate": self.consolidate})
         return filter
 
     def _get_filter_data(self):
         """
-        Retrieve the filter data for journals and accounts.
+        Retrieve the filter data for journals and accounts from the cached
+        filter catalogs of the company.
 
         :return: A dictionary containing the filter data.
         """
+        catalogs = self.get_filter_catalogs()
 
-        journal_ids = self.env["account.journal"].search([])
-        journal = [{"id": journal.id, "name": journal.name} for journal in journal_ids]
-
-        account_ids = self.env["account.account"].search([])
-        account = [{"id": account.id, "name": account.name} for account in account_ids]
-
-        analytic_ids = self.env["account.analytic.account"].search([])
-        analytic = [
-            {"id": analytic.id, "name": analytic.name} for analytic in analytic_ids
-        ]
+        def records(catalog):
+            return [{"id": record_id, "name": name} for record_id, _code, name in catalog]
 
-        filter = {"journal": journal, "account": account, "analytic": analytic}
-        return filter
+        return {
+            "journal": records(catalogs["journals"]),
+            "account": records(catalogs["accounts"]),
+            "analytic": records(catalogs["analytics"]),
+        }
 
     @api.model
     def comparison_filter(self, options, count):
@@ -554,15 +571,29 @@ class ProfitLossReport(models.TransientModel):
         return last_year_date_list
 
     @api.model
+    def _get_xlsx_data(self, options):
+        """
+        Rebuild the data of the XLSX export from the filters of the client.
+
+        :param dict options: ``args`` of ``view_report`` (the filter wizard,
+            the comparison and its type) and ``year``, the headers of the
+            periods shown by the client.
+        :return: The data expected by ``get_xlsx_report``.
+        :rtype: dict
+        """
+        datas = self.view_report(*options["args"])[2]
+        return {"datas": datas, "year": options.get("year", [])}
+
+    @api.model
+    @report_perf
     def get_xlsx_report(self, data, response, report_name, report_action):
         """Generate and return an XLSX report based on the provided data.
         :param data: The report data in JSON format.
         :param report_name: Name of the report.
         :param response: The response object to write the generated report to.
         """
-        data = json.loads(data)
-        output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output, {"in_memory": True})
+        data = self._load_xlsx_data(data)
+        workbook = self._open_xlsx_workbook(response)
         sheet = workbook.add_worksheet()
         sub_heading = workbook.add_format(
             {
@@ -1250,7 +1281,4 @@ class ProfitLossReport(models.TransientModel):
                 for datas in data["datas"]:
                     sheet.write(row, col + 1, datas["total_balance"], side_heading_sub)
                     col += 1
-        workbook.close()
-        output.seek(0)
-        response.stream.write(output.read())
-        output.close()
\ No newline at end of file
+        self._close_xlsx_workbook(workbook, response)
@@ -0,0 +1,334 @@
+################################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>).
+#    Author: Ammu Raj (odoo@cybrosys.com)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+################################################################################
+import hashlib
+import json
+from functools import partial
+
+import psycopg2
+from psycopg2 import errors
+
+from odoo import SUPERUSER_ID, api, fields, models, tools
+
+# Límites del caché de resultados; al superarlos se descartan las entradas
+# usadas menos recientemente.
+CACHE_MAX_ENTRIES = 500
+CACHE_MAX_SIZE = 64 * 1024 * 1024
+# Minutos entre dos actualizaciones de ``last_used`` de una misma entrada:
+# servir una entrada no debe escribir en ella en cada lectura.
+CACHE_TOUCH_INTERVAL = 5
+
+
+class DynamicReportCache(models.Model):
+    """Server-side cache of the results of the dynamic reports.
+
+    Every entry covers the journal items of its companies between
+    ``date_from`` and ``date_to`` (an empty bound means unbounded) and is
+    dropped as soon as a journal entry of those companies dated in that
+    range is posted, reset to draft, deleted or has its posted items edited.
+    Results are only shared between users seeing the same journal items.
+
+    A result is only stored when the posting generation of its companies
+    (see ``dynamic.report.cache.generation``) has not moved since the
+    transaction computing it started; entries stored while a posting was
+    being committed are dropped again right after its commit.
+    """
+
+    _name = "dynamic.report.cache"
+    _description = "Dynamic Report Result Cache"
+    _order = "last_used desc"
+
+    key = fields.Char(required=True, index=True, help="Hash of the report inputs.")
+    report_model = fields.Char(required=True, help="Model of the cached report.")
+    company_ids = fields.Many2many(
+        "res.company", help="Companies whose journal items the result covers."
+    )
+    date_from = fields.Date(help="First date covered by the result, if any.")
+    date_to = fields.Date(help="Last date covered by the result, if any.")
+    payload = fields.Text(required=True, help="JSON encoded report result.")
+    size = fields.Integer(help="Size of the payload, in bytes.")
+    last_used = fields.Datetime(
+        default=fields.Datetime.now, index=True, help="Last time it was served."
+    )
+    generations = fields.Char(
+        help="JSON posting generation of each company the result was computed "
+        "at."
+    )
+
+    _sql_constraints = [
+        ("key_unique", "UNIQUE(key)", "A report result is cached only once."),
+    ]
+
+    @api.model
+    def _get_access_key(self):
+        """Return what the current user can see of the journal items the
+        reports are computed from: the record rules evaluated for the user,
+        or True in superuser mode."""
+        if self.env.su:
+            return True
+        return self.env["ir.rule"]._compute_domain("account.move.line", "read")
+
+    @api.model
+    def _get_key(self, report_model, filters):
+        """Hash the report model, the active companies, the language, the
+        record rules of the user and the canonical filters into the cache
+        key."""
+        key = json.dumps(
+            [
+                report_model,
+                sorted(self.env.companies.ids),
+                self.env.lang,
+                self._get_access_key(),
+                filters,
+            ],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    @api.model
+    def _get_or_compute(self, report_model, filters, compute, date_from, date_to):
+        """
+        Serve the cached result of a report or compute and store it.
+
+        :param str report_model: Model of the report.
+        :param filters: Canonical filters and periods of the report; any JSON
+            serializable value.
+        :param compute: Callable returning the report result.
+        :param date date_from: First date the result depends on, or None.
+        :param date date_to: Last date the result depends on, or None.
+        :return: The report result, as the client receives it.
+        """
+        # Las entradas se leen con sudo: comprobar el acceso del usuario
+        self.env["account.move.line"].check_access_rights("read")
+        cache = self.sudo()
+        key = self._get_key(report_model, filters)
+        entry = cache.search([("key", "=", key)], limit=1)
+        if entry:
+            now = fields.Datetime.now()
+            if entry.last_used < fields.Datetime.subtract(
+                now, minutes=CACHE_TOUCH_INTERVAL
+            ):
+                entry.last_used = now
+            return json.loads(entry.payload)
+        company_ids = sorted(self.env.companies.ids)
+        generations = cache._get_generations(company_ids)
+        payload = json.dumps(compute(), default=str)
+        if not cache._lock_generations(company_ids, generations):
+            # Algo se contabilizó mientras se calculaba: no se guarda
+            return json.loads(payload)
+        try:
+            with self.env.cr.savepoint(), tools.mute_logger("odoo.sql_db"):
+                cache.create(
+                    {
+                        "key": key,
+                        "report_model": report_model,
+                        "company_ids": [(6, 0, company_ids)],
+                        "date_from": date_from,
+                        "date_to": date_to,
+                        "payload": payload,
+                        "size": len(payload),
+                        "generations": json.dumps(generations),
+                    }
+                )
+        except psycopg2.IntegrityError:
+            # Otro proceso guardó el mismo resultado en paralelo
+            pass
+        else:
+            cache._evict()
+        return json.loads(payload)
+
+    @api.model
+    def _get_generations(self, company_ids):
+        """
+        Return the posting generation of the companies as seen by the
+        current transaction, creating the missing counters.
+
+        :param list[int] company_ids: Sorted ids of the companies.
+        :return: Dictionary {company id: generation}.
+        :rtype: dict
+        """
+        table = self.env["dynamic.report.cache.generation"]._table
+        query = f"SELECT company_id, generation FROM {table} WHERE company_id = ANY(%s)"
+        self.env.cr.execute(query, [company_ids])
+        generations = dict(self.env.cr.fetchall())
+        if len(generations) < len(company_ids):
+            try:
+                with self.env.cr.savepoint(), tools.mute_logger("odoo.sql_db"):
+                    self.env.cr.execute(
+                        f"""
+                        INSERT INTO {table} (company_id, generation)
+                        SELECT company_id, 0 FROM unnest(%s) AS company_id
+                            ON CONFLICT (company_id) DO NOTHING
+                        """,
+                        [company_ids],
+                    )
+            except errors.SerializationFailure:
+                # Otra transacción lo acaba de crear; el resultado no se guardará
+                return generations
+            self.env.cr.execute(query, [company_ids])
+            generations = dict(self.env.cr.fetchall())
+        return generations
+
+    @api.model
+    def _lock_generations(self, company_ids, generations):
+        """
+        Lock the posting generation of the companies until the end of the
+        transaction and tell whether it is still ``generations``. In
+        repeatable read, locking a counter raised by a transaction committed
+        after this one started fails: the result would be stale. A counter
+        missing from ``generations`` also makes the result unstorable.
+
+        :rtype: bool
+        """
+        table = self.env["dynamic.report.cache.generation"]._table
+        try:
+            with self.env.cr.savepoint(), tools.mute_logger("odoo.sql_db"):
+                self.env.cr.execute(
+                    f"""
+                    SELECT company_id, generation FROM {table}
+                     WHERE company_id = ANY(%s)
+                       FOR SHARE
+                    """,
+                    [company_ids],
+                )
+                locked = dict(self.env.cr.fetchall())
+                return len(locked) == len(company_ids) and locked == generations
+        except errors.SerializationFailure:
+            return False
+
+    @api.model
+    def _evict(self):
+        """Drop the least recently used entries beyond the cache limits."""
+        self.flush_model()
+        self.env.cr.execute(
+            """
+            SELECT id FROM (
+                SELECT id,
+                       ROW_NUMBER() OVER w AS position,
+                       SUM(size) OVER w AS total_size
+                  FROM dynamic_report_cache
+                WINDOW w AS (ORDER BY last_used DESC, id DESC)
+            ) entries
+             WHERE position > %s OR total_size > %s
+            """,
+            (CACHE_MAX_ENTRIES, CACHE_MAX_SIZE),
+        )
+        expired_ids = [row[0] for row in self.env.cr.fetchall()]
+        if expired_ids:
+            self.browse(expired_ids).unlink()
+
+    @api.model
+    def _invalidate(self, moves):
+        """
+        Drop the entries covering the date and company of the given journal
+        entries, now and again right after the commit, then raise the
+        posting generation of their companies.
+
+        :param moves: account.move recordset being posted, reset to draft,
+            deleted or edited.
+        """
+        ranges = {}
+        for move in moves:
+            if move.date:
+                low, high = ranges.get(move.company_id.id, (move.date, move.date))
+                ranges[move.company_id.id] = (min(low, move.date), max(high, move.date))
+        if not ranges:
+            return
+        self.sudo()._drop_entries(ranges)
+        postcommit = self.env.cr.postcommit
+        pending = postcommit.data.get("dynamic.report.cache.ranges")
+        if pending is None:
+            pending = postcommit.data["dynamic.report.cache.ranges"] = {}
+            postcommit.add(partial(self._invalidate_after_commit, self.pool, pending))
+        for company_id, (low, high) in ranges.items():
+            pending_low, pending_high = pending.get(company_id, (low, high))
+            pending[company_id] = (min(low, pending_low), max(high, pending_high))
+
+    @staticmethod
+    def _invalidate_after_commit(registry, ranges):
+        """Raise the posting generation of the companies, which makes the
+        results still being computed from before the commit unstorable,
+        then drop the entries stored meanwhile."""
+        with registry.cursor() as cr:
+            cache = api.Environment(cr, SUPERUSER_ID, {})["dynamic.report.cache"]
+            cache._raise_generations(sorted(ranges))
+        # Nueva transacción: ve las entradas confirmadas mientras tanto
+        with registry.cursor() as cr:
+            cache = api.Environment(cr, SUPERUSER_ID, {})["dynamic.report.cache"]
+            cache._drop_entries(ranges)
+
+    @api.model
+    def _raise_generations(self, company_ids):
+        """Increment the posting generation of the companies."""
+        table = self.env["dynamic.report.cache.generation"]._table
+        self.env.cr.execute(
+            f"""
+            INSERT INTO {table} AS counter (company_id, generation)
+            SELECT company_id, 1 FROM unnest(%s) AS company_id
+                ON CONFLICT (company_id)
+            DO UPDATE SET generation = counter.generation + 1
+            """,
+            [company_ids],
+        )
+
+    @api.model
+    def _drop_entries(self, ranges):
+        """
+        Drop the entries covering any date of the given ranges.
+
+        :param dict ranges: {company id: (first date, last date)}.
+        """
+        for company_id, (low, high) in ranges.items():
+            self.search(
+                [
+                    ("company_ids", "in", company_id),
+                    "|",
+                    ("date_from", "=", False),
+                    ("date_from", "<=", high),
+                    "|",
+                    ("date_to", "=", False),
+                    ("date_to", ">=", low),
+                ]
+            ).unlink()
+
+
+class DynamicReportCacheGeneration(models.Model):
+    """Posting generation of each company.
+
+    Raised right after every commit posting, resetting to draft, deleting
+    or editing posted journal entries of the company, without locking
+    anything during the posting itself.
+    """
+
+    _name = "dynamic.report.cache.generation"
+    _description = "Dynamic Report Cache Posting Generation"
+    _log_access = False
+
+    company_id = fields.Many2one("res.company", required=True, ondelete="cascade")
+    generation = fields.Integer(required=True, default=0)
+
+    _sql_constraints = [
+        (
+            "company_unique",
+            "UNIQUE(company_id)",
+            "A company has a single posting generation.",
+        ),
+    ]
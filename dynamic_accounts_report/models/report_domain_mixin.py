@@ -0,0 +1,357 @@
+################################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>).
+#    Author: Ammu Raj (odoo@cybrosys.com)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+################################################################################
+import calendar
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import api, fields, models, tools
+from odoo.tools import date_utils
+
+# Meses que separan dos periodos consecutivos de cada tipo de comparación.
+COMPARISON_MONTHS = {"month": 1, "quarter": 3, "year": 12}
+# Modelos listados por los catálogos de filtros de los informes.
+CATALOG_MODELS = ("account.journal", "account.account", "account.analytic.account")
+
+
+class ReportDomainMixin(models.AbstractModel):
+    """Period and domain builder shared by all the dynamic reports.
+
+    Every report turns the filters of the client into states, date bounds,
+    comparison periods and journal item domains through these methods, so
+    that the same filters always yield the same normalized values.
+    """
+
+    _name = "report.domain.mixin"
+    _description = "Report Period and Domain Service"
+
+    @api.model
+    def _get_move_states(self, options):
+        """
+        Return the accepted parent move states for the 'draft' option.
+
+        :param options: Options of the client (dict, list or str), or None.
+        :return: ['posted'] or ['posted', 'draft'].
+        :rtype: list
+        """
+        if options and "draft" in options:
+            return ["posted", "draft"]
+        return ["posted"]
+
+    @api.model
+    def _to_date(self, value):
+        """Return ``value`` ('YYYY-MM-DD' string or date) as a date, or None."""
+        return fields.Date.to_date(value) if value else None
+
+    @api.model
+    def _get_fiscal_year(self, date):
+        """Return the (start, end) of the fiscal year of the company holding
+        ``date``."""
+        company = self.env.company
+        return date_utils.get_fiscal_year(
+            date,
+            day=company.fiscalyear_last_day,
+            month=int(company.fiscalyear_last_month),
+        )
+
+    @api.model
+    def _get_date_bounds(self, data_range):
+        """
+        Translate the date range option of the client into date bounds.
+
+        :param data_range: Preset name ('month', 'quarter', 'year',
+            'last-month', 'last-quarter', 'last-year') or a dict with
+            'start_date' and/or 'end_date'.
+        :return: Tuple (date_from, date_to); any of them can be None.
+        :rtype: tuple
+        """
+        if not data_range:
+            return None, None
+        today = fields.Date.today()
+        if data_range == "month":
+            return date_utils.get_month(today)
+        if data_range == "quarter":
+            return date_utils.get_quarter(today)
+        if data_range == "year":
+            return self._get_fiscal_year(today)
+        if data_range == "last-month":
+            return date_utils.get_month(today - relativedelta(months=1))
+        if data_range == "last-quarter":
+            return date_utils.get_quarter(today - relativedelta(months=3))
+        if data_range == "last-year":
+            return self._get_fiscal_year(today - relativedelta(years=1))
+        if isinstance(data_range, str):
+            return None, None
+        return (
+            self._to_date(data_range.get("start_date")),
+            self._to_date(data_range.get("end_date")),
+        )
+
+    @api.model
+    def _get_report_period(self, start_date, end_date, comparison_type=None):
+        """
+        Parse the period of a comparison report; with a yearly comparison it
+        is widened to the fiscal years holding its bounds.
+
+        :return: Tuple (start_date, end_date) of dates.
+        :rtype: tuple
+        """
+        start_date = self._to_date(start_date)
+        end_date = self._to_date(end_date)
+        if comparison_type == "year":
+            start_date = self._get_fiscal_year(start_date)[0]
+            end_date = self._get_fiscal_year(end_date)[1]
+        return start_date, end_date
+
+    @api.model
+    def _get_comparison_periods(self, start_date, end_date, count, comparison_type):
+        """
+        Build the comparison periods preceding the current one.
+
+        :param date start_date: Start of the current period.
+        :param date end_date: End of the current period.
+        :param int count: Number of comparison periods.
+        :param str comparison_type: 'month', 'quarter' or 'year'.
+        :return: List of ``(start, end)`` date pairs, most recent first.
+        :rtype: list
+        """
+        months = COMPARISON_MONTHS.get(comparison_type)
+        if not count or not months:
+            return []
+        # Un periodo que termina a fin de mes sigue terminando a fin de mes
+        month_end = end_date == date_utils.end_of(end_date, "month")
+        periods = []
+        for index in range(1, int(count) + 1):
+            period_end = date_utils.subtract(end_date, months=months * index)
+            if month_end:
+                period_end = date_utils.end_of(period_end, "month")
+            periods.append(
+                (date_utils.subtract(start_date, months=months * index), period_end)
+            )
+        return periods
+
+    @api.model
+    def _get_period_label(self, date, comparison_type):
+        """Return the column label of the period starting on ``date``
+        ('Jan 2024', 'Q 1 2024'), or False for other comparison types."""
+        if comparison_type == "month":
+            return f"{calendar.month_abbr[date.month]} {date.year}"
+        if comparison_type == "quarter":
+            return f"Q {date_utils.get_quarter_number(date)} {date.year}"
+        return False
+
+    @api.model
+    def _get_period_labels(self, start_date, periods, comparison_type):
+        """
+        Label the current period and its comparison periods.
+
+        :return: Dictionary {'dynamic_date_num<i>': label}, the current
+            period being number 0; empty for yearly comparisons.
+        :rtype: dict
+        """
+        labels = {}
+        for index, period_start in enumerate(
+            [start_date] + [period[0] for period in periods]
+        ):
+            label = self._get_period_label(period_start, comparison_type)
+            if label:
+                labels[f"dynamic_date_num{index}"] = label
+        return labels
+
+    @api.model
+    def _get_xlsx_period_headers(self, period_labels, options):
+        """
+        Column headers of the periods of an XLSX export, oldest first as the
+        client shows them.
+
+        :param dict period_labels: Labels of :meth:`_get_period_labels`.
+        :param dict options: Export options; their ``date_viewed`` (the
+            headers of the client) is used when there are no labels, as for
+            yearly comparisons.
+        :rtype: list
+        """
+        headers = list(dict.fromkeys(period_labels.values()))
+        return headers[::-1] if headers else options.get("date_viewed", [])
+
+    @api.model
+    def get_filter_catalogs(self):
+        """
+        Return the journals, accounts and analytic accounts offered by the
+        filters of the reports for the current company, as far as the user
+        may read them. The client loads them once per session; the filter
+        calls only return report data.
+
+        :return: Dictionary with 'journals', 'accounts' and 'analytics',
+            each a list of ``(id, code, name)`` tuples.
+        :rtype: dict
+        """
+        catalogs = self.env["report.domain.mixin"]
+        return catalogs._get_filter_catalogs(
+            self.env.company.id,
+            self.env.lang,
+            tuple(catalogs._get_catalog_access(model) for model in CATALOG_MODELS),
+        )
+
+    @api.model
+    def _get_catalog_access(self, model):
+        """Return what the current user can read of ``model``: False without
+        read access, otherwise its record rules evaluated for the user, or
+        True in superuser mode."""
+        if self.env.su:
+            return True
+        if not self.env[model].check_access_rights("read", raise_exception=False):
+            return False
+        return str(self.env["ir.rule"]._compute_domain(model, "read"))
+
+    @api.model
+    @tools.ormcache("company_id", "lang", "access")
+    def _get_filter_catalogs(self, company_id, lang, access):
+        """Read the catalogs of :meth:`get_filter_catalogs` as the current
+        user; cached per company, language and access of the user (see
+        :meth:`_get_catalog_access`) until one of the catalog records
+        changes (see ``report.filter.catalog.mixin``)."""
+        env = self.with_context(lang=lang, active_test=True).env
+        readable = dict(zip(CATALOG_MODELS, access))
+
+        def catalog(model, domain, order=None):
+            if readable[model] is False:
+                return ()
+            records = env[model].search_read(domain, ["code", "name"], order=order)
+            return tuple(
+                (record["id"], record["code"] or "", record["name"])
+                for record in records
+            )
+
+        return {
+            "journals": catalog("account.journal", [("company_id", "=", company_id)]),
+            "accounts": catalog(
+                "account.account",
+                [("company_id", "=", company_id), ("deprecated", "=", False)],
+                order="code asc",
+            ),
+            "analytics": catalog(
+                "account.analytic.account",
+                [("company_id", "in", [company_id, False])],
+            ),
+        }
+
+    @api.model
+    def _get_move_line_domain(
+        self,
+        states,
+        date_from=None,
+        date_to=None,
+        journal_ids=None,
+        account_ids=None,
+        partner_ids=None,
+        analytic_ids=None,
+        cash_basis=False,
+    ):
+        """
+        Build the journal item domain of a report in a canonical form: the
+        leaves always come in the same order and the ids are deduplicated
+        and sorted, so equal filters give equal domains.
+
+        :param list[str] states: Accepted parent move states.
+        :param date date_from: Optional start of the period.
+        :param date date_to: Optional end of the period.
+        :param list[int] journal_ids: Optional journals to restrict on.
+        :param list[int] account_ids: Optional accounts to restrict on.
+        :param list[int] partner_ids: Optional partners to restrict on.
+        :param list[int] analytic_ids: Optional analytic accounts to restrict
+            on.
+        :param bool cash_basis: Restrict on the cash basis journal of the
+            company.
+        :return: Domain on account.move.line.
+        :rtype: list
+        """
+        domain = [
+            ("company_id", "in", sorted(self.env.companies.ids)),
+            ("parent_state", "in", sorted(states)),
+        ]
+        if date_from:
+            domain.append(("date", ">=", date_from))
+        if date_to:
+            domain.append(("date", "<=", date_to))
+        if cash_basis:
+            journal_ids = list(
+                set(journal_ids or self.env.company.tax_cash_basis_journal_id.ids)
+                & set(self.env.company.tax_cash_basis_journal_id.ids)
+            )
+            domain.append(("journal_id", "in", sorted(journal_ids)))
+        elif journal_ids:
+            domain.append(("journal_id", "in", sorted(set(journal_ids))))
+        if account_ids:
+            domain.append(("account_id", "in", sorted(set(account_ids))))
+        if partner_ids:
+            domain.append(("partner_id", "in", sorted(set(partner_ids))))
+        if analytic_ids:
+            domain.append(
+                ("analytic_line_ids.account_id", "in", sorted(set(analytic_ids)))
+            )
+        return domain
+
+    @api.model
+    def _get_cached_report(
+        self, filters, compute, states, date_from=None, date_to=None
+    ):
+        """
+        Serve a report result from the result cache, computing it on a miss.
+
+        Reports including draft entries are never cached: drafts change
+        without being posted, so nothing would invalidate them.
+
+        :param filters: Canonical filters and periods identifying the result.
+        :param compute: Callable returning the report result.
+        :param list[str] states: Accepted parent move states.
+        :param date date_from: First date the result depends on, or None.
+        :param date date_to: Last date the result depends on, or None.
+        :return: The report result, as the client receives it.
+        """
+        if "draft" in states:
+            return compute()
+        return self.env["dynamic.report.cache"]._get_or_compute(
+            self._name, filters, compute, date_from, date_to
+        )
+
+    @api.model
+    def _get_cached_domain_report(self, domain, kind, compute):
+        """
+        Cache a result computed from a domain built by
+        :meth:`_get_move_line_domain`; its states and date bounds are read
+        back from the canonical leaves.
+
+        :param list domain: Canonical journal item domain.
+        :param str kind: Name of the result within the report.
+        :param compute: Callable returning the result.
+        :return: The result, as the client receives it.
+        """
+        states = []
+        date_from = date_to = None
+        for leaf in domain:
+            if leaf[0] == "parent_state":
+                states = leaf[2]
+            elif leaf[:2] == ("date", ">="):
+                date_from = leaf[2]
+            elif leaf[:2] == ("date", "<="):
+                date_to = leaf[2]
+        return self._get_cached_report(
+            [kind, domain], compute, states, date_from=date_from, date_to=date_to
+        )
@@ -0,0 +1,349 @@
+################################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>).
+#    Author: Ammu Raj (odoo@cybrosys.com)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+################################################################################
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import types
+
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+# Horas que se conservan las exportaciones (y sus archivos) antes de borrarlas.
+EXPORT_RETENTION_HOURS = 24
+# Exportaciones procesadas como máximo en cada ejecución del cron.
+EXPORT_BATCH_SIZE = 10
+# Minutos sin cambios tras los que una exportación en curso cuyo proceso ya
+# no la bloquea se da por interrumpida (worker terminado a mitad).
+EXPORT_STALE_MINUTES = 10
+# Tamaño de los bloques con que se copia el archivo al filestore.
+ATTACHMENT_COPY_SIZE = 1024 * 1024
+
+EXPORT_MIMETYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "pdf": "application/pdf",
+}
+
+
+class DynamicReportExport(models.Model):
+    """Queue of the XLSX and PDF exports run in the background.
+
+    The browser enqueues a job with the filters of the report and polls it;
+    a scheduled action rebuilds the report as the requesting user, writes
+    the file into an attachment and marks the job done, so long exports no
+    longer hold a web worker nor hit its time limit. Exports are downloaded
+    straight away unless the user asks for the background mode.
+    """
+
+    _name = "dynamic.report.export"
+    _description = "Dynamic Report Background Export"
+    _order = "id desc"
+    _rec_name = "report_name"
+
+    user_id = fields.Many2one(
+        "res.users",
+        required=True,
+        index=True,
+        ondelete="cascade",
+        help="User who requested the export and may download it.",
+    )
+    company_ids = fields.Many2many(
+        "res.company", help="Companies active when the export was requested."
+    )
+    report_model = fields.Char(required=True, help="Model of the report.")
+    report_name = fields.Char(required=True, help="Title and file name.")
+    report_action = fields.Char(
+        help="XML id of the client action (XLSX) or name of the QWeb report "
+        "(PDF)."
+    )
+    output_format = fields.Selection(
+        [("xlsx", "XLSX"), ("pdf", "PDF")], required=True
+    )
+    options = fields.Text(
+        required=True, help="JSON encoded filters the report is rebuilt from."
+    )
+    state = fields.Selection(
+        [
+            ("queued", "Queued"),
+            ("running", "Running"),
+            ("done", "Done"),
+            ("failed", "Failed"),
+        ],
+        default="queued",
+        required=True,
+        index=True,
+    )
+    attachment_id = fields.Many2one("ir.attachment", ondelete="set null")
+    error = fields.Text()
+
+    @api.model
+    def enqueue_export(
+        self, report_model, output_format, report_name, report_action, options
+    ):
+        """
+        Queue an export for the current user and wake up the scheduled
+        action that runs it.
+
+        :param str report_model: Model of the report; it must rebuild its
+            data through ``_get_xlsx_data``.
+        :param str output_format: 'xlsx' or 'pdf'.
+        :param str report_name: Title of the report, used as file name.
+        :param str report_action: XML id of the client action (XLSX) or name
+            of the QWeb report (PDF).
+        :param str options: JSON with the ``args`` and ``filters`` of the
+            report, as posted to the XLSX endpoint.
+        :return: Id of the queued export.
+        :rtype: int
+        """
+        self._check_report_model(report_model)
+        if output_format not in EXPORT_MIMETYPES:
+            raise UserError(f"Unsupported export format: {output_format}.")
+        job = self.sudo().create(
+            {
+                "user_id": self.env.uid,
+                "company_ids": [(6, 0, self.env.companies.ids)],
+                "report_model": report_model,
+                "report_name": report_name,
+                "report_action": report_action,
+                "output_format": output_format,
+                "options": options,
+            }
+        )
+        self.env.ref(
+            "dynamic_accounts_report.ir_cron_process_report_exports"
+        ).sudo()._trigger()
+        return job.id
+
+    @api.model
+    def get_report_data(self, report_model, report_name, options):
+        """
+        Rebuild the data of a PDF report downloaded straight away, without
+        queueing it.
+
+        :param str report_model: Model of the report, as in
+            :meth:`enqueue_export`.
+        :param str report_name: Title of the report.
+        :param str options: JSON with the ``args`` and ``filters`` of the
+            report.
+        :return: The data of the QWeb report.
+        :rtype: dict
+        """
+        self._check_report_model(report_model)
+        return self._get_pdf_data(
+            self.env[report_model], report_name, json.loads(options)
+        )
+
+    @api.model
+    def _check_report_model(self, report_model):
+        """Raise unless ``report_model`` is a report rebuilding its data
+        through ``_get_xlsx_data`` that the current user may read."""
+        if report_model not in self.pool["report.xlsx.mixin"]._inherit_children or (
+            not hasattr(self.env[report_model], "_get_xlsx_data")
+        ):
+            raise UserError(f"{report_model} cannot be exported.")
+        self.env[report_model].check_access_rights("read")
+
+    @api.model
+    def _get_pdf_data(self, report, report_name, options):
+        """Data of the QWeb report of ``report`` rebuilt from ``options``."""
+        data = report._get_xlsx_data(options)
+        data.update(title=report_name, report_name=report_name)
+        return data
+
+    @api.model
+    def get_export_status(self, job_id):
+        """
+        Return the state of an export of the current user, polled by the
+        browser until it is done or failed.
+
+        :param int job_id: Id returned by ``enqueue_export``.
+        :return: Dictionary with 'state', 'attachment_id' and 'error'.
+        :rtype: dict
+        """
+        job = self.search([("id", "=", job_id), ("user_id", "=", self.env.uid)])
+        if not job:
+            return {
+                "state": "failed",
+                "attachment_id": False,
+                "error": "The export no longer exists.",
+            }
+        return {
+            "state": job.state,
+            "attachment_id": job.attachment_id.id,
+            "error": job.error or "",
+        }
+
+    @api.model
+    def _process_queue(self, limit=EXPORT_BATCH_SIZE):
+        """
+        Run the queued exports one by one, committing after each of them so
+        a failed export does not undo the others. Jobs are claimed with
+        SKIP LOCKED, so several cron workers can drain the queue in
+        parallel, and stay locked while they run.
+        """
+        self._fail_interrupted_exports()
+        for _index in range(limit):
+            self.env.cr.execute(
+                """
+                SELECT id FROM dynamic_report_export
+                 WHERE state = 'queued'
+                 ORDER BY id
+                 LIMIT 1
+                   FOR UPDATE SKIP LOCKED
+                """
+            )
+            row = self.env.cr.fetchone()
+            if not row:
+                break
+            job = self.sudo().browse(row[0])
+            job.state = "running"
+            self._commit()
+            # El bloqueo indica que la exportación sigue viva
+            self.env.cr.execute(
+                "SELECT id FROM dynamic_report_export WHERE id = %s FOR UPDATE",
+                (job.id,),
+            )
+            try:
+                with self.env.cr.savepoint():
+                    job._run()
+            except Exception as error:
+                _logger.exception("Background export %s failed", job.id)
+                job.write({"state": "failed", "error": str(error)})
+            self._commit()
+        self._gc_exports()
+
+    @api.model
+    def _fail_interrupted_exports(self):
+        """Fail the exports left running by a killed worker: running for
+        more than ``EXPORT_STALE_MINUTES`` and no longer locked by the
+        process running them."""
+        self.env.cr.execute(
+            """
+            SELECT id FROM dynamic_report_export
+             WHERE state = 'running'
+               AND write_date < (now() at time zone 'UTC') - make_interval(mins => %s)
+               FOR UPDATE SKIP LOCKED
+            """,
+            (EXPORT_STALE_MINUTES,),
+        )
+        interrupted = self.sudo().browse([row[0] for row in self.env.cr.fetchall()])
+        if interrupted:
+            _logger.warning("Background exports %s were interrupted", interrupted.ids)
+            interrupted.write(
+                {"state": "failed", "error": "The export was interrupted."}
+            )
+            self._commit()
+
+    @api.model
+    def _commit(self):
+        """Commit the progress of the queue, except while running tests."""
+        if not self.env.registry.in_test_mode():
+            self.env.cr.commit()
+
+    def _run(self):
+        """Rebuild the report of the export as its user and attach the file."""
+        self.ensure_one()
+        report = (
+            self.env[self.report_model]
+            .with_user(self.user_id)
+            .with_context(allowed_company_ids=self.company_ids.ids)
+        )
+        options = json.loads(self.options)
+        vals = {
+            "name": f"{self.report_name}.{self.output_format}",
+            "mimetype": EXPORT_MIMETYPES[self.output_format],
+            "res_model": self._name,
+            "res_id": self.id,
+        }
+        if self.output_format == "pdf":
+            vals["raw"] = report.env["ir.actions.report"]._render_qweb_pdf(
+                self.report_action,
+                data=self._get_pdf_data(report, self.report_name, options),
+            )[0]
+            attachment = self.env["ir.attachment"].create(vals)
+        else:
+            data = report._get_xlsx_data(options)
+            with tempfile.TemporaryFile() as stream:
+                # Mismo modo de escritura que la exportación por streaming
+                output = types.SimpleNamespace(xlsx_streaming=True, stream=stream)
+                report.get_xlsx_report(
+                    data, output, self.report_name, self.report_action
+                )
+                attachment = self._create_file_attachment(stream, vals)
+        self.write({"state": "done", "attachment_id": attachment.id, "error": False})
+
+    @api.model
+    def _create_file_attachment(self, stream, vals):
+        """
+        Create an attachment holding the content of the file object
+        ``stream``. With the default file storage the file is hashed and
+        copied into the filestore in chunks, so it is never loaded into
+        memory as a whole.
+
+        :param stream: Readable and seekable binary file object.
+        :param dict vals: Values of the attachment, without its content.
+        :rtype: ir.attachment
+        """
+        attachments = self.env["ir.attachment"]
+        stream.seek(0)
+        if attachments._storage() != "file":
+            return attachments.create(dict(vals, raw=stream.read()))
+        sha = hashlib.sha1()
+        for chunk in iter(lambda: stream.read(ATTACHMENT_COPY_SIZE), b""):
+            sha.update(chunk)
+        checksum = sha.hexdigest()
+        fname, full_path = attachments._get_path(b"", checksum)
+        if not os.path.exists(full_path):
+            stream.seek(0)
+            with open(full_path, "wb") as target:
+                shutil.copyfileobj(stream, target, ATTACHMENT_COPY_SIZE)
+            # Como _file_write: se borra si la transacción no se confirma
+            attachments._mark_for_gc(fname)
+        return attachments.create(
+            dict(
+                vals,
+                store_fname=fname,
+                file_size=os.fstat(stream.fileno()).st_size,
+                checksum=checksum,
+            )
+        )
+
+    @api.model
+    def _gc_exports(self):
+        """Delete the exports older than the retention period with their
+        files, including the ones left running by a killed worker."""
+        expired = self.sudo().search(
+            [
+                (
+                    "create_date",
+                    "<",
+                    fields.Datetime.subtract(
+                        fields.Datetime.now(), hours=EXPORT_RETENTION_HOURS
+                    ),
+                ),
+            ]
+        )
+        expired.attachment_id.unlink()
+        expired.unlink()
@@ -0,0 +1,64 @@
+################################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>).
+#    Author: Ammu Raj (odoo@cybrosys.com)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+################################################################################
+from odoo import api, models
+
+# Campos leídos por los catálogos de filtros; escribir otros no los invalida.
+CATALOG_FIELDS = {"name", "code", "active", "company_id", "deprecated"}
+
+
+class ReportFilterCatalogMixin(models.AbstractModel):
+    """Invalidate the cached filter catalogs of the reports when a journal,
+    account or analytic account is created, changed or deleted"""
+
+    _name = "report.filter.catalog.mixin"
+    _description = "Report Filter Catalog Invalidation"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        if records._is_in_filter_catalogs():
+            self.env.registry.clear_cache()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if CATALOG_FIELDS.intersection(vals):
+            self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        listed = self._is_in_filter_catalogs()
+        res = super().unlink()
+        if listed:
+            self.env.registry.clear_cache()
+        return res
+
+    def _is_in_filter_catalogs(self):
+        """Whether one of the records is listed by the filter catalogs,
+        which leave out archived journals and analytic accounts and
+        deprecated accounts."""
+        for record in self:
+            if "active" in record._fields and not record.active:
+                continue
+            if "deprecated" in record._fields and record.deprecated:
+                continue
+            return True
+        return False
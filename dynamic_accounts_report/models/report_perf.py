@@ -0,0 +1,97 @@
+################################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>).
+#    Author: Ammu Raj (odoo@cybrosys.com)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+################################################################################
+import functools
+import logging
+import threading
+import time
+
+_logger = logging.getLogger(__name__)
+
+# Clave de contexto con la que el cliente pide las métricas en la respuesta.
+PERF_CONTEXT_KEY = "report_perf"
+
+
+def report_perf(method):
+    """
+    Instrument a public report method: count its SQL queries and split its
+    wall time between SQL and Python, log the figures at debug level and,
+    when the ``report_perf`` context key is set, return them under the
+    ``_perf`` key of a dictionary result.
+
+    Only the outermost instrumented call of a request adds ``_perf``, so
+    report methods calling each other keep their usual results.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        thread = threading.current_thread()
+        # El cursor acumula el tiempo SQL en el hilo si tiene estos contadores
+        if not hasattr(thread, "query_count"):
+            thread.query_count = 0
+            thread.query_time = 0.0
+        depth = getattr(thread, "report_perf_depth", 0)
+        queries = self.env.cr.sql_log_count
+        query_time = thread.query_time
+        start = time.perf_counter()
+        thread.report_perf_depth = depth + 1
+        try:
+            result = method(self, *args, **kwargs)
+        finally:
+            thread.report_perf_depth = depth
+        wall_time = time.perf_counter() - start
+        send = (
+            not depth
+            and isinstance(result, dict)
+            and self.env.context.get(PERF_CONTEXT_KEY)
+        )
+        # Contar las filas recorre todo el resultado: solo si se van a usar
+        if not (send or _logger.isEnabledFor(logging.DEBUG)):
+            return result
+        sql_time = thread.query_time - query_time
+        perf = {
+            "method": f"{self._name}.{method.__name__}",
+            "queries": self.env.cr.sql_log_count - queries,
+            "sql_time": round(sql_time, 4),
+            "python_time": round(max(wall_time - sql_time, 0.0), 4),
+            "rows": _count_rows(result),
+        }
+        _logger.debug(
+            "%(method)s: %(queries)s queries, %(sql_time).3fs SQL, "
+            "%(python_time).3fs Python, %(rows)s rows",
+            perf,
+        )
+        if send:
+            result = dict(result, _perf=perf)
+        return result
+
+    return wrapper
+
+
+def _count_rows(value):
+    """Count the rows of a report result: the dictionaries held in its lists,
+    such as the journal items read per account or partner."""
+    if isinstance(value, dict):
+        return sum(_count_rows(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(
+            1 if isinstance(item, dict) else _count_rows(item) for item in value
+        )
+    return 0
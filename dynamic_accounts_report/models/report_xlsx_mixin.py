@@ -0,0 +1,74 @@
+################################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>).
+#    Author: Ammu Raj (odoo@cybrosys.com)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+################################################################################
+import io
+import json
+
+import xlsxwriter
+
+from odoo import api, models
+
+
+class ReportXlsxMixin(models.AbstractModel):
+    """Workbook handling shared by the XLSX exports of the dynamic reports.
+
+    When the controller asks for a streaming export, the response it passes
+    carries ``xlsx_streaming`` and a temporary file as ``stream``: the
+    workbook is written straight into that file, which is then sent in
+    chunks. Otherwise the workbook is built in memory and copied into the
+    response stream once closed.
+
+    Each report defines ``_get_xlsx_data(options)``, which rebuilds on the
+    server the data of the export from the filters of the client (``args``
+    of its last data call and the ``filters`` printed in the header), so the
+    browser does not upload the report back.
+    """
+
+    _name = "report.xlsx.mixin"
+    _description = "Report XLSX Export"
+
+    # Los reportes que escriben las filas en orden pueden usar el modo
+    # constant_memory de xlsxwriter, que vuelca cada fila a disco.
+    _xlsx_constant_memory = False
+
+    @api.model
+    def _load_xlsx_data(self, data):
+        """Return the export data, decoding it when posted as JSON."""
+        return json.loads(data) if isinstance(data, str) else data
+
+    @api.model
+    def _open_xlsx_workbook(self, response):
+        """Create the workbook of an export written into ``response``."""
+        if getattr(response, "xlsx_streaming", False):
+            return xlsxwriter.Workbook(
+                response.stream, {"constant_memory": self._xlsx_constant_memory}
+            )
+        return xlsxwriter.Workbook(io.BytesIO(), {"in_memory": True})
+
+    @api.model
+    def _close_xlsx_workbook(self, workbook, response):
+        """Close the workbook and, when built in memory, copy it into the
+        response stream."""
+        workbook.close()
+        if not getattr(response, "xlsx_streaming", False):
+            output = workbook.filename
+            output.seek(0)
+            response.stream.write(output.read())
+            output.close()
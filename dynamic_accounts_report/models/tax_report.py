@@ -20,28 +20,22 @@
 ################################################################################
 import ast
 import calendar
-import io
-import json
-from datetime import datetime
-
-import xlsxwriter
 
 from odoo import api, fields, models
-from odoo.tools.date_utils import (
-    get_fiscal_year,
-    get_month,
-    get_quarter_number,
-    subtract,
-)
+from odoo.tools.date_utils import get_month
+
+from .report_perf import report_perf
 
 
 class TaxReport(models.TransientModel):
     """For creating Tax report."""
 
     _name = "tax.report"
+    _inherit = ["report.domain.mixin", "report.xlsx.mixin"]
     _description = "Tax Report"
 
     @api.model
+    @report_perf
     def view_report(self):
         """
         View a tax report for the current month. This function retrieves
@@ -51,50 +45,14 @@ class TaxReport(models.TransientModel):
             :return: Dictionary containing sale and purchase data for the
                      current month.
         """
-        sale = []
-        purchase = []
-        tax_ids = self.env["account.move.line"].search([]).mapped("tax_ids")
         today = fields.Date.today()
-        for tax in tax_ids:
-            tax_id = (
-                self.env["account.move.line"]
-                .search(
-                    [
-                        ("tax_ids", "=", tax.id),
-                        ("parent_state", "=", "posted"),
-                        ("date", ">=", get_month(today)[0]),
-                        ("date", "<=", get_month(today)[1]),
-                    ]
-                )
-                .read(["debit", "credit"])
-            )
-            tax_debit_sums = sum(record["debit"] for record in tax_id)
-            tax_credit_sums = sum(record["credit"] for record in tax_id)
-            if tax.type_tax_use == "sale":
-                sale.append(
-                    {
-                        "name": tax.name,
-                        "amount": tax.amount,
-                        "net": round(tax_debit_sums + tax_credit_sums, 2),
-                        "tax": round(
-                            (tax_debit_sums + tax_credit_sums) * (tax.amount / 100), 2
-                        ),
-                    }
-                )
-            elif tax.type_tax_use == "purchase":
-                purchase.append(
-                    {
-                        "name": tax.name,
-                        "amount": tax.amount,
-                        "net": round(tax_debit_sums + tax_credit_sums, 2),
-                        "tax": round(
-                            (tax_debit_sums + tax_credit_sums) * (tax.amount / 100), 2
-                        ),
-                    }
-                )
+        month_start, month_end = get_month(today)
+        totals = self._get_tax_totals(month_start, month_end, [], ["posted"])
+        sale, purchase = self._prepare_tax_lines(totals, False)
         return {"sale": sale, "purchase": purchase}
 
     @api.model
+    @report_perf
     def get_filter_values(
         self,
         start_date,
@@ -116,659 +74,202 @@ class TaxReport(models.TransientModel):
         :return: Dictionary containing dynamic_date_num, sale, and purchase
                  data.
         """
-        sale = []
-        purchase = []
-        dynamic_date_num = {}
-        if options == {}:
-            options = None
-        if options is None:
-            option_domain = ["posted"]
-        elif "draft" in options:
-            option_domain = ["posted", "draft"]
-        tax_ids = self.env["account.move.line"].search([]).mapped("tax_ids")
-        start_date_first = (
-            get_fiscal_year(datetime.strptime(start_date, "%Y-%m-%d").date())[0]
-            if comparison_type == "year"
-            else datetime.strptime(start_date, "%Y-%m-%d").date()
-        )
-        end_date_first = (
-            get_fiscal_year(datetime.strptime(end_date, "%Y-%m-%d").date())[1]
-            if comparison_type == "year"
-            else datetime.strptime(end_date, "%Y-%m-%d").date()
+        option_domain = self._get_move_states(options)
+        start_date, end_date = self._get_report_period(
+            start_date, end_date, comparison_type
         )
+        periods = []
+        dynamic_date_num = {}
+        if comparison_number:
+            periods = self._get_comparison_periods(
+                start_date,
+                end_date,
+                ast.literal_eval(comparison_number),
+                comparison_type,
+            )
+        if periods:
+            dynamic_date_num = self._get_period_labels(
+                start_date, periods, comparison_type
+            )
+        group_by = False
         if report_type is not None and "account" in report_type:
-            start_date = start_date_first
-            end_date = end_date_first
-            account_ids = self.env["account.move.line"].search([]).mapped("account_id")
-            for account in account_ids:
-                tax_ids = (
-                    self.env["account.move.line"]
-                    .search([("account_id", "=", account.id)])
-                    .mapped("tax_ids")
-                )
-                if tax_ids:
-                    for tax in tax_ids:
-                        dynamic_total_tax_sum = {}
-                        dynamic_total_net_sum = {}
-                        if comparison_number:
-                            if comparison_type == "year":
-                                start_date = start_date_first
-                                end_date = end_date_first
-                                for i in range(
-                                    1, ast.literal_eval(comparison_number) + 1
-                                ):
-                                    com_start_date = subtract(start_date, years=i)
-                                    com_end_date = subtract(end_date, years=i)
-                                    tax_id = (
-                                        self.env["account.move.line"]
-                                        .search(
-                                            [
-                                                ("tax_ids", "=", tax.id),
-                                                ("date", ">=", com_start_date),
-                                                ("date", "<=", com_end_date),
-                                                ("account_id", "=", account.id),
-                                                ("parent_state", "in", option_domain),
-                                            ]
-                                        )
-                                        .read(["debit", "credit"])
-                                    )
-                                    tax_debit_sums = sum(
-                                        record["debit"] for record in tax_id
-                                    )
-                                    tax_credit_sums = sum(
-                                        record["credit"] for record in tax_id
-                                    )
-                                    dynamic_total_net_sum[
-                                        f"dynamic_total_net_sum{i}"
-                                    ] = (tax_debit_sums + tax_credit_sums)
-                                    dynamic_total_tax_sum[
-                                        f"dynamic_total_tax_sum{i}"
-                                    ] = dynamic_total_net_sum[
-                                        f"dynamic_total_net_sum{i}"
-                                    ] * (
-                                        tax.amount / 100
-                                    )
-                            elif comparison_type == "month":
-                                dynamic_date_num[f"dynamic_date_num{0}"] = (
-                                    self.get_month_name(start_date)
-                                    + " "
-                                    + str(start_date.year)
-                                )
-                                for i in range(
-                                    1, ast.literal_eval(comparison_number) + 1
-                                ):
-                                    com_start_date = subtract(start_date, months=i)
-                                    com_end_date = subtract(end_date, months=i)
-                                    tax_id = (
-                                        self.env["account.move.line"]
-                                        .search(
-                                            [
-                                                ("tax_ids", "=", tax.id),
-                                                ("date", ">=", com_start_date),
-                                                ("account_id", "=", account.id),
-                                                ("date", "<=", com_end_date),
-                                                ("parent_state", "in", option_domain),
-                                            ]
-                                        )
-                                        .read(["debit", "credit"])
-                                    )
-                                    tax_debit_sums = sum(
-                                        record["debit"] for record in tax_id
-                                    )
-                                    tax_credit_sums = sum(
-                                        record["credit"] for record in tax_id
-                                    )
-                                    dynamic_total_net_sum[
-                                        f"dynamic_total_net_sum{i}"
-                                    ] = (tax_debit_sums + tax_credit_sums)
-                                    dynamic_total_tax_sum[
-                                        f"dynamic_total_tax_sum{i}"
-                                    ] = dynamic_total_net_sum[
-                                        f"dynamic_total_net_sum{i}"
-                                    ] * (
-                                        tax.amount / 100
-                                    )
-                                    dynamic_date_num[f"dynamic_date_num{i}"] = (
-                                        self.get_month_name(com_start_date)
-                                        + " "
-                                        + str(com_start_date.year)
-                                    )
-                            elif comparison_type == "quarter":
-                                dynamic_date_num[f"dynamic_date_num{0}"] = (
-                                    "Q"
-                                    + " "
-                                    + str(get_quarter_number(start_date))
-                                    + " "
-                                    + str(start_date.year)
-                                )
-                                for i in range(
-                                    1, ast.literal_eval(comparison_number) + 1
-                                ):
-                                    com_start_date = subtract(start_date, months=i * 3)
-                                    com_end_date = subtract(end_date, months=i * 3)
-                                    tax_id = (
-                                        self.env["account.move.line"]
-                                        .search(
-                                            [
-                                                ("tax_ids", "=", tax.id),
-                                                ("date", ">=", com_start_date),
-                                                ("account_id", "=", account.id),
-                                                ("date", "<=", com_end_date),
-                                                ("parent_state", "in", option_domain),
-                                            ]
-                                        )
-                                        .read(["debit", "credit"])
-                                    )
-                                    tax_debit_sums = sum(
-                                        record["debit"] for record in tax_id
-                                    )
-                                    tax_credit_sums = sum(
-                                        record["credit"] for record in tax_id
-                                    )
-                                    dynamic_total_net_sum[
-                                        f"dynamic_total_net_sum{i}"
-                                    ] = (tax_debit_sums + tax_credit_sums)
-                                    dynamic_total_tax_sum[
-                                        f"dynamic_total_tax_sum{i}"
-                                    ] = dynamic_total_net_sum[
-                                        f"dynamic_total_net_sum{i}"
-                                    ] * (
-                                        tax.amount / 100
-                                    )
-                                    dynamic_date_num[f"dynamic_date_num{i}"] = (
-                                        "Q"
-                                        + " "
-                                        + str(get_quarter_number(com_start_date))
-                                        + " "
-                                        + str(com_start_date.year)
-                                    )
-                        tax_id = (
-                            self.env["account.move.line"]
-                            .search(
-                                [
-                                    ("tax_ids", "=", tax.id),
-                                    ("date", ">=", start_date_first),
-                                    ("date", "<=", end_date_first),
-                                    ("parent_state", "in", option_domain),
-                                    ("account_id", "=", account.id),
-                                ]
-                            )
-                            .read(["debit", "credit"])
-                        )
-                        tax_debit_sums = sum(record["debit"] for record in tax_id)
-                        tax_credit_sums = sum(record["credit"] for record in tax_id)
-                        if tax_id and tax.type_tax_use == "sale":
-                            if comparison_number:
-                                sale.append(
-                                    {
-                                        "name": tax.name,
-                                        "amount": tax.amount,
-                                        "net": round(
-                                            tax_debit_sums + tax_credit_sums, 2
-                                        ),
-                                        "tax": round(
-                                            (tax_debit_sums + tax_credit_sums)
-                                            * (tax.amount / 100),
-                                            2,
-                                        ),
-                                        "dynamic net": dynamic_total_net_sum,
-                                        "dynamic tax": dynamic_total_tax_sum,
-                                        "account": account.display_name,
-                                    }
-                                )
-                            else:
-                                sale.append(
-                                    {
-                                        "name": tax.name,
-                                        "amount": tax.amount,
-                                        "net": round(
-                                            tax_debit_sums + tax_credit_sums, 2
-                                        ),
-                                        "tax": round(
-                                            (tax_debit_sums + tax_credit_sums)
-                                            * (tax.amount / 100),
-                                            2,
-                                        ),
-                                        "account": account.display_name,
-                                    }
-                                )
-                        elif tax_id and tax.type_tax_use == "purchase":
-                            if comparison_number:
-                                purchase.append(
-                                    {
-                                        "name": tax.name,
-                                        "amount": tax.amount,
-                                        "net": round(
-                                            tax_debit_sums + tax_credit_sums, 2
-                                        ),
-                                        "tax": round(
-                                            (tax_debit_sums + tax_credit_sums)
-                                            * (tax.amount / 100),
-                                            2,
-                                        ),
-                                        "dynamic net": dynamic_total_net_sum,
-                                        "dynamic tax": dynamic_total_tax_sum,
-                                        "account": account.display_name,
-                                    }
-                                )
-                            else:
-                                purchase.append(
-                                    {
-                                        "name": tax.name,
-                                        "amount": tax.amount,
-                                        "net": round(
-                                            tax_debit_sums + tax_credit_sums, 2
-                                        ),
-                                        "tax": round(
-                                            (tax_debit_sums + tax_credit_sums)
-                                            * (tax.amount / 100),
-                                            2,
-                                        ),
-                                        "account": account.display_name,
-                                    }
-                                )
+            group_by = "account"
         elif report_type is not None and "tax" in report_type:
-            start_date = start_date_first
-            end_date = end_date_first
-            for tax in tax_ids:
-                account_ids = (
-                    self.env["account.move.line"]
-                    .search([("tax_ids", "=", tax.id)])
-                    .mapped("account_id")
-                )
-                for account in account_ids:
-                    dynamic_total_tax_sum = {}
-                    dynamic_total_net_sum = {}
-                    if comparison_number:
-                        if comparison_type == "year":
-                            start_date = start_date_first
-                            end_date = end_date_first
-                            for i in range(1, ast.literal_eval(comparison_number) + 1):
-                                com_start_date = subtract(start_date, years=i)
-                                com_end_date = subtract(end_date, years=i)
-                                tax_id = (
-                                    self.env["account.move.line"]
-                                    .search(
-                                        [
-                                            ("tax_ids", "=", tax.id),
-                                            ("date", ">=", com_start_date),
-                                            ("date", "<=", com_end_date),
-                                            ("account_id", "=", account.id),
-                                            ("parent_state", "in", option_domain),
-                                        ]
-                                    )
-                                    .read(["debit", "credit"])
-                                )
-                                tax_debit_sums = sum(
-                                    record["debit"] for record in tax_id
-                                )
-                                tax_credit_sums = sum(
-                                    record["credit"] for record in tax_id
-                                )
-                                dynamic_total_net_sum[f"dynamic_total_net_sum{i}"] = (
-                                    tax_debit_sums + tax_credit_sums
-                                )
-                                dynamic_total_tax_sum[
-                                    f"dynamic_total_tax_sum{i}"
-                                ] = dynamic_total_net_sum[
-                                    f"dynamic_total_net_sum{i}"
-                                ] * (
-                                    tax.amount / 100
-                                )
-                        elif comparison_type == "month":
-                            dynamic_date_num[f"dynamic_date_num{0}"] = (
-                                self.get_month_name(start_date)
-                                + " "
-                                + str(start_date.year)
-                            )
-                            for i in range(1, ast.literal_eval(comparison_number) + 1):
-                                com_start_date = subtract(start_date, months=i)
-                                com_end_date = subtract(end_date, months=i)
-                                tax_id = (
-                                    self.env["account.move.line"]
-                                    .search(
-                                        [
-                                            ("tax_ids", "=", tax.id),
-                                            ("date", ">=", com_start_date),
-                                            ("date", "<=", com_end_date),
-                                            ("account_id", "=", account.id),
-                                            ("parent_state", "in", option_domain),
-                                        ]
-                                    )
-                                    .read(["debit", "credit"])
-                                )
-                                tax_debit_sums = sum(
-                                    record["debit"] for record in tax_id
-                                )
-                                tax_credit_sums = sum(
-                                    record["credit"] for record in tax_id
-                                )
-                                dynamic_total_net_sum[f"dynamic_total_net_sum{i}"] = (
-                                    tax_debit_sums + tax_credit_sums
-                                )
-                                dynamic_total_tax_sum[
-                                    f"dynamic_total_tax_sum{i}"
-                                ] = dynamic_total_net_sum[
-                                    f"dynamic_total_net_sum{i}"
-                                ] * (
-                                    tax.amount / 100
-                                )
-                                dynamic_date_num[f"dynamic_date_num{i}"] = (
-                                    self.get_month_name(com_start_date)
-                                    + " "
-                                    + str(com_start_date.year)
-                                )
-                        elif comparison_type == "quarter":
-                            dynamic_date_num[f"dynamic_date_num{0}"] = (
-                                "Q"
-                                + " "
-                                + str(get_quarter_number(start_date))
-                                + " "
-                                + str(start_date.year)
-                            )
-                            for i in range(1, ast.literal_eval(comparison_number) + 1):
-                                com_start_date = subtract(start_date, months=i * 3)
-                                com_end_date = subtract(end_date, months=i * 3)
-                                tax_id = (
-                                    self.env["account.move.line"]
-                                    .search(
-                                        [
-                                            ("tax_ids", "=", tax.id),
-                                            ("date", ">=", com_start_date),
-                                            ("date", "<=", com_end_date),
-                                            ("account_id", "=", account.id),
-                                            ("parent_state", "in", option_domain),
-                                        ]
-                                    )
-                                    .read(["debit", "credit"])
-                                )
-                                tax_debit_sums = sum(
-                                    record["debit"] for record in tax_id
-                                )
-                                tax_credit_sums = sum(
-                                    record["credit"] for record in tax_id
-                                )
-                                dynamic_total_net_sum[f"dynamic_total_net_sum{i}"] = (
-                                    tax_debit_sums + tax_credit_sums
-                                )
-                                dynamic_total_tax_sum[
-                                    f"dynamic_total_tax_sum{i}"
-                                ] = dynamic_total_net_sum[
-                                    f"dynamic_total_net_sum{i}"
-                                ] * (
-                                    tax.amount / 100
-                                )
-                                dynamic_date_num[f"dynamic_date_num{i}"] = (
-                                    "Q"
-                                    + " "
-                                    + str(get_quarter_number(com_start_date))
-                                    + " "
-                                    + str(com_start_date.year)
-                                )
-                    tax_id = (
-                        self.env["account.move.line"]
-                        .search(
-                            [
-                                ("tax_ids", "=", tax.id),
-                                ("parent_state", "in", option_domain),
-                                ("date", ">=", start_date_first),
-                                ("date", "<=", end_date_first),
-                                ("account_id", "=", account.id),
-                            ]
-                        )
-                        .read(["debit", "credit"])
-                    )
-                    tax_debit_sums = sum(record["debit"] for record in tax_id)
-                    tax_credit_sums = sum(record["credit"] for record in tax_id)
-                    if tax_id and tax.type_tax_use == "sale":
-                        if comparison_number:
-                            sale.append(
-                                {
-                                    "name": tax.name,
-                                    "amount": tax.amount,
-                                    "net": round(tax_debit_sums + tax_credit_sums, 2),
-                                    "tax": round(
-                                        (tax_debit_sums + tax_credit_sums)
-                                        * (tax.amount / 100),
-                                        2,
-                                    ),
-                                    "dynamic net": dynamic_total_net_sum,
-                                    "dynamic tax": dynamic_total_tax_sum,
-                                    "account": account.display_name,
-                                }
-                            )
-                        else:
-                            sale.append(
-                                {
-                                    "name": tax.name,
-                                    "amount": tax.amount,
-                                    "net": round(tax_debit_sums + tax_credit_sums, 2),
-                                    "tax": round(
-                                        (tax_debit_sums + tax_credit_sums)
-                                        * (tax.amount / 100),
-                                        2,
-                                    ),
-                                    "account": account.display_name,
-                                }
-                            )
-                    elif tax_id and tax.type_tax_use == "purchase":
-                        if comparison_number:
-                            purchase.append(
-                                {
-                                    "name": tax.name,
-                                    "amount": tax.amount,
-                                    "net": round(tax_debit_sums + tax_credit_sums, 2),
-                                    "tax": round(
-                                        (tax_debit_sums + tax_credit_sums)
-                                        * (tax.amount / 100),
-                                        2,
-                                    ),
-                                    "dynamic net": dynamic_total_net_sum,
-                                    "dynamic tax": dynamic_total_tax_sum,
-                                    "account": account.display_name,
-                                }
-                            )
-                        else:
-                            purchase.append(
-                                {
-                                    "name": tax.name,
-                                    "amount": tax.amount,
-                                    "net": round(tax_debit_sums + tax_credit_sums, 2),
-                                    "tax": round(
-                                        (tax_debit_sums + tax_credit_sums)
-                                        * (tax.amount / 100),
-                                        2,
-                                    ),
-                                    "account": account.display_name,
-                                }
-                            )
-        else:
-            start_date = start_date_first
-            end_date = end_date_first
-            for tax in tax_ids:
-                dynamic_total_tax_sum = {}
-                dynamic_total_net_sum = {}
-                if comparison_number:
-                    if comparison_type == "year":
-                        start_date = start_date_first
-                        end_date = end_date_first
-                        for i in range(1, ast.literal_eval(comparison_number) + 1):
-                            com_start_date = subtract(start_date, years=i)
-                            com_end_date = subtract(end_date, years=i)
-                            tax_id = (
-                                self.env["account.move.line"]
-                                .search(
-                                    [
-                                        ("tax_ids", "=", tax.id),
-                                        ("date", ">=", com_start_date),
-                                        ("date", "<=", com_end_date),
-                                        ("parent_state", "in", option_domain),
-                                    ]
-                                )
-                                .read(["debit", "credit"])
-                            )
-                            tax_debit_sums = sum(record["debit"] for record in tax_id)
-                            tax_credit_sums = sum(record["credit"] for record in tax_id)
-                            dynamic_total_net_sum[f"dynamic_total_net_sum{i}"] = (
-                                tax_debit_sums + tax_credit_sums
-                            )
-                            dynamic_total_tax_sum[
-                                f"dynamic_total_tax_sum{i}"
-                            ] = dynamic_total_net_sum[f"dynamic_total_net_sum{i}"] * (
-                                tax.amount / 100
-                            )
-                    elif comparison_type == "month":
-                        dynamic_date_num[f"dynamic_date_num{0}"] = (
-                            self.get_month_name(start_date) + " " + str(start_date.year)
-                        )
-                        for i in range(1, ast.literal_eval(comparison_number) + 1):
-                            com_start_date = subtract(start_date, months=i)
-                            com_end_date = subtract(end_date, months=i)
-                            tax_id = (
-                                self.env["account.move.line"]
-                                .search(
-                                    [
-                                        ("tax_ids", "=", tax.id),
-                                        ("date", ">=", com_start_date),
-                                        ("date", "<=", com_end_date),
-                                        ("parent_state", "in", option_domain),
-                                    ]
-                                )
-                                .read(["debit", "credit"])
-                            )
-                            tax_debit_sums = sum(record["debit"] for record in tax_id)
-                            tax_credit_sums = sum(record["credit"] for record in tax_id)
-                            dynamic_total_net_sum[f"dynamic_total_net_sum{i}"] = (
-                                tax_debit_sums + tax_credit_sums
-                            )
-                            dynamic_total_tax_sum[
-                                f"dynamic_total_tax_sum{i}"
-                            ] = dynamic_total_net_sum[f"dynamic_total_net_sum{i}"] * (
-                                tax.amount / 100
-                            )
-                            dynamic_date_num[f"dynamic_date_num{i}"] = (
-                                self.get_month_name(com_start_date)
-                                + " "
-                                + str(com_start_date.year)
-                            )
-                    elif comparison_type == "quarter":
-                        dynamic_date_num[f"dynamic_date_num{0}"] = (
-                            "Q"
-                            + " "
-                            + str(get_quarter_number(start_date))
-                            + " "
-                            + str(start_date.year)
-                        )
-                        for i in range(1, ast.literal_eval(comparison_number) + 1):
-                            com_start_date = subtract(start_date, months=i * 3)
-                            com_end_date = subtract(end_date, months=i * 3)
-                            tax_id = (
-                                self.env["account.move.line"]
-                                .search(
-                                    [
-                                        ("tax_ids", "=", tax.id),
-                                        ("date", ">=", com_start_date),
-                                        ("date", "<=", com_end_date),
-                                        ("parent_state", "in", option_domain),
-                                    ]
-                                )
-                                .read(["debit", "credit"])
-                            )
-                            tax_debit_sums = sum(record["debit"] for record in tax_id)
-                            tax_credit_sums = sum(record["credit"] for record in tax_id)
-                            dynamic_total_net_sum[f"dynamic_total_net_sum{i}"] = (
-                                tax_debit_sums + tax_credit_sums
-                            )
-                            dynamic_total_tax_sum[
-                                f"dynamic_total_tax_sum{i}"
-                            ] = dynamic_total_net_sum[f"dynamic_total_net_sum{i}"] * (
-                                tax.amount / 100
-                            )
-                            dynamic_date_num[f"dynamic_date_num{i}"] = (
-                                "Q"
-                                + " "
-                                + str(get_quarter_number(com_start_date))
-                                + " "
-                                + str(com_start_date.year)
-                            )
-                tax_id = (
-                    self.env["account.move.line"]
-                    .search(
-                        [
-                            ("tax_ids", "=", tax.id),
-                            ("parent_state", "in", option_domain),
-                            ("date", ">=", start_date_first),
-                            ("date", "<=", end_date_first),
-                        ]
-                    )
-                    .read(["debit", "credit"])
-                )
-                tax_debit_sums = sum(record["debit"] for record in tax_id)
-                tax_credit_sums = sum(record["credit"] for record in tax_id)
-                if tax.type_tax_use == "sale":
-                    if comparison_number:
-                        sale.append(
-                            {
-                                "name": tax.name,
-                                "amount": tax.amount,
-                                "net": round(tax_debit_sums + tax_credit_sums, 2),
-                                "tax": round(
-                                    (tax_debit_sums + tax_credit_sums)
-                                    * (tax.amount / 100),
-                                    2,
-                                ),
-                                "dynamic net": dynamic_total_net_sum,
-                                "dynamic tax": dynamic_total_tax_sum,
-                            }
-                        )
-                    else:
-                        sale.append(
-                            {
-                                "name": tax.name,
-                                "amount": tax.amount,
-                                "net": round(tax_debit_sums + tax_credit_sums, 2),
-                                "tax": round(
-                                    (tax_debit_sums + tax_credit_sums)
-                                    * (tax.amount / 100),
-                                    2,
-                                ),
-                            }
-                        )
-                elif tax.type_tax_use == "purchase":
-                    if comparison_number:
-                        purchase.append(
-                            {
-                                "name": tax.name,
-                                "amount": tax.amount,
-                                "net": round(tax_debit_sums + tax_credit_sums, 2),
-                                "tax": round(
-                                    (tax_debit_sums + tax_credit_sums)
-                                    * (tax.amount / 100),
-                                    2,
-                                ),
-                                "dynamic net": dynamic_total_net_sum,
-                                "dynamic tax": dynamic_total_tax_sum,
-                            }
-                        )
-                    else:
-                        purchase.append(
-                            {
-                                "name": tax.name,
-                                "amount": tax.amount,
-                                "net": round(tax_debit_sums + tax_credit_sums, 2),
-                                "tax": round(
-                                    (tax_debit_sums + tax_credit_sums)
-                                    * (tax.amount / 100),
-                                    2,
-                                ),
-                            }
-                        )
+            group_by = "tax"
+        totals = self._get_tax_totals(
+            start_date, end_date, periods, option_domain, group_by=group_by
+        )
+        sale, purchase = self._prepare_tax_lines(
+            totals, len(periods) if comparison_number else False
+        )
         return {
             "dynamic_date_num": dynamic_date_num,
             "sale": sale,
             "purchase": purchase,
         }
 
+    @api.model
+    def _get_tax_totals(
+        self, start_date, end_date, periods, option_domain, group_by=False
+    ):
+        """
+        Sum the base amount (debit + credit) of the journal items carrying
+        each tax, for the current period and every comparison period, in a
+        single query over ``account_move_line_account_tax_rel``.
+
+        Without ``group_by`` every tax ever used on a journal item is
+        returned, with zero amounts when it has no item in the period. With
+        ``group_by`` set to ``"account"`` or ``"tax"`` the sums are split per
+        account and only the (account, tax) pairs with items in the current
+        period are returned, ordered account first or tax first.
+
+        :param date start_date: Start date of the current period.
+        :param date end_date: End date of the current period.
+        :param list periods: ``(start, end)`` date pairs of the comparison
+            periods.
+        :param list[str] option_domain: Accepted parent move states.
+        :param str group_by: False, ``"account"`` or ``"tax"``.
+        :return: List of dictionaries with ``tax_id``, ``account_id`` (when
+            grouped by account), ``net`` and ``net_<i>`` per period.
+        :rtype: list
+        """
+        self.env["account.move.line"].flush_model()
+        params = {
+            "company_ids": self.env.companies.ids,
+            "states": list(option_domain),
+            "start_date": start_date,
+            "end_date": end_date,
+            "min_date": min([start_date] + [period[0] for period in periods]),
+        }
+        columns = [
+            "SUM(aml.debit + aml.credit) FILTER (WHERE aml.date >= %(start_date)s)"
+            " AS net",
+            "COUNT(aml.id) FILTER (WHERE aml.date >= %(start_date)s) AS line_count",
+        ]
+        for index, (period_start, period_end) in enumerate(periods, 1):
+            params[f"period_start_{index}"] = period_start
+            params[f"period_end_{index}"] = period_end
+            columns.append(
+                "SUM(aml.debit + aml.credit) FILTER (WHERE aml.date"
+                f" BETWEEN %(period_start_{index})s AND %(period_end_{index})s)"
+                f" AS net_{index}"
+            )
+        conditions = """
+                   aml.id = rel.account_move_line_id
+               AND aml.company_id = ANY(%(company_ids)s)
+               AND aml.parent_state = ANY(%(states)s)
+               AND aml.date BETWEEN %(min_date)s AND %(end_date)s
+        """
+        if group_by:
+            order = (
+                "account.code, tax.sequence, tax.id"
+                if group_by == "account"
+                else "tax.sequence, tax.id, account.code"
+            )
+            query = f"""
+                SELECT rel.account_tax_id AS tax_id, aml.account_id,
+                       {", ".join(columns)}
+                  FROM account_move_line_account_tax_rel rel
+                  JOIN account_move_line aml ON {conditions}
+                  JOIN account_tax tax ON tax.id = rel.account_tax_id
+                  JOIN account_account account ON account.id = aml.account_id
+              GROUP BY rel.account_tax_id, aml.account_id,
+                       tax.sequence, tax.id, account.code
+                HAVING COUNT(aml.id) FILTER (WHERE aml.date >= %(start_date)s) > 0
+              ORDER BY {order}
+            """
+        else:
+            query = f"""
+                SELECT tax.id AS tax_id, {", ".join(columns)}
+                  FROM account_tax tax
+             LEFT JOIN (
+                           account_move_line_account_tax_rel rel
+                           JOIN account_move_line aml ON {conditions}
+                       ) ON rel.account_tax_id = tax.id
+                 WHERE tax.company_id = ANY(%(company_ids)s)
+                   AND EXISTS (
+                           SELECT 1 FROM account_move_line_account_tax_rel used
+                            WHERE used.account_tax_id = tax.id
+                       )
+              GROUP BY tax.id, tax.sequence
+              ORDER BY tax.sequence, tax.id
+            """
+        self.env.cr.execute(query, params)
+        return self.env.cr.dictfetchall()
+
+    @api.model
+    def _prepare_tax_lines(self, totals, comparison_count):
+        """
+        Split the sums returned by :meth:`_get_tax_totals` into the sale and
+        purchase lines sent to the client.
+
+        :param list totals: Raw sums per tax (and account).
+        :param int comparison_count: Number of comparison periods, or False
+            when no comparison was requested.
+        :return: Tuple of the sale and purchase lists.
+        :rtype: tuple
+        """
+        taxes = self.env["account.tax"].browse([total["tax_id"] for total in totals])
+        accounts = self.env["account.account"].browse(
+            [total["account_id"] for total in totals if total.get("account_id")]
+        )
+        account_names = {account.id: account.display_name for account in accounts}
+        sale = []
+        purchase = []
+        for tax, total in zip(taxes, totals):
+            if tax.type_tax_use not in ("sale", "purchase"):
+                continue
+            net = total["net"] or 0.0
+            values = {
+                "name": tax.name,
+                "amount": tax.amount,
+                "net": round(net, 2),
+                "tax": round(net * (tax.amount / 100), 2),
+            }
+            if comparison_count is not False:
+                dynamic_total_net_sum = {}
+                dynamic_total_tax_sum = {}
+                for i in range(1, comparison_count + 1):
+                    dynamic_total_net_sum[f"dynamic_total_net_sum{i}"] = (
+                        total[f"net_{i}"] or 0.0
+                    )
+                    dynamic_total_tax_sum[
+                        f"dynamic_total_tax_sum{i}"
+                    ] = dynamic_total_net_sum[f"dynamic_total_net_sum{i}"] * (
+                        tax.amount / 100
+                    )
+                values["dynamic net"] = dynamic_total_net_sum
+                values["dynamic tax"] = dynamic_total_tax_sum
+            if total.get("account_id"):
+                values["account"] = account_names[total["account_id"]]
+            if tax.type_tax_use == "sale":
+                sale.append(values)
+            else:
+                purchase.append(values)
+        return sale, purchase
+
+    @api.model
+    def _get_xlsx_data(self, options):
+        """Datos de la exportación XLSX recalculados con los mismos argumentos
+        que ``get_filter_values`` (el mes actual si aún no hay filtros)."""
+        args = options.get("args")
+        data = self.get_filter_values(*args) if args else self.view_report()
+        comparison_count = int(args[2] or 0) if args else 0
+        return {
+            "data": data,
+            "sale_total": round(sum(line["tax"] for line in data["sale"]), 2),
+            "purchase_total": round(
+                sum(line["tax"] for line in data["purchase"]), 2
+            ),
+            "date_viewed": self._get_xlsx_period_headers(
+                data.get("dynamic_date_num", {}), options
+            ),
+            "apply_comparison": bool(comparison_count),
+            "comparison_number_range": list(range(1, comparison_count + 1)),
+            "report_type": args[5] if args else None,
+            "filters": options.get("filters", {}),
+        }
+
     @api.model
     def get_month_name(self, date):
         """
@@ -784,6 +285,7 @@ class TaxReport(models.TransientModel):
         return month_names[date.month]
 
     @api.model
+    @report_perf
     def get_xlsx_report(self, data, response, report_name, report_action):
         """
         Generate an XLSX report based on provided data and response stream.
@@ -796,9 +298,8 @@ class TaxReport(models.TransientModel):
         :param response: Response object to stream the generated report.
         :param str report_name: Name of the financial report.
         """
-        data = json.loads(data)
-        output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output, {"in_memory": True})
+        data = self._load_xlsx_data(data)
+        workbook = self._open_xlsx_workbook(response)
         sheet = workbook.add_worksheet()
         sub_heading = workbook.add_format(
             {
@@ -964,7 +465,4 @@ class TaxReport(models.TransientModel):
         sheet.write(row, col + 1, " ", sub_heading)
         sheet.write(row, col + 2, data["purchase_total"], sub_heading)
         row += 1
-        workbook.close()
-        output.seek(0)
-        response.stream.write(output.read())
-        output.close()
+        self._close_xlsx_workbook(workbook, response)
@@ -4,8 +4,8 @@ const {Component} = owl;
 import {registry} from "@web/core/registry";
 import {useService} from "@web/core/utils/hooks";
 import {useRef, useState} from "@odoo/owl";
-import {BlockUI, unblockUI} from "@web/core/ui/block_ui";
-import {download} from "@web/core/network/download";
+import {exportReport} from "@dynamic_accounts_report/js/report_export";
+import {perfKwargs, takePerf} from "@dynamic_accounts_report/js/report_perf";
 const actionRegistry = registry.category("actions");
 const today = luxon.DateTime.now();
 
@@ -19,7 +19,10 @@ class AgedPayable extends owl.Component {
         this.date_range = useRef("date_to");
         this.unfoldButton = useRef("unfoldButton");
         this.fetchPartners();
+        this.filterArgs = null;
         this.state = useState({
+            export_in_background: false,
+            perf: null,
             move_line: null,
             data: null,
             total: null,
@@ -62,9 +65,11 @@ class AgedPayable extends owl.Component {
                     ? this.state.selected_partner_rec[0].id
                     : null; // Si no hay cliente seleccionado, se envía null
 
-            self.state.data = await self.orm.call("age.payable.report", "view_report", [
+            // Mismo reporte que get_filter_values sin fecha (hoy)
+            self.filterArgs = [null, self.state.selected_partner_rec];
+            self.state.data = takePerf(self.state, await self.orm.call("age.payable.report", "view_report", [
                 selectedPartnerId,
-            ]);
+            ], perfKwargs(self.env)));
 
             for (const index in self.state.data) {
                 const value = self.state.data[index];
@@ -230,11 +235,13 @@ class AgedPayable extends owl.Component {
     
             const endDate = this.date_range.el ? this.date_range.el.value : null;
     
-            let filtered_data = await this.orm.call(
+            this.filterArgs = [endDate, this.state.selected_partner_rec];
+            let filtered_data = takePerf(this.state, await this.orm.call(
                 "age.payable.report",
                 "get_filter_values",
-                [endDate, this.state.selected_partner_rec]
-            );
+                this.filterArgs,
+                perfKwargs(this.env)
+            ));
     
             for (const index in filtered_data) {
                 const value = filtered_data[index];
@@ -363,42 +370,20 @@ class AgedPayable extends owl.Component {
     }
     async print_xlsx() {
         /**
-         * Generates and downloads an XLSX report for the aged payable.
+         * Generates the XLSX report of the aged payable, downloaded
+         * straight away or prepared in the background.
          */
-        var self = this;
-        var action_title = self.props.action.display_name;
-        let totals = {
-            diff0_sum: this.state.diff0_sum,
-            diff1_sum: this.state.diff1_sum,
-            diff2_sum: this.state.diff2_sum,
-            diff3_sum: this.state.diff3_sum,
-            diff4_sum: this.state.diff4_sum,
-            diff5_sum: this.state.diff5_sum,
-            total_credit: this.state.total_credit,
-        };
-        var datas = {
-            move_lines: self.state.move_line,
-            data: self.state.data,
-            total: self.state.total,
-            filters: this.filter(),
-            grand_total: totals,
-            title: action_title,
-        };
-        var action = {
-            data: {
-                model: "age.payable.report",
-                data: JSON.stringify(datas),
-                output_format: "xlsx",
-                report_action: self.props.action.xml_id,
-                report_name: action_title,
-            },
-        };
-        BlockUI;
-        await download({
-            url: "/xlsx_report",
-            data: action.data,
-            complete: () => unblockUI,
-            error: (error) => self.call("crash_manager", "rpc_error", error),
+        // Sólo se envían los filtros; el servidor recalcula el reporte.
+        await exportReport(this.env, {
+            report_model: "age.payable.report",
+            background: this.state.export_in_background,
+            output_format: "xlsx",
+            report_name: this.props.action.display_name,
+            report_action: this.props.action.xml_id,
+            options: JSON.stringify({
+                args: this.filterArgs,
+                filters: this.filter(),
+            }),
         });
     }
     async applyFilter(ev, e, is_delete = false) {
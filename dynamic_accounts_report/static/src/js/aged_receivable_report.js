@@ -4,8 +4,8 @@ const {Component} = owl;
 import {registry} from "@web/core/registry";
 import {useService} from "@web/core/utils/hooks";
 import {useRef, useState} from "@odoo/owl";
-import {BlockUI} from "@web/core/ui/block_ui";
-import {download} from "@web/core/network/download";
+import {exportReport} from "@dynamic_accounts_report/js/report_export";
+import {perfKwargs, takePerf} from "@dynamic_accounts_report/js/report_perf";
 const actionRegistry = registry.category("actions");
 const today = luxon.DateTime.now();
 
@@ -18,8 +18,11 @@ class AgedReceivable extends owl.Component {
         this.action = useService("action");
         this.tbody = useRef("tbody");
         this.unfoldButton = useRef("unfoldButton");
-    
+        this.filterArgs = null;
+
         this.state = useState({
+            export_in_background: false,
+            perf: null,
             date_range: { end_date: null },
             move_line: null,
             data: null,
@@ -81,11 +84,14 @@ class AgedReceivable extends owl.Component {
                 this.state.selected_partner_rec.length > 0
                     ? this.state.selected_partner_rec[0].id
                     : null; // Si no hay cliente seleccionado, se envía null
-            self.state.data = await self.orm.call(
+            // Mismo reporte que get_filter_values sin fecha (hoy)
+            self.filterArgs = [null, self.state.selected_partner_rec];
+            self.state.data = takePerf(self.state, await self.orm.call(
                 "age.receivable.report",
                 "view_report",
-                [selectedPartnerId]
-            );
+                [selectedPartnerId],
+                perfKwargs(self.env)
+            ));
             for (const index in self.state.data) {
                 const value = self.state.data[index];
                 if (index !== "partner_totals") {
@@ -310,45 +316,20 @@ class AgedReceivable extends owl.Component {
     }
     async print_xlsx() {
         /**
-         * Generates and downloads an XLSX report for the partner ledger.
+         * Generates the XLSX report of the aged receivable, downloaded
+         * straight away or prepared in the background.
          */
-        console.log("print_xlsx");
-        var self = this;
-        var action_title = self.props.action.display_name;
-        console.log(action_title);
-        let totals = {
-            diff0_sum: this.state.diff0_sum,
-            diff1_sum: this.state.diff1_sum,
-            diff2_sum: this.state.diff2_sum,
-            diff3_sum: this.state.diff3_sum,
-            diff4_sum: this.state.diff4_sum,
-            diff5_sum: this.state.diff5_sum,
-            total_debit: this.state.total_debit,
-        };
-        var datas = {
-            move_lines: self.state.move_line,
-            data: self.state.data,
-            total: self.state.total,
-            filters: this.filter(),
-            grand_total: totals,
-            title: action_title,
-        };
-        console.log(datas);
-        var action = {
-            data: {
-                model: "age.receivable.report",
-                data: JSON.stringify(datas),
-                output_format: "xlsx",
-                report_action: self.props.action.xml_id,
-                report_name: action_title,
-            },
-        };
-        BlockUI;
-        await download({
-            url: "/xlsx_report",
-            data: action.data,
-            complete: () => unblockUI,
-            error: (error) => self.call("crash_manager", "rpc_error", error),
+        // Sólo se envían los filtros; el servidor recalcula el reporte.
+        await exportReport(this.env, {
+            report_model: "age.receivable.report",
+            background: this.state.export_in_background,
+            output_format: "xlsx",
+            report_name: this.props.action.display_name,
+            report_action: this.props.action.xml_id,
+            options: JSON.stringify({
+                args: this.filterArgs,
+                filters: this.filter(),
+            }),
         });
     }
 
@@ -382,11 +363,13 @@ class AgedReceivable extends owl.Component {
 
         try {
             // Obtiene los datos filtrados del servidor
-            const filtered_data = await this.orm.call(
+            this.filterArgs = [filters.end_date, filters.partner];
+            const filtered_data = takePerf(this.state, await this.orm.call(
                 "age.receivable.report",
                 "get_filter_values",
-                [filters.end_date, filters.partner]
-            );
+                this.filterArgs,
+                perfKwargs(this.env)
+            ));
 
             console.log("Filtered Data:", filtered_data);
             // Agrega valores de prueba a diff0 y diff1
@@ -4,8 +4,8 @@ const {Component} = owl;
 import {registry} from "@web/core/registry";
 import {useService} from "@web/core/utils/hooks";
 import {useRef, useState} from "@odoo/owl";
-import {BlockUI} from "@web/core/ui/block_ui";
-import {download} from "@web/core/network/download";
+import {exportReport} from "@dynamic_accounts_report/js/report_export";
+import {perfKwargs, takePerf} from "@dynamic_accounts_report/js/report_perf";
 const actionRegistry = registry.category("actions");
 
 class CashBook extends owl.Component {
@@ -15,9 +15,14 @@ class CashBook extends owl.Component {
         this.orm = useService("orm");
         this.action = useService("action");
         this.dialog = useService("dialog");
+        // Argumentos de la última llamada a get_filter_values, que se
+        // reenvían al servidor al exportar a XLSX.
+        this.filterArgs = null;
         this.tbody = useRef("tbody");
         this.unfoldButton = useRef("unfoldButton");
         this.state = useState({
+            export_in_background: false,
+            perf: null,
             move_line: null,
             data: null,
             total: null,
@@ -49,11 +54,12 @@ class CashBook extends owl.Component {
         var action_title = self.props.action.display_name;
         try {
             var self = this;
-            self.state.data = await self.orm.call(
+            self.state.data = takePerf(self.state, await self.orm.call(
                 "cash.book.report",
                 "view_report",
-                []
-            );
+                [],
+                perfKwargs(self.env)
+            ));
             for (const index in self.state.data) {
                 const value = self.state.data[index];
                 if (index !== "move_lines_total" && index !== "accounts") {
@@ -95,34 +101,22 @@ class CashBook extends owl.Component {
     }
     async printPdf(ev) {
         /**
-         * Generates and displays a PDF report for the bank book.
+         * Generates the PDF report for the cash book, downloaded
+         * straight away or prepared in the background.
          *
          * @param {Event} ev - The event object triggered by the action.
-         * @returns {Promise} - A promise that resolves to the result of the action.
          */
         ev.preventDefault();
-        var self = this;
-        var action_title = self.props.action.display_name;
-        let totals = {
-            total_debit: this.state.total_debit,
-            total_credit: this.state.total_credit,
-            currency: this.state.currency,
-        };
-        return self.action.doAction({
-            type: "ir.actions.report",
-            report_type: "qweb-pdf",
-            report_name: "dynamic_accounts_report.bank_book",
-            report_file: "dynamic_accounts_report.bank_book",
-            data: {
-                move_lines: self.state.move_line,
+        await exportReport(this.env, {
+            report_model: "cash.book.report",
+            background: this.state.export_in_background,
+            output_format: "pdf",
+            report_name: this.props.action.display_name,
+            report_action: "dynamic_accounts_report.bank_book",
+            options: JSON.stringify({
+                args: this.filterArgs,
                 filters: this.filter(),
-                grand_total: totals,
-                data: self.state.data,
-                total: self.state.total,
-                title: action_title,
-                report_name: self.props.action.display_name,
-            },
-            display_name: self.props.action.display_name,
+            }),
         });
     }
     filter() {
@@ -198,38 +192,20 @@ class CashBook extends owl.Component {
     }
     async print_xlsx() {
         /**
-         * Generates and downloads an XLSX report for the bank book.
+         * Generates the XLSX report for the cash book, downloaded
+         * straight away or prepared in the background.
          */
-        var self = this;
-        var action_title = self.props.action.display_name;
-        let totals = {
-            total_debit: this.state.total_debit,
-            total_credit: this.state.total_credit,
-            currency: this.state.currency,
-        };
-        var datas = {
-            move_lines: self.state.move_line,
-            data: self.state.data,
-            total: self.state.total,
-            title: action_title,
-            filters: this.filter(),
-            grand_total: totals,
-        };
-        var action = {
-            data: {
-                model: "cash.book.report",
-                data: JSON.stringify(datas),
-                output_format: "xlsx",
-                report_action: self.props.action.xml_id,
-                report_name: action_title,
-            },
-        };
-        BlockUI;
-        await download({
-            url: "/xlsx_report",
-            data: action.data,
-            complete: () => unblockUI,
-            error: (error) => self.call("crash_manager", "rpc_error", error),
+        // Sólo se envían los filtros; el servidor recalcula el reporte.
+        await exportReport(this.env, {
+            report_model: "cash.book.report",
+            background: this.state.export_in_background,
+            output_format: "xlsx",
+            report_name: this.props.action.display_name,
+            report_action: this.props.action.xml_id,
+            options: JSON.stringify({
+                args: this.filterArgs,
+                filters: this.filter(),
+            }),
         });
     }
     async applyFilter(val, ev, is_delete = false) {
@@ -317,16 +293,18 @@ class CashBook extends owl.Component {
                 }
             }
         }
-        let filtered_data = await this.orm.call(
+        this.filterArgs = [
+            this.state.selected_partner,
+            this.state.date_range,
+            this.state.selected_account_list,
+            this.state.options,
+        ];
+        let filtered_data = takePerf(this.state, await this.orm.call(
             "cash.book.report",
             "get_filter_values",
-            [
-                this.state.selected_partner,
-                this.state.date_range,
-                this.state.selected_account_list,
-                this.state.options,
-            ]
-        );
+            this.filterArgs,
+            perfKwargs(this.env)
+        ));
         for (const [index, value] of Object.entries(filtered_data)) {
             if (index !== "move_lines_total") {
                 move_line_list.push(index);
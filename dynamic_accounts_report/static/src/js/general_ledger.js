@@ -4,7 +4,9 @@ import { Component, useRef, useState } from "@odoo/owl";
 import { registry } from "@web/core/registry";
 import { useService } from "@web/core/utils/hooks";
 import { BlockUI } from "@web/core/ui/block_ui";
-import { download } from "@web/core/network/download";
+import { loadFilterCatalogs } from "@dynamic_accounts_report/js/report_catalogs";
+import { exportReport } from "@dynamic_accounts_report/js/report_export";
+import { perfKwargs, takePerf } from "@dynamic_accounts_report/js/report_perf";
 
 
 const actionRegistry = registry.category("actions");
@@ -24,6 +26,8 @@ class GeneralLedger extends Component {
         this.unfoldButton = useRef("unfoldButton");
 
         this.state = useState({
+            export_in_background: false,
+            perf: null,
             account: null,
             account_data: null,
             account_data_list: null,
@@ -51,7 +55,11 @@ class GeneralLedger extends Component {
             filter_applied: null,
             account_list: null,
             account_total_list: null,
+            account_next: {},
+            account_loading: {},
+            unfold_all: false,
         });
+        this.filterArgs = null;
 
         this.loadInitialOptions();
     }
@@ -167,10 +175,10 @@ class GeneralLedger extends Component {
     }
 
     async loadInitialOptions() {
-        const data = await this.orm.call("account.general.ledger", "view_report", [null, null]);
-        this.state.journals = data.journal_ids || [];
-        this.state.analytics = data.analytic_ids || [];
-        this.state.accounts = data.account_ids || [];
+        const catalogs = await loadFilterCatalogs(this.orm);
+        this.state.journals = [...catalogs.journals];
+        this.state.analytics = [...catalogs.analytics];
+        this.state.accounts = [...catalogs.accounts];
         const base = this.state.accounts.filter(a => a && a.id != null);
         this.state.all_accounts = [{ id: null, name: "ALL" }, ...base];
         this.state.filteredAccounts = [...this.state.all_accounts];
@@ -226,8 +234,8 @@ class GeneralLedger extends Component {
     }
 
     async fetchAccounts() {
-        const data = await this.orm.call("account.general.ledger", "view_report", [null, null]);
-        const base = (data.account_ids || []).filter(a => a && a.id != null);
+        const catalogs = await loadFilterCatalogs(this.orm);
+        const base = catalogs.accounts.filter(a => a && a.id != null);
         this.state.accounts = base;
         this.state.all_accounts = [{ id:null, name:"ALL" }, ...base];
         this.state.filteredAccounts = [...this.state.all_accounts];
@@ -268,36 +276,16 @@ class GeneralLedger extends Component {
             this.notification.add(this.state.dateError || "Rango de fechas inválido.", { type: "danger" });
             return;
         }
-        const totals = {
-            total_debit: this.state.total_debit,
-            total_credit: this.state.total_credit,
-            currency: this.state.currency,
-        };
-        const action_title = this.props.action.display_name;
-
-        return this.action.doAction({
-            type: "ir.actions.report",
-            report_type: "qweb-pdf",
-            report_name: "dynamic_accounts_report.general_ledger",
-            report_file: "dynamic_accounts_report.general_ledger",
-            data: {
-
-                data: this.state,
-                account: this.state.account,
-                data: this.state.account_data,
-                analytics: this.state.analytics,
-                total: this.state.account_total,
-                title: action_title,
-                filters: this.filter(),
-                grand_total: totals,
-                report_name: action_title,
-
-            },
-           
-            display_name: action_title,
-        
+        // El PDF se genera con las líneas recalculadas en el servidor a
+        // partir de los filtros.
+        await exportReport(this.env, {
+            report_model: "account.general.ledger",
+            background: this.state.export_in_background,
+            output_format: "pdf",
+            report_name: this.props.action.display_name,
+            report_action: "dynamic_accounts_report.general_ledger",
+            options: JSON.stringify({ args: this.filterArgs, filters: this.filter() }),
         });
-        
     }
 
     async print_xlsx() {
@@ -305,52 +293,16 @@ class GeneralLedger extends Component {
             this.notification.add(this.state.dateError || "Rango de fechas inválido.", { type: "danger" });
             return;
         }
-    
-        this.ui.block();
-        try {
-            // 1) Deriva nombres de analíticas (si ya tienes analytics en state)
-            const analyticNames = Array.from(this.state.selected_analytic_list || [])
-                .map((id) => (this.state.analytics || []).find((a) => a.id === id))
-                .filter(Boolean)
-                .map((a) => a.name);
-    
-            const action_title = this.props.action.display_name;
-            const totals = {
-                total_debit: this.state.total_debit,
-                total_credit: this.state.total_credit,
-                currency: this.state.currency,
-            };
-    
-            // 2) Incluye analítica en filters y también manda las líneas con _analytic_label si ya las tienes
-            const datas = {
-                account: this.state.account,
-                data: this.state.account_data,
-                total: this.state.account_total,
-                title: action_title,
-                filters: {
-                    ...this.filter(),                         // lo que ya mandabas
-                    analytic_ids: Array.from(this.state.selected_analytic_list || []),
-                    analytic_names: analyticNames,            // <- NUEVO
-                },
-                grand_total: totals,
-                lines: this.state.account_data_list || [],     // <- por si tu xlsx usa las líneas ya anotadas
-            };
-    
-            await download({
-                url: "/xlsx_report",
-                data: {
-                    model: "account.general.ledger",
-                    data: JSON.stringify(datas),              // <- ahora el JSON ya lleva analítica y líneas
-                    output_format: "xlsx",
-                    report_action: this.props.action.xml_id,
-                    report_name: action_title,
-                    // mantener si tu controlador actual lo usa:
-                    lines: this.state.account_data_list || [],
-                },
-            });
-        } finally {
-            this.ui.unblock();
-        }
+        // El servidor recalcula (o lee de la caché) las líneas a partir
+        // de los filtros.
+        await exportReport(this.env, {
+            report_model: "account.general.ledger",
+            background: this.state.export_in_background,
+            output_format: "xlsx",
+            report_name: this.props.action.display_name,
+            report_action: this.props.action.xml_id,
+            options: JSON.stringify({ args: this.filterArgs, filters: this.filter() }),
+        });
     }
     
 
@@ -407,19 +359,15 @@ class GeneralLedger extends Component {
             ? [...this.state.selected_account_list]
             : (this.state.selected_account_rec || []).map(a => a.id);
 
-        const filtered_data = await this.orm.call(
+        // Modo diferido: primero sólo totales por cuenta; las líneas se
+        // piden página a página al desplegar cada cuenta.
+        this.filterArgs = [journal_ids, date_range, options, analytic, method, account_ids];
+        const filtered_data = takePerf(this.state, await this.orm.call(
             "account.general.ledger",
-            "get_filter_values",
-            [journal_ids, date_range, options, analytic, method, account_ids]
-        );
-
-        this.state.journals = filtered_data.journal_ids || this.state.journals;
-        this.state.analytics = filtered_data.analytic_ids || this.state.analytics;
-        this.state.accounts = filtered_data.account_ids || this.state.accounts;
-
-        const base = this.state.accounts.filter(a => a && a.id != null);
-        this.state.all_accounts = [{ id: null, name: "ALL" }, ...base];
-        this.state.filteredAccounts = [{ id: null, name: "ALL" }, ...base];
+            "get_account_totals",
+            this.filterArgs,
+            perfKwargs(this.env)
+        ));
 
         let totalDebitSum = 0;
         let totalCreditSum = 0;
@@ -429,24 +377,19 @@ class GeneralLedger extends Component {
             totalCreditSum += accTot?.total_credit || 0;
         }
 
-        const cleaned_account_data = {};
-        const account_list = [];
-        for (const [key, value] of Object.entries(filtered_data)) {
-            if (["account_totals", "journal_ids", "analytic_ids", "account_ids"].includes(key)) continue;
-            account_list.push(key);
-            if (Array.isArray(value) && value.length) {
-                const flat = value.flat();
-                cleaned_account_data[key] = flat.map(v => (Array.isArray(v) ? v[0] : v));
-            } else {
-                cleaned_account_data[key] = [];
-            }
+        const account_data = {};
+        const account_next = {};
+        for (const key of Object.keys(account_totals)) {
+            account_data[key] = [];
+            // undefined = aún no cargada; false = no hay más páginas
+            account_next[key] = undefined;
         }
 
-        await this._annotateAnalyticLabels(cleaned_account_data);
-
         this.state.currency = (Object.values(account_totals)[0] || {}).currency_id || "";
-        this.state.account = [...new Set(account_list)];
-        this.state.account_data = cleaned_account_data;
+        this.state.account = Object.keys(account_totals);
+        this.state.account_data = account_data;
+        this.state.account_next = account_next;
+        this.state.account_loading = {};
         this.state.account_total = account_totals;
         this.state.total_debit = totalDebitSum.toFixed(2);
         this.state.total_credit = totalCreditSum.toFixed(2);
@@ -454,20 +397,58 @@ class GeneralLedger extends Component {
         if (this.unfoldButton.el?.classList?.contains("selected-filter")) {
             this.unfoldButton.el.classList.remove("selected-filter");
         }
+        this.state.unfold_all = false;
         this.render(true);
     }
 
+    async loadAccountLines(account) {
+        const next = this.state.account_next[account];
+        if (!this.filterArgs || next === false || this.state.account_loading[account]) {
+            return;
+        }
+        this.state.account_loading[account] = true;
+        try {
+            const accountId = this.state.account_total[account].account_id;
+            const page = takePerf(this.state, await this.orm.call(
+                "account.general.ledger",
+                "get_account_lines",
+                [accountId, ...this.filterArgs, next || null],
+                perfKwargs(this.env)
+            ));
+            const lines = { [account]: page.lines || [] };
+            await this._annotateAnalyticLabels(lines);
+            this.state.account_data[account] = [
+                ...(this.state.account_data[account] || []),
+                ...lines[account],
+            ];
+            this.state.account_next[account] = page.next || false;
+        } finally {
+            this.state.account_loading[account] = false;
+        }
+    }
+
+    async onToggleAccount(account) {
+        if (this.state.account_next[account] === undefined) {
+            await this.loadAccountLines(account);
+        }
+    }
+
     async unfoldAll(ev) {
         if (!ev.target.classList.contains("selected-filter")) {
+            ev.target.classList.add("selected-filter");
+            this.state.unfold_all = true;
+            await Promise.all(
+                (this.state.account || []).map(account => this.onToggleAccount(account))
+            );
             for (const child of this.tbody.el.children) {
                 child.classList.add("show");
             }
-            ev.target.classList.add("selected-filter");
         } else {
             for (const child of this.tbody.el.children) {
                 child.classList.remove("show");
             }
             ev.target.classList.remove("selected-filter");
+            this.state.unfold_all = false;
         }
     }
 
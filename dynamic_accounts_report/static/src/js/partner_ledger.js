@@ -4,8 +4,8 @@ const {Component} = owl;
 import {registry} from "@web/core/registry";
 import {useService} from "@web/core/utils/hooks";
 import {useRef, useState} from "@odoo/owl";
-import {BlockUI} from "@web/core/ui/block_ui";
-import {download} from "@web/core/network/download";
+import {exportReport} from "@dynamic_accounts_report/js/report_export";
+import {perfKwargs, takePerf} from "@dynamic_accounts_report/js/report_perf";
 const actionRegistry = registry.category("actions");
 
 class PartnerLedger extends owl.Component {
@@ -17,8 +17,13 @@ class PartnerLedger extends owl.Component {
         this.tbody = useRef("tbody");
         this.unfoldButton = useRef("unfoldButton");
         this.dialog = useService("dialog");
+        // Argumentos de la última llamada a get_filter_values, que se
+        // reenvían al servidor al exportar a XLSX.
+        this.filterArgs = null;
         this.fetchPartners();
         this.state = useState({
+            export_in_background: false,
+            perf: null,
             partners: null,
             all_partners: [],
             data: null,
@@ -52,11 +57,12 @@ class PartnerLedger extends owl.Component {
         var action_title = self.props.action.display_name;
         try {
             var self = this;
-            self.state.data = await self.orm.call(
+            self.state.data = takePerf(self.state, await self.orm.call(
                 "account.partner.ledger",
                 "view_report",
-                [[this.wizard_id], action_title]
-            );
+                [[this.wizard_id], action_title],
+                perfKwargs(self.env)
+            ));
             // Extract partner information from the data
             $.each(self.state.data, function (index, value) {
                 if (index !== "partner_totals") {
@@ -84,36 +90,22 @@ class PartnerLedger extends owl.Component {
     }
     async printPdf(ev) {
         /**
-         * Generates and displays a PDF report for the partner ledger.
+         * Generates the PDF report for the partner ledger, downloaded
+         * straight away or prepared in the background.
          *
          * @param {Event} ev - The event object triggered by the action.
-         * @returns {Promise} - A promise that resolves to the result of the action.
          */
         ev.preventDefault();
-        let partner_list = [];
-        let partner_value = [];
-        let partner_totals = "";
-        let totals = {
-            total_debit: this.state.total_debit,
-            total_credit: this.state.total_credit,
-            currency: this.state.currency,
-        };
-        var action_title = this.props.action.display_name;
-        return this.action.doAction({
-            type: "ir.actions.report",
-            report_type: "qweb-pdf",
-            report_name: "dynamic_accounts_report.partner_ledger",
-            report_file: "dynamic_accounts_report.partner_ledger",
-            data: {
-                partners: this.state.partners,
+        await exportReport(this.env, {
+            report_model: "account.partner.ledger",
+            background: this.state.export_in_background,
+            output_format: "pdf",
+            report_name: this.props.action.display_name,
+            report_action: "dynamic_accounts_report.partner_ledger",
+            options: JSON.stringify({
+                args: this.filterArgs,
                 filters: this.filter(),
-                grand_total: totals,
-                data: this.state.data,
-                total: this.state.total,
-                title: action_title,
-                report_name: this.props.action.display_name,
-            },
-            display_name: this.props.action.display_name,
+            }),
         });
     }
 
@@ -204,42 +196,20 @@ class PartnerLedger extends owl.Component {
     
     async print_xlsx() {
         /**
-         * Generates and downloads an XLSX report for the partner ledger.
+         * Generates the XLSX report for the partner ledger, downloaded
+         * straight away or prepared in the background.
          */
-        var self = this;
-
-        let partner_list = [];
-        let partner_value = [];
-        let partner_totals = "";
-        let totals = {
-            total_debit: this.state.total_debit,
-            total_credit: this.state.total_credit,
-            currency: this.state.currency,
-        };
-        var action_title = self.props.action.display_name;
-        var datas = {
-            partners: self.state.partners,
-            data: self.state.data,
-            total: self.state.total,
-            title: action_title,
-            filters: this.filter(),
-            grand_total: totals,
-        };
-        var action = {
-            data: {
-                model: "account.partner.ledger",
-                data: JSON.stringify(datas),
-                output_format: "xlsx",
-                report_action: self.props.action.xml_id,
-                report_name: action_title,
-            },
-        };
-        BlockUI;
-        await download({
-            url: "/xlsx_report",
-            data: action.data,
-            complete: () => unblockUI,
-            error: (error) => self.call("crash_manager", "rpc_error", error),
+        // Sólo se envían los filtros; el servidor recalcula el reporte.
+        await exportReport(this.env, {
+            report_model: "account.partner.ledger",
+            background: this.state.export_in_background,
+            output_format: "xlsx",
+            report_name: this.props.action.display_name,
+            report_action: this.props.action.xml_id,
+            options: JSON.stringify({
+                args: this.filterArgs,
+                filters: this.filter(),
+            }),
         });
     }
     gotoJournalEntry(ev) {
@@ -355,16 +325,18 @@ class PartnerLedger extends owl.Component {
         //console.log(this.state.date_range,"VALOR FECHA#")
         // Llamada a la base de datos
         const filters = this.filter(); // { partner, account, options, start_date, end_date }
-        let filtered_data = await this.orm.call(
+        this.filterArgs = [
+            this.state.selected_partner, // (revisa contrato: id, lista o nombre)
+            { start_date: filters.start_date, end_date: filters.end_date }, // SOLO fechas
+            this.state.account,
+            this.state.options,
+        ];
+        let filtered_data = takePerf(this.state, await this.orm.call(
             "account.partner.ledger",
             "get_filter_values",
-            [
-                this.state.selected_partner, // (revisa contrato: id, lista o nombre)
-                { start_date: filters.start_date, end_date: filters.end_date }, // SOLO fechas
-                this.state.account,
-                this.state.options,
-            ]
-        );
+            this.filterArgs,
+            perfKwargs(this.env)
+        ));
 
 
         console.log(filtered_data,"ESTA ES LA DATA")
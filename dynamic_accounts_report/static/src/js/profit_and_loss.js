@@ -5,8 +5,7 @@ const now = new Date();
 import {registry} from "@web/core/registry";
 import {useService} from "@web/core/utils/hooks";
 import {useRef, useState} from "@odoo/owl";
-import {BlockUI} from "@web/core/ui/block_ui";
-import {download} from "@web/core/network/download";
+import {exportReport} from "@dynamic_accounts_report/js/report_export";
 const actionRegistry = registry.category("actions");
 
 class ProfitAndLoss extends owl.Component {
@@ -22,6 +21,7 @@ class ProfitAndLoss extends owl.Component {
         this.period_year = useRef("period_year");
         this.draft = useRef("draft");
         this.state = useState({
+            export_in_background: false,
             data: null,
             filter_data: null,
             year: [now.getFullYear()],
@@ -122,36 +122,26 @@ class ProfitAndLoss extends owl.Component {
     }
     async print_xlsx(ev) {
         /**
-         * Generates and downloads an XLSX report based on the profit and loss data.
+         * Generates the XLSX report of the profit and loss, downloaded
+         * straight away or prepared in the background.
          *
          * @param {Event} ev - The event object triggered by the action.
          */
-        var self = this;
-        let data = await self.orm.call("dynamic.balance.sheet.report", "view_report", [
-            this.wizard_id,
-            this.state.comparison,
-            this.state.comparison_type,
-            this.filter
-        ]);
-        self.state.data = data[0];
-        self.state.datas = data[2];
-
-        var action = {
-            data: {
-                model: "dynamic.balance.sheet.report",
-                data: JSON.stringify(self.state),
-                output_format: "xlsx",
-                report_action: self.props.action.xml_id,
-                report_name: self.props.action.display_name,
-            },
-        };
-
-        BlockUI;
-        await download({
-            url: "/xlsx_report",
-            data: action.data,
-            complete: () => unblockUI,
-            error: (error) => self.call("crash_manager", "rpc_error", error),
+        // Sólo se envían los filtros; el servidor recalcula el reporte.
+        await exportReport(this.env, {
+            report_model: "dynamic.balance.sheet.report",
+            background: this.state.export_in_background,
+            output_format: "xlsx",
+            report_name: this.props.action.display_name,
+            report_action: this.props.action.xml_id,
+            options: JSON.stringify({
+                args: [
+                    this.wizard_id,
+                    this.state.comparison,
+                    this.state.comparison_type,
+                ],
+                year: this.state.year,
+            }),
         });
     }
     async apply_journal(ev) {
@@ -290,6 +280,21 @@ class ProfitAndLoss extends owl.Component {
         // self.initial_render = false;
         // self.load_data(self.initial_render);
     }
+    async apply_consolidation(ev) {
+        /**
+         * Toggles the consolidation of the active companies: their accounts
+         * are merged by code in the currency of the current company.
+         *
+         * @param {Event} ev - The event object triggered by the action.
+         */
+        self = this;
+        const consolidate = !ev.target.classList.contains("selected-filter");
+        ev.target.classList.toggle("selected-filter", consolidate);
+        await self.orm.call("dynamic.balance.sheet.report", "filter", [
+            this.wizard_id,
+            {consolidate: consolidate},
+        ]);
+    }
     async unfoldAll(ev) {
         /**
          * Unfolds or collapses all elements in a table body based on the given event target's class.
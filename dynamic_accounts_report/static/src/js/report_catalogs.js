@@ -0,0 +1,34 @@
+/** @odoo-module */
+
+// Catálogos de filtros ya pedidos en esta sesión del cliente web (al cambiar
+// de compañía la página se recarga, y con ella esta caché).
+let catalogsPromise = null;
+
+function toRecords(catalog) {
+    return catalog.map(([id, code, name]) => ({id, code, name}));
+}
+
+export function loadFilterCatalogs(orm) {
+    /**
+     * Returns the journals, accounts and analytic accounts of the report
+     * filters, fetched from the server once per session.
+     *
+     * @param {Object} orm - The orm service of the calling component.
+     * @returns {Promise<Object>} - `journals`, `accounts` and `analytics`,
+     *     lists of `{id, code, name}` records.
+     */
+    if (!catalogsPromise) {
+        catalogsPromise = orm
+            .call("report.domain.mixin", "get_filter_catalogs", [])
+            .then((catalogs) => ({
+                journals: toRecords(catalogs.journals),
+                accounts: toRecords(catalogs.accounts),
+                analytics: toRecords(catalogs.analytics),
+            }))
+            .catch((error) => {
+                catalogsPromise = null;
+                throw error;
+            });
+    }
+    return catalogsPromise;
+}
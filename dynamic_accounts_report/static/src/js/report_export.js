@@ -0,0 +1,102 @@
+/** @odoo-module */
+
+import {download} from "@web/core/network/download";
+
+// Intervalo (ms) entre consultas del estado de una exportación.
+const POLL_INTERVAL = 2000;
+// Consultas como máximo antes de dejar de esperar (unos 15 minutos).
+const MAX_POLLS = 450;
+
+export async function exportReport(env, {background = false, ...values}) {
+    /**
+     * Exports a dynamic report: downloaded straight away by default, or
+     * prepared by a background job when the user asked for it (large
+     * exports that would hit the time limit of the web worker). In both
+     * cases the server rebuilds the report from the options.
+     *
+     * @param {Object} env - The environment of the calling component.
+     * @param {Object} values - The values of exportInBackground, plus
+     *     ``background`` to queue the export.
+     * @returns {Promise} - Resolved once the file is downloaded or shown.
+     */
+    if (background) {
+        return exportInBackground(env, values);
+    }
+    const {orm, ui, action} = env.services;
+    if (values.output_format === "pdf") {
+        const data = await orm.call(
+            "dynamic.report.export",
+            "get_report_data",
+            [],
+            {
+                report_model: values.report_model,
+                report_name: values.report_name,
+                options: values.options,
+            }
+        );
+        return action.doAction({
+            type: "ir.actions.report",
+            report_type: "qweb-pdf",
+            report_name: values.report_action,
+            report_file: values.report_action,
+            data,
+            display_name: values.report_name,
+        });
+    }
+    // El archivo se genera y se envía por bloques en la misma petición
+    ui.block();
+    try {
+        await download({
+            url: "/xlsx_report",
+            data: {
+                model: values.report_model,
+                options: values.options,
+                output_format: values.output_format,
+                report_action: values.report_action,
+                report_name: values.report_name,
+            },
+        });
+    } finally {
+        ui.unblock();
+    }
+}
+
+export async function exportInBackground(env, values) {
+    /**
+     * Queues an export of a dynamic report, polls the job until the server
+     * has written the file and downloads it. The web worker is released as
+     * soon as the job is queued.
+     *
+     * @param {Object} env - The environment of the calling component.
+     * @param {Object} values - report_model, output_format, report_name,
+     *     report_action and options (JSON with the args and filters).
+     * @returns {Promise} - Resolved once the file is downloaded, the export
+     *     has failed or it took too long.
+     */
+    const {orm, notification} = env.services;
+    const jobId = await orm.call("dynamic.report.export", "enqueue_export", [], values);
+    notification.add("The export is being prepared; it will download when ready.", {
+        type: "info",
+    });
+    for (let poll = 0; poll < MAX_POLLS; poll++) {
+        await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL));
+        const status = await orm.call(
+            "dynamic.report.export",
+            "get_export_status",
+            [jobId]
+        );
+        if (status.state === "done") {
+            return download({
+                url: "/web/content",
+                data: {id: status.attachment_id, download: true},
+            });
+        }
+        if (status.state === "failed") {
+            notification.add(status.error || "The export failed.", {type: "danger"});
+            return;
+        }
+    }
+    notification.add("The export is taking too long; try again later.", {
+        type: "warning",
+    });
+}
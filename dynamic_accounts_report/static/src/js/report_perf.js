@@ -0,0 +1,28 @@
+/** @odoo-module */
+
+export function perfKwargs(env) {
+    /**
+     * Keyword arguments of a report call asking the server for the `_perf`
+     * metrics of the response, only in developer mode.
+     *
+     * @param {Object} env - The environment of the calling component.
+     * @returns {Object} - The keyword arguments for `orm.call`.
+     */
+    return env.debug ? {context: {report_perf: true}} : {};
+}
+
+export function takePerf(state, data) {
+    /**
+     * Moves the `_perf` metrics of a report response into `state.perf`, so
+     * the response only holds report data.
+     *
+     * @param {Object} state - The state of the calling component.
+     * @param {Object} data - The report response.
+     * @returns {Object} - The report response without `_perf`.
+     */
+    if (data && data._perf) {
+        state.perf = data._perf;
+        delete data._perf;
+    }
+    return data;
+}
@@ -4,8 +4,8 @@ const {Component} = owl;
 import {registry} from "@web/core/registry";
 import {useService} from "@web/core/utils/hooks";
 import {useRef, useState} from "@odoo/owl";
-import {BlockUI} from "@web/core/ui/block_ui";
-import {download} from "@web/core/network/download";
+import {exportReport} from "@dynamic_accounts_report/js/report_export";
+import {perfKwargs, takePerf} from "@dynamic_accounts_report/js/report_perf";
 const actionRegistry = registry.category("actions");
 const today = luxon.DateTime.now();
 let monthNamesShort = [
@@ -39,6 +39,8 @@ class TaxReport extends owl.Component {
         this.period_year = useRef("period_year");
         this.unfoldButton = useRef("unfoldButton");
         this.state = useState({
+            export_in_background: false,
+            perf: null,
             move_line: null,
             data: null,
             sale_total: 0.0,
@@ -61,6 +63,7 @@ class TaxReport extends owl.Component {
                 accural: true,
             },
         });
+        this.filterArgs = null;
         this.load_data((self.initial_render = true));
     }
     async load_data() {
@@ -76,7 +79,7 @@ class TaxReport extends owl.Component {
             var today = new Date();
             var startOfMonth = new Date(today.getFullYear(), today.getMonth(), 1);
             var endOfMonth = new Date(today.getFullYear(), today.getMonth() + 1, 0);
-            self.state.data = await self.orm.call("tax.report", "view_report", []);
+            self.state.data = takePerf(self.state, await self.orm.call("tax.report", "view_report", [], perfKwargs(self.env)));
             self.start_date.el.value =
                 startOfMonth.getFullYear() +
                 "-" +
@@ -319,14 +322,20 @@ class TaxReport extends owl.Component {
                 this.state.comparison_number = this.period.el.value;
             }
         }
-        this.state.data = await this.orm.call("tax.report", "get_filter_values", [
+        this.filterArgs = [
             this.start_date.el.value,
             this.end_date.el.value,
             this.state.comparison_number,
             this.state.comparison_type,
             this.state.options,
             this.state.report_type,
-        ]);
+        ];
+        this.state.data = takePerf(this.state, await this.orm.call(
+            "tax.report",
+            "get_filter_values",
+            this.filterArgs,
+            perfKwargs(this.env)
+        ));
         var date_viewed = [];
         var sale_total = 0.0;
         var purchase_total = 0.0;
@@ -389,41 +398,21 @@ class TaxReport extends owl.Component {
     }
     async print_xlsx() {
         /**
-         * Asynchronously generates and downloads an XLSX report.
-         * Triggers an action to generate an XLSX report based on the current state and settings,
-         * and initiates the download of the generated XLSX file.
-         *
-         * @returns {void} No explicit return value.
+         * Generates the XLSX report of the taxes, downloaded
+         * straight away or prepared in the background.
          */
-        var self = this;
-        var action_title = self.props.action.display_name;
-        var datas = {
-            data: self.state.data,
-            sale_total: self.state.sale_total,
-            purchase_total: self.state.purchase_total,
-            date_viewed: self.state.date_viewed,
-            apply_comparison: self.state.apply_comparison,
-            comparison_number_range: self.comparison_number_range,
-            report_type: self.state.report_type,
-            filters: this.filter(),
-            title: action_title,
-            report_name: self.props.action.display_name,
-        };
-        var action = {
-            data: {
-                model: "tax.report",
-                data: JSON.stringify(datas),
-                output_format: "xlsx",
-                report_action: self.props.action.id,
-                report_name: action_title,
-            },
-        };
-        BlockUI;
-        await download({
-            url: "/xlsx_report",
-            data: action.data,
-            complete: () => unblockUI,
-            error: (error) => self.call("crash_manager", "rpc_error", error),
+        // Sólo se envían los filtros; el servidor recalcula el reporte.
+        await exportReport(this.env, {
+            report_model: "tax.report",
+            background: this.state.export_in_background,
+            output_format: "xlsx",
+            report_name: this.props.action.display_name,
+            report_action: this.props.action.id,
+            options: JSON.stringify({
+                args: this.filterArgs,
+                filters: this.filter(),
+                date_viewed: this.state.date_viewed,
+            }),
         });
     }
     filter() {
@@ -4,8 +4,9 @@ const {Component} = owl;
 import {registry} from "@web/core/registry";
 import {useService} from "@web/core/utils/hooks";
 import {useRef, useState} from "@odoo/owl";
-import {BlockUI} from "@web/core/ui/block_ui";
-import {download} from "@web/core/network/download";
+import {loadFilterCatalogs} from "@dynamic_accounts_report/js/report_catalogs";
+import {exportReport} from "@dynamic_accounts_report/js/report_export";
+import {perfKwargs, takePerf} from "@dynamic_accounts_report/js/report_perf";
 const actionRegistry = registry.category("actions");
 const today = luxon.DateTime.now();
 let monthNamesShort = [
@@ -36,6 +37,8 @@ class TrialBalance extends owl.Component {
         this.period_year = useRef("period_year");
         this.unfoldButton = useRef("unfoldButton");
         this.state = useState({
+            export_in_background: false,
+            perf: null,
             move_line: null,
             data: null,
             total: null,
@@ -55,6 +58,7 @@ class TrialBalance extends owl.Component {
                 accural: true,
             },
         });
+        this.filterArgs = null;
         this.load_data((self.initial_render = true));
     }
     async load_data() {
@@ -70,11 +74,12 @@ class TrialBalance extends owl.Component {
             var today = new Date();
             var startOfMonth = new Date(today.getFullYear(), today.getMonth(), 1);
             var endOfMonth = new Date(today.getFullYear(), today.getMonth() + 1, 0);
-            self.state.data = await self.orm.call(
+            self.state.data = takePerf(self.state, await self.orm.call(
                 "account.trial.balance",
                 "view_report",
-                []
-            );
+                [],
+                perfKwargs(self.env)
+            ));
             self.start_date.el.value =
                 startOfMonth.getFullYear() +
                 "-" +
@@ -90,9 +95,7 @@ class TrialBalance extends owl.Component {
             self.state.date_viewed.push(
                 monthNamesShort[today.getMonth()] + "  " + today.getFullYear()
             );
-            $.each(self.state.data, function (index, value) {
-                self.state.journals = value.journal_ids;
-            });
+            self.state.journals = (await loadFilterCatalogs(self.orm)).journals;
         } catch (el) {
             window.location.href;
         }
@@ -340,25 +343,24 @@ class TrialBalance extends owl.Component {
                 this.state.comparison_number = this.period.el.value;
             }
         }
-        this.state.data = await this.orm.call(
+        this.filterArgs = [
+            this.start_date.el.value,
+            this.end_date.el.value,
+            this.state.comparison_number,
+            this.state.comparison_type,
+            this.state.selected_journal_list,
+            this.state.selected_analytic,
+            this.state.options,
+            this.state.method,
+        ];
+        this.state.data = takePerf(this.state, await this.orm.call(
             "account.trial.balance",
             "get_filter_values",
-            [
-                this.start_date.el.value,
-                this.end_date.el.value,
-                this.state.comparison_number,
-                this.state.comparison_type,
-                this.state.selected_journal_list,
-                this.state.selected_analytic,
-                this.state.options,
-                this.state.method,
-            ]
-        );
+            this.filterArgs,
+            perfKwargs(this.env)
+        ));
         var date_viewed = [];
         $.each(this.state.data, function (index, value) {
-            if (index == "journal_ids") {
-                this.state.journals = value;
-            }
             if (value.dynamic_date_num) {
                 $.each(value.dynamic_date_num, function (index, value) {
                     if (!date_viewed.includes(value)) {
@@ -537,7 +539,7 @@ class TrialBalance extends owl.Component {
         }
         const selectedJournalIDs = Object.values(self.state.selected_journal_list);
         const selectedJournalNames = selectedJournalIDs.map((journalID) => {
-            const journal = self.state.journals[journalID];
+            const journal = self.state.journals.find((j) => j.id === journalID);
             return journal ? journal.name : ""; // Return the name if journal exists, otherwise an empty string
         });
         let filters = {
@@ -569,38 +571,21 @@ class TrialBalance extends owl.Component {
     }
     async print_xlsx() {
         /**
-         * Asynchronously generates and downloads an XLSX report.
-         * Triggers an action to generate an XLSX report based on the current state and settings,
-         * and initiates the download of the generated XLSX file.
-         *
-         * @returns {void} No explicit return value.
+         * Generates the XLSX report of the trial balance, downloaded
+         * straight away or prepared in the background.
          */
-        var self = this;
-        var action_title = self.props.action.display_name;
-        var datas = {
-            data: self.state.data,
-            date_viewed: self.state.date_viewed,
-            filters: this.filter(),
-            apply_comparison: self.state.apply_comparison,
-            comparison_number_range: self.comparison_number_range,
-            title: action_title,
-            report_name: self.props.action.display_name,
-        };
-        var action = {
-            data: {
-                model: "account.trial.balance",
-                data: JSON.stringify(datas),
-                output_format: "xlsx",
-                report_action: self.props.action.xml_id,
-                report_name: action_title,
-            },
-        };
-        BlockUI;
-        await download({
-            url: "/xlsx_report",
-            data: action.data,
-            complete: () => unblockUI,
-            error: (error) => self.call("crash_manager", "rpc_error", error),
+        // Sólo se envían los filtros; el servidor recalcula el reporte.
+        await exportReport(this.env, {
+            report_model: "account.trial.balance",
+            background: this.state.export_in_background,
+            output_format: "xlsx",
+            report_name: this.props.action.display_name,
+            report_action: this.props.action.xml_id,
+            options: JSON.stringify({
+                args: this.filterArgs,
+                filters: this.filter(),
+                date_viewed: this.state.date_viewed,
+            }),
         });
     }
     async show_gl(ev) {
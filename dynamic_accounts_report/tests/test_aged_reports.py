@@ -0,0 +1,131 @@
+################################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>).
+#    Author: Ammu Raj (odoo@cybrosys.com)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+################################################################################
+from odoo import fields
+from odoo.tests import tagged
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+
+
+@tagged("post_install", "-at_install")
+class TestAgedReports(AccountTestInvoicingCommon):
+    """Residuals and aging buckets of the aged payable and receivable reports
+    computed by aged.report.mixin, checked against the residuals of the ORM"""
+
+    @classmethod
+    def setUpClass(cls, chart_template_ref=None):
+        super().setUpClass(chart_template_ref=chart_template_ref)
+        cls.bill = cls._create_partially_paid("in_invoice", 1000.0, 400.0)
+        cls.invoice = cls._create_partially_paid("out_invoice", 1000.0, 250.0)
+        # Tasa de 2017: 2 unidades de la moneda extranjera por unidad local
+        cls.foreign_invoice = cls._create_partially_paid(
+            "out_invoice", 1200.0, 600.0, currency=cls.currency_data["currency"]
+        )
+
+    @classmethod
+    def _create_partially_paid(cls, move_type, amount, paid, currency=None):
+        """Post a journal entry due on 2017-01-01 and pay ``paid`` of it, in
+        its currency, on 2017-01-10."""
+        move = cls.init_invoice(
+            move_type,
+            partner=cls.partner_a,
+            invoice_date="2017-01-01",
+            amounts=[amount],
+            currency=currency,
+            post=True,
+        )
+        cls.env["account.payment.register"].with_context(
+            active_model="account.move", active_ids=move.ids
+        ).create({"payment_date": "2017-01-10", "amount": paid})._create_payments()
+        return move
+
+    def _get_open_line(self, move, account_type):
+        line = move.line_ids.filtered(lambda line: line.account_type == account_type)
+        self.assertEqual(line.date_maturity, fields.Date.to_date("2017-01-01"))
+        self.assertTrue(line.matched_debit_ids or line.matched_credit_ids)
+        self.assertFalse(line.reconciled)
+        return line
+
+    def _get_report_line(self, data, move):
+        for partner_name, lines in data.items():
+            if partner_name == "partner_totals":
+                continue
+            for line in lines:
+                if line["move_name"] == move.name:
+                    return line
+        self.fail(f"{move.name} is missing from the report")
+
+    def _assert_bucket(self, report_line, bucket, amount):
+        for index in range(6):
+            expected = amount if index == bucket else 0.0
+            self.assertAlmostEqual(report_line[f"diff{index}"], expected, places=2)
+
+    def test_aged_payable_partially_paid(self):
+        line = self._get_open_line(self.bill, "liability_payable")
+        data = self.env["age.payable.report"].view_report(
+            partner_id=self.partner_a.id, report_date="2017-02-15"
+        )
+        report_line = self._get_report_line(data, self.bill)
+        self.assertAlmostEqual(
+            report_line["amount_residual"], -line.amount_residual, places=2
+        )
+        # 45 días después del vencimiento: columna 31-60
+        self._assert_bucket(report_line, 2, line.amount_residual)
+
+    def test_aged_payable_before_payment(self):
+        line = self._get_open_line(self.bill, "liability_payable")
+        data = self.env["age.payable.report"].view_report(
+            partner_id=self.partner_a.id, report_date="2017-01-05"
+        )
+        report_line = self._get_report_line(data, self.bill)
+        # El pago es posterior a la fecha del informe: aún no cuenta
+        self.assertAlmostEqual(report_line["amount_residual"], -line.balance, places=2)
+        self._assert_bucket(report_line, 1, line.balance)
+
+    def test_aged_receivable_partially_paid(self):
+        line = self._get_open_line(self.invoice, "asset_receivable")
+        data = self.env["age.receivable.report"].view_report(
+            partner_id=self.partner_a.id, report_date="2017-03-15"
+        )
+        report_line = self._get_report_line(data, self.invoice)
+        self.assertAlmostEqual(report_line["debit"], line.amount_residual, places=2)
+        # 73 días después del vencimiento: columna 61-90
+        self._assert_bucket(report_line, 3, line.amount_residual)
+
+    def test_aged_receivable_foreign_currency(self):
+        line = self._get_open_line(self.foreign_invoice, "asset_receivable")
+        self.assertNotEqual(line.currency_id, self.env.company.currency_id)
+        data = self.env["age.receivable.report"].view_report(
+            partner_id=self.partner_a.id, report_date="2017-03-15"
+        )
+        report_line = self._get_report_line(data, self.foreign_invoice)
+        # El residual se expresa en la moneda de la compañía
+        self.assertAlmostEqual(report_line["debit"], line.amount_residual, places=2)
+        self._assert_bucket(report_line, 3, line.amount_residual)
+        totals = data["partner_totals"][self.partner_a.name]
+        self.assertAlmostEqual(
+            totals["debit_sum"],
+            sum(
+                (self.invoice | self.foreign_invoice).line_ids.filtered(
+                    lambda line: line.account_type == "asset_receivable"
+                ).mapped("amount_residual")
+            ),
+            places=2,
+        )
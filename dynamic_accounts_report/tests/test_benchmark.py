@@ -0,0 +1,61 @@
+################################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>).
+#    Author: Ammu Raj (odoo@cybrosys.com)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+################################################################################
+import os
+import tempfile
+
+from odoo.tests import TransactionCase, tagged
+
+from odoo.addons.dynamic_accounts_report.tools import benchmark
+
+# Variable de entorno con el archivo donde se escriben los resultados; sin
+# ella se usa un archivo temporal que se descarta al terminar.
+OUTPUT_ENV_VAR = "DYNAMIC_REPORTS_BENCHMARK_OUTPUT"
+
+
+@tagged("benchmark", "-standard")
+class TestBenchmark(TransactionCase):
+    """Run the report benchmark of tools/benchmark.py on a small synthetic
+    ledger. Excluded from the standard runs: select it with
+    ``--test-tags benchmark`` and set ``DYNAMIC_REPORTS_BENCHMARK_OUTPUT`` to
+    keep the results for ``compare_benchmarks``."""
+
+    def test_run_benchmark(self):
+        output_path = os.environ.get(OUTPUT_ENV_VAR)
+        if not output_path:
+            output_file = tempfile.NamedTemporaryFile(suffix=".json", delete=False)
+            output_file.close()
+            output_path = output_file.name
+            self.addCleanup(os.remove, output_path)
+        results = benchmark.run_benchmark(
+            self.env,
+            output_path,
+            repeat=1,
+            accounts=5,
+            partners=5,
+            journals=2,
+            taxes=2,
+            move_lines=50,
+        )
+        self.assertGreaterEqual(results["move_lines"], 50)
+        self.assertEqual(
+            len(results["results"]), len(benchmark._get_scenarios(self.env))
+        )
+        self.assertFalse(benchmark.compare_benchmarks(output_path, output_path))
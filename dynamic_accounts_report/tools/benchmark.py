@@ -0,0 +1,464 @@
+################################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>).
+#    Author: Ammu Raj (odoo@cybrosys.com)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+################################################################################
+"""Benchmark of the dynamic reports against a synthetic ledger.
+
+Run it from an Odoo shell on a disposable database, once per commit to
+compare::
+
+    $ odoo-bin shell -d bench_db
+    >>> from odoo.addons.dynamic_accounts_report.tools import benchmark
+    >>> benchmark.run_benchmark(env, "/tmp/after.json", move_lines=50000)
+    >>> benchmark.compare_benchmarks("/tmp/before.json", "/tmp/after.json")
+
+The synthetic company and everything generated for it are rolled back once
+the reports are measured, unless ``keep_data`` is set. The same run, on a
+small ledger, is available as the ``benchmark`` test tag (see
+tests/test_benchmark.py).
+"""
+import json
+import logging
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+import types
+from datetime import timedelta
+
+from odoo import fields
+
+_logger = logging.getLogger(__name__)
+
+# Tamaño por defecto del libro contable sintético.
+DEFAULT_SIZES = {
+    "accounts": 50,
+    "partners": 200,
+    "journals": 4,
+    "taxes": 5,
+    "move_lines": 10000,
+}
+# Asientos creados y publicados por lote al generar el libro.
+MOVE_BATCH_SIZE = 500
+# Días hacia atrás en los que se reparten las fechas de los asientos.
+DATE_SPREAD_DAYS = 730
+# Tipos de las cuentas adicionales, repartidos en rueda.
+ACCOUNT_TYPES = ["income", "expense", "asset_current", "liability_current"]
+# Etiquetas de filtros que imprimen las cabeceras de las exportaciones.
+XLSX_FILTERS = {
+    "journal": [],
+    "analytic": [],
+    "partner": [],
+    "account": [],
+    "options": {},
+}
+
+
+def generate_ledger(env, seed=0, **sizes):
+    """
+    Create a company with the generic chart of accounts plus the requested
+    number of accounts, partners, journals, taxes and posted journal items.
+
+    :param env: Environment of a user allowed to create companies.
+    :param int seed: Seed of the random generator, for reproducible data.
+    :param sizes: Overrides of ``DEFAULT_SIZES``.
+    :return: Environment restricted to the new company.
+    """
+    sizes = dict(DEFAULT_SIZES, **sizes)
+    rng = random.Random(seed)
+    company = env["res.company"].create({"name": f"Report Benchmark {seed}"})
+    env.user.company_ids |= company
+    env = env(context=dict(env.context, allowed_company_ids=[company.id]))
+    env["account.chart.template"].try_loading("generic_coa", company)
+
+    accounts = env["account.account"].create(
+        [
+            {
+                "code": f"BNC{index:04d}",
+                "name": f"Benchmark Account {index}",
+                "account_type": ACCOUNT_TYPES[index % len(ACCOUNT_TYPES)],
+                "company_id": company.id,
+            }
+            for index in range(sizes["accounts"])
+        ]
+    )
+    partners = env["res.partner"].create(
+        [{"name": f"Benchmark Partner {index}"} for index in range(sizes["partners"])]
+    )
+    env["account.journal"].create(
+        [
+            {
+                "name": f"Benchmark Journal {index}",
+                "code": f"BN{index:03d}",
+                "type": ["bank", "cash", "general"][index % 3],
+                "company_id": company.id,
+            }
+            for index in range(sizes["journals"])
+        ]
+    )
+    taxes = env["account.tax"].create(
+        [
+            {
+                "name": f"Benchmark Tax {index}",
+                "amount": 2.0 * (index + 1),
+                "type_tax_use": ["sale", "purchase"][index % 2],
+                "company_id": company.id,
+            }
+            for index in range(sizes["taxes"])
+        ]
+    )
+
+    journals = env["account.journal"].search([("company_id", "=", company.id)])
+    entry_journals = journals.filtered(
+        lambda journal: journal.type in ("bank", "cash", "general")
+    )
+    income = accounts.filtered(lambda account: account.account_type == "income")
+    expense = accounts.filtered(lambda account: account.account_type == "expense")
+    today = fields.Date.context_today(env["res.company"])
+    line_count = 0
+    while line_count < sizes["move_lines"]:
+        values = [
+            _get_move_values(
+                rng,
+                today - timedelta(days=rng.randrange(DATE_SPREAD_DAYS)),
+                partners,
+                accounts,
+                income,
+                expense,
+                taxes,
+                entry_journals,
+            )
+            for _index in range(min(MOVE_BATCH_SIZE, sizes["move_lines"]))
+        ]
+        moves = env["account.move"].create(values)
+        moves.action_post()
+        line_count += len(moves.line_ids)
+        _logger.info("Benchmark ledger: %s journal items", line_count)
+    return env
+
+
+def _get_move_values(
+    rng, date, partners, accounts, income, expense, taxes, entry_journals
+):
+    """Values of one random invoice, bill or two-line journal entry."""
+    partner = rng.choice(partners)
+    if rng.random() < 0.4:
+        move_type = rng.choice(["out_invoice", "in_invoice"])
+        use = "sale" if move_type == "out_invoice" else "purchase"
+        line_taxes = taxes.filtered(lambda tax: tax.type_tax_use == use)
+        line_accounts = (income if move_type == "out_invoice" else expense) or accounts
+        return {
+            "move_type": move_type,
+            "partner_id": partner.id,
+            "invoice_date": date,
+            "date": date,
+            "invoice_line_ids": [
+                (
+                    0,
+                    0,
+                    {
+                        "name": "Benchmark line",
+                        "quantity": 1,
+                        "price_unit": round(rng.uniform(1, 5000), 2),
+                        "account_id": rng.choice(line_accounts).id,
+                        "tax_ids": [(6, 0, rng.choice(line_taxes).ids)]
+                        if line_taxes
+                        else [],
+                    },
+                )
+                for _index in range(rng.randint(1, 3))
+            ],
+        }
+    journal = rng.choice(entry_journals)
+    amount = round(rng.uniform(1, 5000), 2)
+    counterpart = journal.default_account_id or rng.choice(accounts)
+    return {
+        "move_type": "entry",
+        "journal_id": journal.id,
+        "date": date,
+        "line_ids": [
+            (
+                0,
+                0,
+                {
+                    "account_id": counterpart.id,
+                    "partner_id": partner.id,
+                    "debit": amount,
+                    "credit": 0.0,
+                },
+            ),
+            (
+                0,
+                0,
+                {
+                    "account_id": rng.choice(accounts).id,
+                    "partner_id": partner.id,
+                    "debit": 0.0,
+                    "credit": amount,
+                },
+            ),
+        ],
+    }
+
+
+def _get_scenarios(env):
+    """Return (model, method, callable) triples covering the entry points of
+    every report, with the filters of the current fiscal year."""
+    date_from, date_to = env["report.domain.mixin"]._get_date_bounds("year")
+    start, end = str(date_from), str(date_to)
+    xlsx_filters = dict(XLSX_FILTERS, start_date=start, end_date=end)
+    scenarios = [
+        ("account.general.ledger", "view_report", lambda report: report.view_report()),
+        (
+            "account.general.ledger",
+            "get_filter_values",
+            lambda report: report.get_filter_values([], "year", {}, [], {}),
+        ),
+        (
+            "account.partner.ledger",
+            "view_report",
+            lambda report: report.view_report(None, None),
+        ),
+        (
+            "account.partner.ledger",
+            "get_filter_values",
+            lambda report: report.get_filter_values(None, "year", None, {}),
+        ),
+        ("account.trial.balance", "view_report", lambda report: report.view_report()),
+        (
+            "account.trial.balance",
+            "get_filter_values",
+            lambda report: report.get_filter_values(
+                start, end, None, None, [], [], {}, {}
+            ),
+        ),
+        ("bank.book.report", "view_report", lambda report: report.view_report()),
+        (
+            "bank.book.report",
+            "get_filter_values",
+            lambda report: report.get_filter_values(None, "year", [], {}),
+        ),
+        ("cash.book.report", "view_report", lambda report: report.view_report()),
+        (
+            "cash.book.report",
+            "get_filter_values",
+            lambda report: report.get_filter_values(None, "year", [], {}),
+        ),
+        ("age.payable.report", "view_report", lambda report: report.view_report()),
+        ("age.receivable.report", "view_report", lambda report: report.view_report()),
+        (
+            "dynamic.balance.sheet.report",
+            "view_report",
+            lambda report: report.view_report(report.create({}).id, None, None),
+        ),
+        ("tax.report", "view_report", lambda report: report.view_report()),
+        (
+            "tax.report",
+            "get_filter_values",
+            lambda report: report.get_filter_values(
+                start, end, None, None, {}, {"account": True}
+            ),
+        ),
+    ]
+    # Exportaciones XLSX de los reportes que recalculan sus datos en el
+    # servidor, con los mismos filtros que get_filter_values.
+    for model, args, action in [
+        (
+            "account.general.ledger",
+            [[], "year", {}, [], {}],
+            "dynamic_accounts_report.action_general_ledger",
+        ),
+        (
+            "account.partner.ledger",
+            [None, "year", None, {}],
+            "dynamic_accounts_report.action_partner_ledger",
+        ),
+        (
+            "bank.book.report",
+            [None, "year", [], {}],
+            "dynamic_accounts_report.action_bank_book",
+        ),
+        (
+            "cash.book.report",
+            [None, "year", [], {}],
+            "dynamic_accounts_report.action_cash_book",
+        ),
+    ]:
+        scenarios.append(
+            (
+                model,
+                "get_xlsx_report",
+                lambda report, args=args, action=action: _export_xlsx(
+                    report, {"args": args, "filters": xlsx_filters}, action
+                ),
+            )
+        )
+    return scenarios
+
+
+def _export_xlsx(report, options, report_action):
+    """Rebuild the export data of a report and write its workbook."""
+    data = report._get_xlsx_data(options)
+    with tempfile.TemporaryFile() as stream:
+        output = types.SimpleNamespace(xlsx_streaming=True, stream=stream)
+        report.get_xlsx_report(data, output, "Benchmark", report_action)
+
+
+def _measure(env, call):
+    """Run ``call`` on an empty ORM cache and return its wall time, query
+    count and peak Python memory."""
+    env.invalidate_all()
+    tracemalloc.reset_peak()
+    queries = env.cr.sql_log_count
+    start = time.perf_counter()
+    call()
+    wall_time = time.perf_counter() - start
+    return {
+        "wall_time": wall_time,
+        "queries": env.cr.sql_log_count - queries,
+        "peak_memory": tracemalloc.get_traced_memory()[1],
+    }
+
+
+def benchmark_reports(env, repeat=3):
+    """
+    Time every report scenario of ``_get_scenarios``.
+
+    The first run of each scenario starts from an empty report cache
+    ('cold'); the next ``repeat`` runs may be served from it ('warm') and
+    are summarized by their median wall time.
+
+    :return: One dictionary per scenario with the cold and warm figures.
+    :rtype: list[dict]
+    """
+    results = []
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        for model, method, call in _get_scenarios(env):
+            report = env[model]
+            env["dynamic.report.cache"].sudo().search([]).unlink()
+            cold = _measure(env, lambda: call(report))
+            warm = [_measure(env, lambda: call(report)) for _index in range(repeat)]
+            results.append(
+                {
+                    "model": model,
+                    "method": method,
+                    "cold": cold,
+                    "warm": {
+                        "wall_time": statistics.median(
+                            run["wall_time"] for run in warm
+                        ),
+                        "queries": max(run["queries"] for run in warm),
+                        "peak_memory": max(run["peak_memory"] for run in warm),
+                    }
+                    if warm
+                    else None,
+                }
+            )
+            _logger.info(
+                "Benchmark %s.%s: %.3fs, %s queries",
+                model,
+                method,
+                cold["wall_time"],
+                cold["queries"],
+            )
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return results
+
+
+def run_benchmark(env, output_path, seed=0, repeat=3, keep_data=False, **sizes):
+    """
+    Generate a synthetic ledger, benchmark every report on it and write the
+    results to ``output_path`` as JSON.
+
+    :param env: Environment of a user allowed to create companies.
+    :param str output_path: File the results are written to.
+    :param int seed: Seed of the ledger generator.
+    :param int repeat: Warm runs of each scenario.
+    :param bool keep_data: Keep the generated company instead of rolling it
+        back.
+    :param sizes: Overrides of ``DEFAULT_SIZES``.
+    :return: The written results.
+    :rtype: dict
+    """
+    savepoint = env.cr.savepoint()
+    try:
+        start = time.perf_counter()
+        bench_env = generate_ledger(env, seed=seed, **sizes)
+        generation_time = time.perf_counter() - start
+        results = {
+            "date": fields.Datetime.to_string(fields.Datetime.now()),
+            "seed": seed,
+            "sizes": dict(DEFAULT_SIZES, **sizes),
+            "move_lines": bench_env["account.move.line"].search_count([]),
+            "generation_time": generation_time,
+            "results": benchmark_reports(bench_env, repeat=repeat),
+        }
+    finally:
+        savepoint.close(rollback=not keep_data)
+    with open(output_path, "w", encoding="utf-8") as output:
+        json.dump(results, output, indent=2)
+    return results
+
+
+def compare_benchmarks(before_path, after_path, threshold=0.2):
+    """
+    Compare two benchmark files and list the scenarios that got slower or
+    issue more queries.
+
+    :param str before_path: Results of the reference commit.
+    :param str after_path: Results of the commit under test.
+    :param float threshold: Relative wall time increase reported as a
+        regression.
+    :return: One dictionary per regressed scenario and phase.
+    :rtype: list[dict]
+    """
+    with open(before_path, encoding="utf-8") as before_file:
+        before = json.load(before_file)
+    with open(after_path, encoding="utf-8") as after_file:
+        after = json.load(after_file)
+    reference = {
+        (result["model"], result["method"]): result for result in before["results"]
+    }
+    regressions = []
+    for result in after["results"]:
+        previous = reference.get((result["model"], result["method"]))
+        if not previous:
+            continue
+        for phase in ("cold", "warm"):
+            old, new = previous.get(phase), result.get(phase)
+            if not old or not new:
+                continue
+            slower = new["wall_time"] > old["wall_time"] * (1 + threshold)
+            if slower or new["queries"] > old["queries"]:
+                regressions.append(
+                    {
+                        "model": result["model"],
+                        "method": result["method"],
+                        "phase": phase,
+                        "wall_time": (old["wall_time"], new["wall_time"]),
+                        "queries": (old["queries"], new["queries"]),
+                    }
+                )
+    return regressions